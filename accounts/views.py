@@ -1,6 +1,5 @@
 from typing import Any
 
-import json 
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db import transaction
@@ -12,7 +11,8 @@ from django.contrib.auth import update_session_auth_hash
 from django.utils.translation import gettext as _
 from core.models import ParameterChangeLog, Submission, ParameterReviewFlag
 from .forms import AccountForm, MyAccountForm, MyPasswordChangeForm
-from core.models import ParameterDef, Answer, Glossary, User, Question, SiteContent
+from core.models import User, SiteContent
+from core.services.dashboard_stats import get_dashboard_stats
 try:
     from core.models import Language
     HAS_LANGUAGE = True
@@ -46,47 +46,14 @@ def dashboard(request: HttpRequest) -> HttpResponse:
         role = getattr(user, "role", "user")
         is_admin = _is_admin(user)
 
-    # 2. STATISTICHE GLOBALI (calcolate per tutti)
-    total_questions = Question.objects.filter(parameter__is_active=True).count()
-
-    completed_langs_count = Language.objects.annotate(
-        valid_answers_count=Count('answers', filter=Q(
-            answers__response_text__in=['yes', 'no'],
-            answers__question__parameter__is_active=True
-        ))
-    ).filter(valid_answers_count__gte=total_questions).count()
-
-    stats = {
-        "languages": Language.objects.count(),
-        "completed_languages": completed_langs_count,
-        "families": Language.objects.exclude(family="").values("family").distinct().count(),
-        "parameters": ParameterDef.objects.filter(is_active=True).count(),
-        "answers": Answer.objects.count(),
-        "glossary": Glossary.objects.count(),
-    }
+    # 2. STATISTICHE GLOBALI: snapshot in cache (vedi core.services.dashboard_stats)
+    stats = get_dashboard_stats()
 
-    # SEZIONE PUBBLICA: Aggiungiamo i dati per la mappa
+    # SEZIONE PUBBLICA: la mappa carica il layer GeoJSON da language_map_data (con ETag)
     if role == "public":
-        # Prendi solo le lingue con latitudine e longitudine
-        langs_with_coords = Language.objects.filter(
-            latitude__isnull=False,
-            longitude__isnull=False
-        ).values('id', 'name_full', 'latitude', 'longitude', 'top_level_family')
-
-        map_data = []
-        for l in langs_with_coords:
-            map_data.append({
-                'id': l['id'],
-                'name': l['name_full'],
-                'lat': float(l['latitude']),  # Converti Decimal in float per il JSON
-                'lng': float(l['longitude']),
-                'family': l['top_level_family'] or 'Unknown'
-            })
-
         ctx = {
             "stats": stats, 
             "is_public": True, 
-            "map_data_json": json.dumps(map_data) # Passiamo il JSON al template
         }
         return render(request, "accounts/public_dashboard.html", ctx)
 
@@ -97,9 +64,7 @@ def dashboard(request: HttpRequest) -> HttpResponse:
 
     # --- LOGICA ADMIN ---
     if is_admin:
-        ctx["pending_languages"] = Language.objects.filter(
-            answers__status="waiting_for_approval"
-        ).distinct()
+        ctx["pending_languages"] = Language.objects.filter(progress__waiting__gt=0)
 
         ctx["recent_param_changes"] = (
             ParameterChangeLog.objects
@@ -120,20 +85,19 @@ def dashboard(request: HttpRequest) -> HttpResponse:
 
     # --- LOGICA USER ---
     elif role == "user":  # Usa elif per maggiore sicurezza
-        total_q_count = Question.objects.filter(parameter__is_active=True).count()
+        total_q_count = stats["questions"]
         # Qui user.m2m_languages è sicuro perché sappiamo che l'utente è loggato!
-        assigned_langs = user.m2m_languages.annotate(
-            done_count=Count('answers', filter=Q(answers__response_text__in=['yes', 'no'])),
-            has_reject=Count('answers', filter=Q(answers__status='rejected'))
-        )
+        assigned_langs = user.m2m_languages.select_related("progress")
 
         user_projects = []
         for lang in assigned_langs:
-            progress = int((lang.done_count / total_q_count) * 100) if total_q_count > 0 else 0
+            lp = getattr(lang, "progress", None)
+            done_count = lp.total if lp else 0
+            progress = int((done_count / total_q_count) * 100) if total_q_count > 0 else 0
             user_projects.append({
                 "lang": lang,
                 "progress": progress,
-                "has_rejection": lang.has_reject > 0,
+                "has_rejection": bool(lp and lp.rejected > 0),
             })
         ctx["user_projects"] = user_projects
 
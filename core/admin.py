@@ -7,7 +7,8 @@ from .models import (
     User, Glossary, Language, ParameterDef, Question,
     LanguageParameter, Answer, Example, Motivation, AnswerMotivation,
     LanguageParameterEval, Submission, SubmissionAnswer,
-    SubmissionAnswerMotivation, SubmissionExample, SubmissionParam
+    SubmissionAnswerMotivation, SubmissionExample, SubmissionParam,
+    EvalConsistencyIssue,
 )
 
 admin.site.register(User)
@@ -49,15 +50,76 @@ class LanguageAdmin(admin.ModelAdmin):
     def recompact_positions(self, request, queryset):
         """
         Ricompatta tutte le posizioni delle lingue (ignora il queryset).
-        Risistema da 1 a N senza buchi né duplicati.
+        Rinumera a multipli di POSITION_GAP con un solo UPDATE (core.services.ordering.rebalance).
         """
         from django.db import transaction
+        from core.services.ordering import lock_ordering, rebalance
 
         with transaction.atomic():
-            for idx, lang in enumerate(Language.objects.order_by("position"), start=1):
-                if lang.position != idx:
-                    lang.position = idx
-                    lang.save(update_fields=["position"])
+            lock_ordering(Language)
+            rebalance(Language)
         self.message_user(request, "Posizioni ricompattate con successo.")
 
     recompact_positions.short_description = "Ricompatta tutte le posizioni"
+
+
+@admin.register(EvalConsistencyIssue)
+class EvalConsistencyIssueAdmin(admin.ModelAdmin):
+    """Report della verifica di coerenza degli eval (vedi manage.py scan_eval_consistency)."""
+    list_display = ("language", "parameter", "reason", "stored_value", "expected_value",
+                    "stored_warning", "expected_warning", "detected_at")
+    list_filter = ("reason", "parameter")
+    search_fields = ("language__id", "language__name_full", "parameter__id")
+    list_select_related = ("language", "parameter")
+    list_per_page = 100
+    actions = ["rerun_dag"]
+    change_list_template = "admin/core/evalconsistencyissue/change_list.html"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        from django.urls import path
+        urls = super().get_urls()
+        custom = [
+            path("rescan/", self.admin_site.admin_view(self.rescan_view), name="core_evalconsistencyissue_rescan"),
+        ]
+        return custom + urls
+
+    def rescan_view(self, request):
+        """Riscrive l'intero report: solo POST (form con CSRF) e per chi può vedere il modello."""
+        from django.core.exceptions import PermissionDenied
+        from django.http import HttpResponseNotAllowed
+        from django.shortcuts import redirect
+        from core.services.eval_consistency import scan_eval_consistency
+
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        report = scan_eval_consistency()
+        self.message_user(
+            request,
+            f"Scansione completata: {len(report.issues)} problemi su "
+            f"{report.languages} lingue × {report.parameters} parametri ({report.seconds}s).",
+        )
+        return redirect("admin:core_evalconsistencyissue_changelist")
+
+    def rerun_dag(self, request, queryset):
+        """Riesegue il DAG sulle lingue selezionate e poi ripete la scansione."""
+        from core.services.dag_eval import run_dag_for_language
+        from core.services.eval_consistency import scan_eval_consistency
+
+        lang_ids = sorted(set(queryset.values_list("language_id", flat=True)))
+        for lid in lang_ids:
+            run_dag_for_language(lid)
+        report = scan_eval_consistency()
+        self.message_user(
+            request,
+            f"DAG rieseguito su {len(lang_ids)} lingue. Problemi residui: {len(report.issues)}.",
+        )
+
+    rerun_dag.short_description = "Riesegui il DAG sulle lingue selezionate"
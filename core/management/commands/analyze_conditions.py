@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.services.condition_analysis import analyze_conditions
+
+
+class Command(BaseCommand):
+    help = (
+        "Analisi statica delle implicational_condition dei parametri attivi: cicli, "
+        "condizioni mai vere/sempre vere, parametri morti, referenze inattive o sconosciute."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="Stampa il report completo in JSON.")
+
+    def handle(self, *args, **options):
+        report = analyze_conditions()
+        if options["json"]:
+            data = dict(report.__dict__)
+            self.stdout.write(json.dumps(data, indent=2, ensure_ascii=False))
+            return
+
+        self.stdout.write(f"Parametri attivi: {report.parameters}  Tempo: {report.ms} ms")
+        for cyc in report.cycles:
+            self.stdout.write(self.style.ERROR("Ciclo: " + " → ".join(cyc)))
+        for pid, err in sorted(report.parse_errors.items()):
+            self.stdout.write(self.style.ERROR(f"{pid}: condizione non parsabile ({err})"))
+        for pid, refs in sorted(report.unknown_refs.items()):
+            self.stdout.write(self.style.ERROR(f"{pid}: referenze sconosciute {', '.join(refs)}"))
+        for pid, refs in sorted(report.inactive_refs.items()):
+            self.stdout.write(self.style.WARNING(f"{pid}: referenze inattive {', '.join(refs)}"))
+        for pid in report.unsatisfiable:
+            self.stdout.write(self.style.WARNING(f"{pid}: condizione mai vera"))
+        for pid in report.tautologies:
+            self.stdout.write(self.style.WARNING(f"{pid}: condizione sempre vera"))
+        for pid in report.dead:
+            self.stdout.write(self.style.WARNING(f"{pid}: mai vera con i valori raggiungibili dalle referenze"))
+        if report.skipped:
+            self.stdout.write(f"Non analizzati (troppe referenze): {', '.join(report.skipped)}")
+        if report.ok:
+            self.stdout.write(self.style.SUCCESS("Nessun problema trovato."))
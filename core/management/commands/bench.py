@@ -0,0 +1,324 @@
+import io
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Language, User
+from core.services.synthetic import SyntheticSpec, generate_corpus
+
+
+TARGETS = ("dag", "consolidation", "tablea", "distances", "exports", "submissions", "imports", "search", "answersave")
+
+
+class _Rollback(Exception):
+    """Sollevata a fine benchmark per annullare il corpus sintetico."""
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark riproducibile dei percorsi critici (DAG, consolidamento, TableA, distanze, "
+        "export, submission, import, ricerca) su un corpus sintetico. Scrive i risultati in JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--languages", type=int, default=50)
+        parser.add_argument("--parameters", type=int, default=100)
+        parser.add_argument("--questions-per-param", dest="questions_per_param", type=int, default=3)
+        parser.add_argument("--condition-depth", dest="condition_depth", type=int, default=2)
+        parser.add_argument("--answer-density", dest="answer_density", type=float, default=0.9)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--prefix", default="SY", help="Prefisso degli id sintetici (max 4 caratteri).")
+        parser.add_argument("--repeat", type=int, default=3, help="Ripetizioni per ogni target.")
+        parser.add_argument("--sample", type=int, default=5, help="Lingue campione per i target per-lingua.")
+        parser.add_argument("--only", nargs="*", choices=TARGETS, help="Esegue solo i target indicati.")
+        parser.add_argument("--output", default="bench.json", help="File JSON dei risultati.")
+        parser.add_argument("--compare", help="JSON di un run precedente con cui confrontare i tempi.")
+        parser.add_argument("--keep", action="store_true", help="Non annulla il corpus sintetico a fine run.")
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if not prefix or len(prefix) > 4:
+            raise CommandError("--prefix deve avere da 1 a 4 caratteri.")
+        if Language.objects.filter(id__startswith=f"{prefix}L").exists():
+            raise CommandError(f"Esistono già lingue con prefisso '{prefix}L': usa un altro --prefix.")
+
+        spec = SyntheticSpec(
+            languages=options["languages"],
+            parameters=options["parameters"],
+            questions_per_param=options["questions_per_param"],
+            condition_depth=options["condition_depth"],
+            answer_density=options["answer_density"],
+            seed=options["seed"],
+            prefix=prefix,
+        )
+        targets = options["only"] or list(TARGETS)
+        self.repeat = max(1, options["repeat"])
+
+        report = {
+            "commit": _git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "spec": spec.as_dict(),
+            "repeat": self.repeat,
+            "results": {},
+        }
+
+        try:
+            with transaction.atomic():
+                t0 = time.perf_counter()
+                corpus = generate_corpus(spec)
+                report["generate_seconds"] = round(time.perf_counter() - t0, 4)
+                report["answers"] = corpus.answers
+                self.stdout.write(
+                    f"Corpus: {len(corpus.language_ids)} lingue, {len(corpus.parameter_ids)} parametri, "
+                    f"{len(corpus.question_ids)} domande, {corpus.answers} risposte "
+                    f"({report['generate_seconds']}s)"
+                )
+
+                user = User.objects.create_user(
+                    email=f"bench-{prefix.lower()}@example.test", password=None, role="admin", is_staff=True,
+                )
+                sample = corpus.language_ids[: max(1, options["sample"])]
+
+                for name in targets:
+                    fn = getattr(self, f"_bench_{name}")
+                    report["results"][name] = fn(corpus, sample, user)
+                    r = report["results"][name]
+                    self.stdout.write(f"  {name:<14} median {r['median_ms']:>10.2f} ms   queries {r['queries']}")
+
+                if not options["keep"]:
+                    raise _Rollback()
+        except _Rollback:
+            pass
+
+        with open(options["output"], "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Risultati scritti in {options['output']}"))
+
+        if options.get("compare"):
+            self._compare(report, options["compare"])
+
+    # ------------------------------------------------------------
+    # Misura
+    # ------------------------------------------------------------
+    def _measure(self, fn: Callable[[], object]) -> Dict[str, object]:
+        """Esegue fn `repeat` volte in savepoint annullati; misura tempi e query dell'ultima esecuzione."""
+        timings: List[float] = []
+        queries = 0
+        for _ in range(self.repeat):
+            sid = transaction.savepoint()
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - t0) * 1000.0)
+            queries = len(ctx.captured_queries)
+            transaction.savepoint_rollback(sid)
+        return {
+            "runs_ms": [round(t, 3) for t in timings],
+            "min_ms": round(min(timings), 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "mean_ms": round(statistics.mean(timings), 3),
+            "queries": queries,
+        }
+
+    def _request(self, user, path: str = "/", data: dict | None = None):
+        req = RequestFactory().get(path, data or {})
+        req.user = user
+        return req
+
+    # ------------------------------------------------------------
+    # Target
+    # ------------------------------------------------------------
+    def _bench_dag(self, corpus, sample, user):
+        from core.services.dag_eval import run_dag_for_language
+
+        def run():
+            for lid in sample:
+                run_dag_for_language(lid)
+        return self._measure(run)
+
+    def _bench_consolidation(self, corpus, sample, user):
+        from core.services.param_consolidate import recompute_and_persist_language_parameter
+
+        pids = corpus.parameter_ids[:20]
+
+        def run():
+            for lid in sample:
+                for pid in pids:
+                    recompute_and_persist_language_parameter(lid, pid)
+        return self._measure(run)
+
+    def _bench_tablea(self, corpus, sample, user):
+        from tablea_ui.views import get_tablea_filtered_data
+
+        req = self._request(user, "/tablea/", {"view": "params"})
+        return self._measure(lambda: get_tablea_filtered_data(req))
+
+    def _bench_distances(self, corpus, sample, user):
+        from tablea_ui.views import get_tablea_filtered_data, generate_matrix_txt, hamming_core, jaccard_core
+
+        req = self._request(user, "/tablea/", {"view": "params"})
+        languages, rows, _ = get_tablea_filtered_data(req)
+
+        def run():
+            generate_matrix_txt(languages, rows, hamming_core)
+            generate_matrix_txt(languages, rows, jaccard_core, identity="+")
+        return self._measure(run)
+
+    def _bench_exports(self, corpus, sample, user):
+        from languages_ui.views import _build_language_workbook
+        from tablea_ui.views import tablea_export_csv
+
+        langs = list(Language.objects.filter(id__in=sample))
+        req = self._request(user, "/tablea/export.csv", {"view": "params"})
+
+        def run():
+            tablea_export_csv(req)
+            for lang in langs:
+                _build_language_workbook(lang, user)
+        return self._measure(run)
+
+    def _bench_submissions(self, corpus, sample, user):
+        from submissions_ui.services import create_language_submission
+
+        langs = list(Language.objects.filter(id__in=sample))
+
+        def run():
+            for lang in langs:
+                create_language_submission(lang, user, note="bench")
+        return self._measure(run)
+
+    def _bench_imports(self, corpus, sample, user):
+        from languages_ui.views import _build_language_workbook
+
+        lang = Language.objects.get(pk=sample[0])
+        wb, _suffix = _build_language_workbook(lang, user)
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            wb.save(path)
+            return self._measure(lambda: call_command("import_language_from_excel", file=path, stdout=io.StringIO()))
+        finally:
+            os.remove(path)
+
+    def _bench_answersave(self, corpus, sample, user):
+        from django.http import QueryDict
+
+        from core.models import Question
+        from core.services.answer_save import parse_parameter_post, save_answers
+
+        langs = list(Language.objects.filter(id__in=sample))
+        by_param: Dict[str, List[str]] = {}
+        for pid, qid in (
+            Question.objects.filter(parameter_id__in=corpus.parameter_ids[:20])
+            .order_by("parameter_id", "id").values_list("parameter_id", "id")
+        ):
+            by_param.setdefault(pid, []).append(qid)
+        # form completo di un parametro: tutte le domande a "no" con commento
+        posts = {}
+        for pid, qids in by_param.items():
+            post = QueryDict(mutable=True)
+            for qid in qids:
+                post[f"resp_{qid}"] = "no"
+                post[f"com_{qid}"] = "bench"
+            posts[pid] = post
+
+        def run():
+            for lang in langs:
+                for pid, post in posts.items():
+                    save_answers(lang, pid, parse_parameter_post(post, by_param[pid]))
+        return self._measure(run)
+
+    def _bench_search(self, corpus, sample, user):
+        import random
+
+        from core.models import Glossary, Question
+        from core.services.search import search
+        from glossary_ui.views import glossary_list
+        from languages_ui.views import language_list
+        from questions_ui.views import question_list
+
+        # il corpus sintetico non ha glossario: voci casuali, annullate col resto a fine run
+        rng = random.Random(corpus.spec.seed)
+        syll = ("ka", "lo", "mi", "ne", "ru", "ta", "vi", "zo", "sha", "tri", "gen", "pol")
+        prefix = corpus.spec.prefix.lower()
+        Glossary.objects.bulk_create(
+            [
+                Glossary(
+                    word=f"{prefix}-{''.join(rng.choice(syll) for _ in range(3))}-{i}",
+                    description=" ".join("".join(rng.choice(syll) for _ in range(rng.randint(2, 4))) for _ in range(30)),
+                )
+                for i in range(max(1000, len(corpus.language_ids) * 10))
+            ],
+            batch_size=5000,
+        )
+        with connection.cursor() as cur:
+            cur.execute("ANALYZE core_language; ANALYZE core_glossary; ANALYZE core_question;")
+
+        views = (
+            (language_list, "/languages/", ["synthetic 1", "family 3", "group"]),
+            (glossary_list, "/glossary/", ["kalo", "tri", "shagen"]),
+            (question_list, "/questions/all/", ["question", f"{corpus.spec.prefix}p0001"]),
+        )
+
+        def run():
+            for view, path, terms in views:
+                for term in terms:
+                    view(self._request(user, path, {"q": term}))
+        result = self._measure(run)
+
+        # il piano deve passare dagli indici trigram, non da una scansione sequenziale
+        plans = {}
+        for model, term in ((Language, "synthetic 1"), (Glossary, "kalo"), (Question, "question")):
+            plan = search(model.objects.all(), term).explain()
+            plans[model._meta.model_name] = "Bitmap Index Scan" in plan or "Index Scan" in plan
+        result["uses_index"] = plans
+        return result
+
+    # ------------------------------------------------------------
+    # Confronto con un run precedente
+    # ------------------------------------------------------------
+    def _compare(self, report: dict, path: str) -> None:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                base = json.load(fh)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Impossibile leggere {path}: {e}")
+
+        if base.get("spec") != report["spec"]:
+            self.stdout.write(self.style.WARNING("Attenzione: lo spec del corpus differisce dal run di confronto."))
+
+        self.stdout.write(f"Confronto con {path} (commit {base.get('commit', '?')}):")
+        for name, cur in report["results"].items():
+            old = base.get("results", {}).get(name)
+            if not old:
+                continue
+            ratio = cur["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+            line = (
+                f"  {name:<14} {old['median_ms']:>10.2f} -> {cur['median_ms']:>10.2f} ms "
+                f"(x{ratio:.2f})   queries {old['queries']} -> {cur['queries']}"
+            )
+            style = self.style.ERROR if ratio > 1.10 else (self.style.SUCCESS if ratio < 0.90 else str)
+            self.stdout.write(style(line))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Language
+from submissions_ui.history import rebuild_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Completa la storia dei valori dei parametri (ParamValueHistory) dalle submission esistenti, "
+        "aggiungendo solo i punti precedenti al primo già registrato per ogni lingua. "
+        "Serve una volta per le submission create prima della tabella; poi la storia cresce da sola. "
+        "Con --force la storia viene cancellata e ricostruita: i cambi delle submission eliminate vanno persi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--language", dest="languages", action="append", default=[],
+                            help="Solo queste lingue (ripetibile). Default: tutte.")
+        parser.add_argument("--force", action="store_true",
+                            help="Cancella la storia esistente e la ricostruisce dalle sole submission rimaste.")
+
+    def handle(self, *args, **options):
+        languages = Language.objects.order_by("id")
+        if options["languages"]:
+            languages = languages.filter(id__in=options["languages"])
+        total = 0
+        for lang in languages:
+            n = rebuild_history(lang, force=options["force"])
+            total += n
+            self.stdout.write(f"  {lang.id}: {n} cambi")
+        self.stdout.write(self.style.SUCCESS(
+            f"Storia {'ricostruita' if options['force'] else 'completata'}: {total} righe."
+        ))
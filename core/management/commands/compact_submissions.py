@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import (
+    SnapshotStorage, Submission, SubmissionAnswer, SubmissionAnswerMotivation, SubmissionExample,
+    SubmissionKeyIndex, SubmissionParam,
+)
+from submissions_ui.services import encode_snapshot
+from submissions_ui.snapshot import current_key_index, read_legacy_submission, state_from_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Converte le submission legacy (righe in SubmissionAnswer/Motivation/Example/Param) "
+        "nel formato compatto (full, delta o riferimento a uno snapshot identico) ed elimina le righe copiate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", dest="batch_size", type=int, default=200,
+                            help="Submission convertite per transazione.")
+        parser.add_argument("--dry-run", action="store_true", help="Conta soltanto le submission da convertire.")
+
+    def handle(self, *args, **options):
+        pending = Submission.objects.filter(storage=SnapshotStorage.LEGACY)
+        total = pending.count()
+        self.stdout.write(f"Submission legacy da convertire: {total}")
+        if options["dry_run"] or not total:
+            return
+
+        key_index = current_key_index()
+        batch_size = max(1, options["batch_size"])
+        done = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    pending.select_for_update(skip_locked=True, of=("self",))
+                    .select_related("language").order_by("id")[:batch_size]
+                )
+                if not batch:
+                    break
+                for sub in batch:
+                    state = state_from_snapshot(read_legacy_submission(sub))
+                    fields = encode_snapshot(sub.language, state, key_index, exclude_ids=[sub.id])
+                    for name, value in fields.items():
+                        setattr(sub, name, value)
+                    sub.save(update_fields=list(fields))
+                ids = [sub.id for sub in batch]
+                for model in (SubmissionAnswer, SubmissionAnswerMotivation, SubmissionExample, SubmissionParam):
+                    model.objects.filter(submission_id__in=ids).delete()
+            done += len(batch)
+            self.stdout.write(f"  convertite {done}/{total}")
+
+        # indici domande/parametri non più usati da nessuna submission
+        orphans, _ = SubmissionKeyIndex.objects.filter(submissions__isnull=True).delete()
+        self.stdout.write(self.style.SUCCESS(f"Convertite {done} submission; indici orfani rimossi: {orphans}."))
@@ -23,7 +23,13 @@ from core.models import (
     AnswerMotivation,
     QuestionAllowedMotivation,
 )
-from core.signals import answer_saved_recompute, answer_deleted_recompute
+from core.signals import (
+    answer_saved_recompute, answer_deleted_recompute,
+    answer_saved_progress, answer_deleted_progress,
+    answer_fragment_saved, answer_fragment_deleted,
+)
+from core.services.language_progress import refresh_language_progress
+from core.services.language_data_cache import invalidate_language_fragments
 from core.services.param_consolidate import recompute_and_persist_language_parameter
 
 
@@ -201,6 +207,10 @@ class Command(BaseCommand):
         # disabilitiamo i signal per evitare ricalcoli ridondanti durante l'import
         post_save.disconnect(answer_saved_recompute, sender=Answer)
         post_delete.disconnect(answer_deleted_recompute, sender=Answer)
+        post_save.disconnect(answer_saved_progress, sender=Answer)
+        post_delete.disconnect(answer_deleted_progress, sender=Answer)
+        post_save.disconnect(answer_fragment_saved, sender=Answer)
+        post_delete.disconnect(answer_fragment_deleted, sender=Answer)
 
         try:
             # import atomico per sicurezza
@@ -352,6 +362,10 @@ class Command(BaseCommand):
             # riconnettiamo i signal
             post_save.connect(answer_saved_recompute, sender=Answer)
             post_delete.connect(answer_deleted_recompute, sender=Answer)
+            post_save.connect(answer_saved_progress, sender=Answer)
+            post_delete.connect(answer_deleted_progress, sender=Answer)
+            post_save.connect(answer_fragment_saved, sender=Answer)
+            post_delete.connect(answer_fragment_deleted, sender=Answer)
 
         # STEP 3: Ricalcoliamo tutti i LanguageParameter per questa lingua
         # una sola volta alla fine, invece che ad ogni Answer
@@ -364,6 +378,9 @@ class Command(BaseCommand):
             )
         )
 
+        refresh_language_progress(language.id)
+        invalidate_language_fragments(language.id)
+
         self.stdout.write("Ricalcolo dei parametri per la lingua...")
         params_updated = set()
         for answer in Answer.objects.filter(language=language).select_related('question'):
@@ -0,0 +1,224 @@
+import json
+import math
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import User
+from core.services.synthetic import SyntheticSpec, generate_corpus, purge_corpus
+
+
+# Endpoint pilotati ad ogni taglia: (nome, url_name, kwargs, querystring).
+# "{lang}" e "{lang_b}" / "{param}" vengono sostituiti con oggetti del corpus sintetico.
+ENDPOINTS: List[Tuple[str, str, dict, dict]] = [
+    ("dashboard", "dashboard", {}, {}),
+    ("language_list", "language_list", {}, {}),
+    ("language_list_search", "language_list", {}, {"q": "Synthetic 1"}),
+    ("language_data", "language_data", {"lang_id": "{lang}"}, {}),
+    ("language_debug", "language_debug", {"lang_id": "{lang}"}, {}),
+    ("tablea_index", "tablea_index", {}, {"view": "params"}),
+    ("tablea_export_csv", "tablea_export_csv", {}, {"view": "params"}),
+    ("queries_q2", "queries:home", {}, {"tab": "q2", "parameter": "{param}"}),
+    ("queries_q4", "queries:home", {}, {"tab": "q4", "language": "{lang}"}),
+    ("queries_q7", "queries:home", {}, {"tab": "q7", "language_a": "{lang}", "language_b": "{lang_b}"}),
+    ("parameter_list", "parameter_list", {}, {}),
+    ("question_list", "question_list", {}, {}),
+    ("submissions_list", "submissions_list", {}, {}),
+    ("graph_lang_values", "api_lang_values", {}, {"lang": "{lang}"}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Test di scala: crea un database PostgreSQL temporaneo, vi genera corpus sintetici "
+        "di taglia crescente e misura latenza, memoria e numero di query delle view principali "
+        "tramite il test client. Produce un report JSON con la pendenza log-log per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[100, 300, 1000],
+                            help="Numero di lingue per ogni step (default: 100 300 1000).")
+        parser.add_argument("--parameters", type=int, default=None,
+                            help="Numero fisso di parametri; se omesso scala insieme alle lingue.")
+        parser.add_argument("--questions-per-param", dest="questions_per_param", type=int, default=3)
+        parser.add_argument("--condition-depth", dest="condition_depth", type=int, default=2)
+        parser.add_argument("--answer-density", dest="answer_density", type=float, default=0.9)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--budget-ms", dest="budget_ms", type=float, default=2000.0,
+                            help="Soglia oltre la quale un endpoint è segnalato come 'rotto'.")
+        parser.add_argument("--only", nargs="*", help="Limita agli endpoint indicati (per nome).")
+        parser.add_argument("--keepdb", action="store_true", help="Riusa/non distrugge il DB temporaneo.")
+        parser.add_argument("--output", default="scale_report.json")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Il test di scala richiede PostgreSQL.")
+
+        endpoints = ENDPOINTS
+        if options["only"]:
+            wanted = set(options["only"])
+            endpoints = [e for e in ENDPOINTS if e[0] in wanted]
+            if not endpoints:
+                raise CommandError("Nessun endpoint corrisponde a --only.")
+
+        self.repeat = max(1, options["repeat"])
+        sizes = sorted(set(options["sizes"]))
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        scratch = connection.creation.create_test_db(verbosity=1, autoclobber=True, keepdb=options["keepdb"])
+        self.stdout.write(f"Database temporaneo: {scratch}")
+
+        report = {"created_at": timezone.now().isoformat(), "sizes": sizes, "steps": [], "endpoints": {}}
+        try:
+            # Nessun manifest collectstatic nel DB temporaneo: storage statico semplice.
+            # Cache nel DB temporaneo: cache.clear() tra una taglia e l'altra non tocca
+            # una cache condivisa (es. DJANGO_CACHE_BACKEND verso Redis).
+            with override_settings(STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            }, CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "scale_test_cache"},
+            }):
+                call_command("createcachetable", verbosity=0)
+                client = self._client()
+                for n in sizes:
+                    purge_corpus("SC")
+                    spec = SyntheticSpec(
+                        languages=n,
+                        parameters=options["parameters"] or n,
+                        questions_per_param=options["questions_per_param"],
+                        condition_depth=options["condition_depth"],
+                        answer_density=options["answer_density"],
+                        seed=options["seed"],
+                        prefix="SC",
+                    )
+                    t0 = time.perf_counter()
+                    corpus = generate_corpus(spec)
+                    gen_s = time.perf_counter() - t0
+                    # stessi id SC… a ogni taglia e bulk_create senza signal: nessuna versione
+                    # cambia, quindi via le cache della taglia precedente
+                    cache.clear()
+                    self.stdout.write(f"N={n}: corpus generato in {gen_s:.1f}s ({corpus.answers} risposte)")
+
+                    subst = {
+                        "{lang}": corpus.language_ids[0],
+                        "{lang_b}": corpus.language_ids[-1],
+                        "{param}": corpus.parameter_ids[-1],
+                    }
+                    step = {"n": n, "spec": spec.as_dict(), "generate_seconds": round(gen_s, 2), "results": {}}
+                    for name, url_name, kwargs, query in endpoints:
+                        res = self._drive(client, url_name, kwargs, query, subst)
+                        step["results"][name] = res
+                        self.stdout.write(
+                            f"  {name:<22} {res['median_ms']:>10.1f} ms  {res['peak_kib']:>9.0f} KiB  "
+                            f"{res['queries']:>5} q  [{res['status']}]"
+                        )
+                    report["steps"].append(step)
+                purge_corpus("SC")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=1, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        report["endpoints"] = self._scaling(report["steps"], options["budget_ms"])
+        with open(options["output"], "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+        self.stdout.write("\nScaling (pendenza log-log del tempo rispetto a N, ordinato dal peggiore):")
+        for name, s in sorted(report["endpoints"].items(), key=lambda kv: -(kv[1]["time_exponent"] or 0)):
+            flag = self.style.ERROR(" OVER BUDGET") if s["first_over_budget"] else ""
+            self.stdout.write(
+                f"  {name:<22} time~N^{s['time_exponent']:.2f}  queries~N^{s['query_exponent']:.2f}  "
+                f"mem~N^{s['memory_exponent']:.2f}{flag}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Report scritto in {options['output']}"))
+
+    # ------------------------------------------------------------
+    def _client(self) -> Client:
+        user, _ = User.objects.get_or_create(
+            email="scale-test@example.test",
+            defaults={"role": "admin", "is_staff": True, "is_superuser": True, "name": "Scale", "surname": "Test"},
+        )
+        user.terms_accepted = True
+        user.terms_accepted_at = timezone.now()
+        user.save(update_fields=["terms_accepted", "terms_accepted_at"])
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def _drive(self, client: Client, url_name: str, kwargs: dict, query: dict, subst: Dict[str, str]) -> dict:
+        kwargs = {k: subst.get(v, v) for k, v in kwargs.items()}
+        query = {k: subst.get(v, v) for k, v in query.items()}
+        url = reverse(url_name, kwargs=kwargs)
+
+        def fetch():
+            resp = client.get(url, query)
+            body = b"".join(resp.streaming_content) if getattr(resp, "streaming", False) else resp.content
+            return resp, body
+
+        # latenza: passate senza tracemalloc né cattura delle query, che rallentano ogni allocazione
+        timings: List[float] = []
+        for _ in range(self.repeat):
+            t0 = time.perf_counter()
+            fetch()
+            timings.append((time.perf_counter() - t0) * 1000.0)
+
+        # memoria di picco e numero di query: una passata a parte, non cronometrata
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                resp, body = fetch()
+            _cur, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        queries = len(ctx.captured_queries)
+        status = resp.status_code
+        size = len(body)
+
+        return {
+            "median_ms": round(float(np.median(timings)), 2),
+            "min_ms": round(min(timings), 2),
+            "peak_kib": round(peak / 1024.0, 1),
+            "queries": queries,
+            "status": status,
+            "bytes": size,
+        }
+
+    @staticmethod
+    def _slope(xs: List[float], ys: List[float]) -> float | None:
+        pts = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+        if len(pts) < 2:
+            return None
+        lx, ly = zip(*pts)
+        return round(float(np.polyfit(lx, ly, 1)[0]), 3)
+
+    def _scaling(self, steps: List[dict], budget_ms: float) -> Dict[str, dict]:
+        out: Dict[str, dict] = {}
+        if not steps:
+            return out
+        for name in steps[0]["results"]:
+            ns = [s["n"] for s in steps]
+            series = [s["results"][name] for s in steps]
+            over = next((s["n"] for s in steps if s["results"][name]["median_ms"] > budget_ms), None)
+            out[name] = {
+                "n": ns,
+                "median_ms": [r["median_ms"] for r in series],
+                "queries": [r["queries"] for r in series],
+                "peak_kib": [r["peak_kib"] for r in series],
+                "time_exponent": self._slope(ns, [r["median_ms"] for r in series]) or 0.0,
+                "query_exponent": self._slope(ns, [r["queries"] for r in series]) or 0.0,
+                "memory_exponent": self._slope(ns, [r["peak_kib"] for r in series]) or 0.0,
+                "first_over_budget": over,
+            }
+        return out
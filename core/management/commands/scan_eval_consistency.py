@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.services.eval_consistency import scan_eval_consistency
+
+
+class Command(BaseCommand):
+    help = (
+        "Verifica su tutto il corpus che value_eval/warning_eval salvati coincidano con la "
+        "rivalutazione delle condizioni. Salva i problemi in EvalConsistencyIssue (report in admin)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Non salva i risultati, stampa solo il riepilogo.")
+        parser.add_argument("--show", type=int, default=20, help="Numero di problemi da stampare (0 = nessuno).")
+
+    def handle(self, *args, **options):
+        report = scan_eval_consistency(persist=not options["dry_run"])
+
+        self.stdout.write(
+            f"Lingue: {report.languages}  Parametri: {report.parameters}  "
+            f"Problemi: {len(report.issues)}  Tempo: {report.seconds}s"
+        )
+        for pid, err in sorted(report.parse_errors.items()):
+            self.stdout.write(self.style.WARNING(f"Condizione non parsabile {pid}: {err}"))
+
+        for lid, pid, reason, sv, ev, sw, ew in report.issues[:max(0, options["show"])]:
+            self.stdout.write(f"  {lid} {pid} [{reason}] salvato={sv or '—'}/{int(sw)} atteso={ev or '—'}/{int(ew)}")
+
+        if report.issues:
+            self.stdout.write(self.style.WARNING("Eval non allineati: rieseguire il DAG sulle lingue interessate."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Tutti gli eval sono coerenti."))
@@ -43,7 +43,7 @@ class Command(BaseCommand):
                 id="FGM",
                 name="Feature Gender Marker",
                 short_description="Parametro demo",
-                position=1,
+                requested_rank=1,
                 is_active=True,
             )
         if not ParameterDef.objects.filter(id="FGK").exists():
@@ -51,7 +51,7 @@ class Command(BaseCommand):
                 id="FGK",
                 name="Feature Gender Knowledge",
                 short_description="Altro parametro demo",
-                position=2,
+                requested_rank=2,
                 is_active=True,
             )
         self.stdout.write(self.style.SUCCESS("Parametri demo creati"))
@@ -61,7 +61,7 @@ class Command(BaseCommand):
             id="ita",
             defaults={
                 "name_full": "Italiano",
-                "position": 1,
+                "requested_rank": 1,
                 "informant": "Informant Demo",
                 "supervisor": "Supervisor Demo",
             },
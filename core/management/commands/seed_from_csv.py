@@ -17,6 +17,7 @@ from core.models import (
     LanguageParameter, Motivation, Answer, Example,
     AnswerMotivation, LanguageParameterEval, AnswerStatus
 )
+from core.services.final_values import bump_final_values
 
 DATA_DIR = "data"  # directory con i file .xlsx e/o .csv
 
@@ -171,7 +172,7 @@ class Command(BaseCommand):
                 defaults={
                     "name": _coerce_str(r.get("name", "")) or "",
                     "short_description": parse_null(_coerce_str(r.get("short_description"))),
-                    "position": int(r.get("position")) if r.get("position") not in (None, "") else 0,
+                    "requested_rank": int(r.get("position")) if r.get("position") not in (None, "") else 0,
                     "is_active": bool(parse_bool(r.get("is_active", True))),
                     "implicational_condition": parse_null(_coerce_str(r.get("implicational_condition"))),
                     "warning_default": bool(parse_bool(r.get("warning_default", False))),
@@ -192,7 +193,7 @@ class Command(BaseCommand):
                 id=lid,
                 defaults={
                     "name_full": _coerce_str(r.get("name_full", "")) or "",
-                    "position": int(r.get("position")) if r.get("position") not in (None, "") else 0,
+                    "requested_rank": int(r.get("position")) if r.get("position") not in (None, "") else 0,
                     "grp": parse_null(_coerce_str(r.get("grp"))),
                     "isocode": parse_null(_coerce_str(r.get("isocode"))),
                     "glottocode": parse_null(_coerce_str(r.get("glottocode"))),
@@ -339,4 +340,6 @@ class Command(BaseCommand):
         if rows:
             self.stdout.write(self.style.SUCCESS(_status_line("LanguageParameterEval", src_eval)))
 
+        lang_ids = list(Language.objects.values_list("id", flat=True))
+        transaction.on_commit(lambda: bump_final_values(*lang_ids))
         self.stdout.write(self.style.SUCCESS("Seed completato (Excel/CSV)."))
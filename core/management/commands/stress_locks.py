@@ -0,0 +1,231 @@
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core.models import Language, LanguageParameter, ParameterDef, Question
+from core.services.answer_save import QuestionPayload, SavePayload, save_answers
+from core.services.dag_eval import run_dag_for_language
+from core.services.param_consolidate import consolidate_parameter_for_language
+from core.services.synthetic import SyntheticSpec, generate_corpus, purge_corpus
+
+
+# SQLSTATE PostgreSQL classificati nel report
+DEADLOCK = "40P01"
+LOCK_TIMEOUT = "55P03"
+SERIALIZATION = "40001"
+
+
+def _sqlstate(exc: BaseException) -> str:
+    cause = exc.__cause__ or exc
+    return getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None) or ""
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress test di concorrenza: su un database PostgreSQL temporaneo con corpus sintetico, "
+        "thread paralleli salvano risposte (save_answers + consolidamento) ed eseguono il DAG "
+        "sulle stesse lingue. Riporta throughput, latenze, deadlock e LanguageParameter non allineati."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--languages", type=int, default=3,
+                            help="Lingue del corpus (poche = più contesa sulla stessa lingua).")
+        parser.add_argument("--parameters", type=int, default=30)
+        parser.add_argument("--questions-per-param", dest="questions_per_param", type=int, default=3)
+        parser.add_argument("--condition-depth", dest="condition_depth", type=int, default=2)
+        parser.add_argument("--savers", type=int, default=8, help="Thread che salvano risposte.")
+        parser.add_argument("--dag-runners", dest="dag_runners", type=int, default=2, help="Thread che eseguono il DAG.")
+        parser.add_argument("--duration", type=float, default=20.0, help="Durata in secondi.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--coarse", action="store_true",
+                            help="Confronto: ogni operazione blocca prima la riga Language (schema precedente).")
+        parser.add_argument("--keepdb", action="store_true", help="Riusa/non distrugge il DB temporaneo.")
+        parser.add_argument("--output", default="stress_locks.json")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Lo stress test richiede PostgreSQL.")
+        if options["savers"] < 1 and options["dag_runners"] < 1:
+            raise CommandError("Serve almeno un thread (--savers o --dag-runners).")
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        scratch = connection.creation.create_test_db(verbosity=1, autoclobber=True, keepdb=options["keepdb"])
+        self.stdout.write(f"Database temporaneo: {scratch}")
+
+        try:
+            purge_corpus("ST")
+            spec = SyntheticSpec(
+                languages=options["languages"],
+                parameters=options["parameters"],
+                questions_per_param=options["questions_per_param"],
+                condition_depth=options["condition_depth"],
+                answer_density=0.9,
+                seed=options["seed"],
+                prefix="ST",
+            )
+            corpus = generate_corpus(spec)
+            self.stdout.write(
+                f"Corpus: {len(corpus.language_ids)} lingue, {len(corpus.parameter_ids)} parametri, "
+                f"{corpus.answers} risposte"
+            )
+            report = self._run(corpus, options)
+            report["stale_language_parameters"] = self._stale(corpus)
+            purge_corpus("ST")
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=1, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        report.update({
+            "created_at": timezone.now().isoformat(),
+            "spec": spec.as_dict(),
+            "savers": options["savers"],
+            "dag_runners": options["dag_runners"],
+            "coarse": options["coarse"],
+        })
+        with open(options["output"], "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+        self.stdout.write(f"\nDurata {report['elapsed_seconds']}s, schema {'coarse' if options['coarse'] else 'fine'}:")
+        for name, r in report["ops"].items():
+            self.stdout.write(
+                f"  {name:<6} {r['ok']:>6} ok  {r['throughput_per_s']:>8.1f}/s  "
+                f"p50 {r['p50_ms']:>8.1f} ms  p95 {r['p95_ms']:>8.1f} ms  max {r['max_ms']:>8.1f} ms  "
+                f"deadlock {r['deadlocks']}  errori {r['errors']}"
+            )
+        stale = report["stale_language_parameters"]
+        style = self.style.ERROR if (report["deadlocks"] or stale) else self.style.SUCCESS
+        self.stdout.write(style(f"Deadlock totali: {report['deadlocks']}  LanguageParameter non allineati: {stale}"))
+        self.stdout.write(self.style.SUCCESS(f"Report scritto in {options['output']}"))
+
+    # ------------------------------------------------------------
+    # Carico
+    # ------------------------------------------------------------
+    def _run(self, corpus, options) -> dict:
+        questions: Dict[str, List[str]] = defaultdict(list)
+        for pid, qid in (
+            Question.objects.filter(parameter_id__in=corpus.parameter_ids)
+            .order_by("parameter_id", "id").values_list("parameter_id", "id")
+        ):
+            questions[pid].append(qid)
+        languages = list(Language.objects.filter(id__in=corpus.language_ids))
+        coarse = options["coarse"]
+
+        def locked(lang_id: str, fn: Callable[[], object]) -> None:
+            with transaction.atomic():
+                if coarse:
+                    Language.objects.select_for_update().get(pk=lang_id)
+                fn()
+
+        def save_op(rng: random.Random) -> None:
+            lang = rng.choice(languages)
+            pid = rng.choice(corpus.parameter_ids)
+            payload = SavePayload()
+            for qid in questions[pid]:
+                qp = QuestionPayload(qid, response_text=rng.choice(("yes", "no")), comments=f"stress {rng.random():.6f}")
+                if qp.response_text == "yes":
+                    qp.new_examples = {"a": {"textarea": "stress a"}, "b": {"textarea": "stress b"}}
+                payload.questions[qid] = qp
+            # il consolidamento parte in on_commit: è incluso nella latenza del salvataggio
+            locked(lang.id, lambda: save_answers(lang, pid, payload))
+
+        def dag_op(rng: random.Random) -> None:
+            lang_id = rng.choice(corpus.language_ids)
+            locked(lang_id, lambda: run_dag_for_language(lang_id))
+
+        timings: Dict[str, List[float]] = defaultdict(list)
+        failures: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        samples: List[str] = []
+        mutex = threading.Lock()
+        deadline = time.perf_counter() + options["duration"]
+
+        def worker(name: str, op: Callable[[random.Random], None], seed: int) -> None:
+            rng = random.Random(seed)
+            try:
+                while time.perf_counter() < deadline:
+                    t0 = time.perf_counter()
+                    try:
+                        op(rng)
+                    except Exception as e:  # un errore non ferma il thread: finisce nel report
+                        state = _sqlstate(e)
+                        kind = {DEADLOCK: "deadlock", LOCK_TIMEOUT: "lock_timeout",
+                                SERIALIZATION: "serialization"}.get(state, "error")
+                        with mutex:
+                            failures[name][kind] += 1
+                            if kind == "error" and len(samples) < 10:
+                                samples.append(f"{name}: {e}")
+                        continue
+                    with mutex:
+                        timings[name].append((time.perf_counter() - t0) * 1000.0)
+            finally:
+                connection.close()  # una connessione per thread
+
+        threads = [
+            threading.Thread(target=worker, args=("save", save_op, options["seed"] + i), daemon=True)
+            for i in range(options["savers"])
+        ] + [
+            threading.Thread(target=worker, args=("dag", dag_op, options["seed"] + 1000 + i), daemon=True)
+            for i in range(options["dag_runners"])
+        ]
+        t_start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t_start
+
+        ops = {}
+        for name in ("save", "dag"):
+            ts = timings.get(name, [])
+            fails = failures.get(name, {})
+            ops[name] = {
+                "ok": len(ts),
+                "throughput_per_s": round(len(ts) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(statistics.median(ts), 2) if ts else 0.0,
+                "p95_ms": round(_pct(ts, 0.95), 2),
+                "max_ms": round(max(ts), 2) if ts else 0.0,
+                "deadlocks": fails.get("deadlock", 0),
+                "lock_timeouts": fails.get("lock_timeout", 0),
+                "serialization_failures": fails.get("serialization", 0),
+                "errors": fails.get("error", 0),
+            }
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "ops": ops,
+            "deadlocks": sum(o["deadlocks"] for o in ops.values()),
+            "error_samples": samples,
+        }
+
+    # ------------------------------------------------------------
+    # Verifica finale: value_orig/warning_orig coincidono con un ricalcolo da zero?
+    # ------------------------------------------------------------
+    def _stale(self, corpus) -> int:
+        params = {p.id: p for p in ParameterDef.objects.filter(id__in=corpus.parameter_ids)}
+        stale = 0
+        for lang in Language.objects.filter(id__in=corpus.language_ids):
+            stored = {
+                lp.parameter_id: (lp.value_orig, lp.warning_orig)
+                for lp in LanguageParameter.objects.filter(language=lang, parameter_id__in=params)
+            }
+            for pid, param in params.items():
+                value, warning = consolidate_parameter_for_language(lang, param)
+                if stored.get(pid, (None, False)) != (value, bool(warning)):
+                    stale += 1
+        return stale
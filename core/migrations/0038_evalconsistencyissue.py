@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_sitecontent_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvalConsistencyIssue',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('reason', models.CharField(choices=[('value', 'Valore diverso'), ('warning', 'Warning diverso'), ('missing_eval', 'Eval mancante')], max_length=20)),
+                ('stored_value', models.CharField(blank=True, max_length=1, null=True)),
+                ('expected_value', models.CharField(blank=True, max_length=1, null=True)),
+                ('stored_warning', models.BooleanField(default=False)),
+                ('expected_warning', models.BooleanField(default=False)),
+                ('detected_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eval_issues', to='core.language')),
+                ('parameter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eval_issues', to='core.parameterdef')),
+            ],
+            options={
+                'ordering': ['language__position', 'parameter__position'],
+                'indexes': [models.Index(fields=['parameter'], name='core_evalco_paramet_58e211_idx'), models.Index(fields=['reason'], name='core_evalco_reason_441fec_idx')],
+                'constraints': [models.UniqueConstraint(fields=('language', 'parameter'), name='uq_eval_issue_lang_param')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_progress(apps, schema_editor):
+    from django.db.models import Count, Max, Q
+
+    Language = apps.get_model("core", "Language")
+    Answer = apps.get_model("core", "Answer")
+    LanguageProgress = apps.get_model("core", "LanguageProgress")
+
+    rows = {
+        r["language_id"]: r
+        for r in Answer.objects.values("language_id").annotate(
+            total=Count("id"),
+            answered=Count("id", filter=Q(question__parameter__is_active=True)),
+            pending=Count("id", filter=Q(status="pending")),
+            waiting=Count("id", filter=Q(status="waiting_for_approval")),
+            approved=Count("id", filter=Q(status="approved")),
+            rejected=Count("id", filter=Q(status="rejected")),
+            last_change=Max("updated_at"),
+        )
+    }
+    objs = []
+    for lid in Language.objects.values_list("id", flat=True):
+        r = rows.get(lid, {})
+        if r.get("waiting"):
+            overall = "waiting_for_approval"
+        elif r.get("approved"):
+            overall = "approved"
+        elif r.get("rejected"):
+            overall = "rejected"
+        else:
+            overall = "pending"
+        objs.append(LanguageProgress(
+            language_id=lid,
+            answered=r.get("answered", 0), total=r.get("total", 0),
+            pending=r.get("pending", 0), waiting=r.get("waiting", 0),
+            approved=r.get("approved", 0), rejected=r.get("rejected", 0),
+            last_change=r.get("last_change"), overall=overall,
+        ))
+    LanguageProgress.objects.bulk_create(objs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_evalconsistencyissue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LanguageProgress',
+            fields=[
+                ('language', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress', serialize=False, to='core.language')),
+                ('answered', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('waiting', models.PositiveIntegerField(default=0)),
+                ('approved', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('last_change', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('overall', models.CharField(choices=[('pending', 'Pending'), ('waiting_for_approval', 'Waiting for approval'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=24)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['overall'], name='core_langua_overall_22f086_idx'), models.Index(fields=['answered'], name='core_langua_answere_ec0fa1_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:20
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_languageprogress'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='glossary',
+            name='search_text',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.functions.text.Concat(models.F('word'), models.Value(' '), models.F('description'), output_field=models.TextField())), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='language',
+            name='search_text',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.functions.text.Concat(models.F('id'), models.Value(' '), models.F('name_full'), models.Value(' '), models.F('isocode'), models.Value(' '), models.F('glottocode'), models.Value(' '), models.F('grp'), models.Value(' '), models.F('informant'), models.Value(' '), models.F('supervisor'), models.Value(' '), models.F('family'), models.Value(' '), models.F('top_level_family'), models.Value(' '), models.F('source'), models.Value(' '), models.F('location'), output_field=models.TextField())), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='search_text',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.functions.text.Concat(models.F('id'), models.Value(' '), models.F('parameter_id'), models.Value(' '), models.F('text'), output_field=models.TextField())), output_field=models.TextField()),
+        ),
+        migrations.AddIndex(
+            model_name='glossary',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='glossary_search_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='language',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='language_search_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='question_search_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:40
+
+from django.db import migrations
+
+# Language/ParameterDef.position diventano chiavi a intervalli (core.services.ordering):
+# stesso ordine, valori distanziati di 1024 (all'indietro: di nuovo 1..N).
+SPREAD = """
+UPDATE {table} AS t SET position = r.rn * {gap}
+FROM (SELECT id, row_number() OVER (ORDER BY position, id) AS rn FROM {table}) AS r
+WHERE t.id = r.id;
+"""
+
+
+def _sql(gap):
+    return "".join(SPREAD.format(table=t, gap=gap) for t in ("core_language", "core_parameterdef"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_search_text'),
+    ]
+
+    operations = [
+        migrations.RunSQL(_sql(1024), reverse_sql=_sql(1)),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_sparse_positions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionKeyIndex',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('questions', models.JSONField(default=list)),
+                ('parameters', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='snapshot',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='key_index',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='submissions', to='core.submissionkeyindex'),
+        ),
+    ]
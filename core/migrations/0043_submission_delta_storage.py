@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_submission_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='dependents', to='core.submission'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='storage',
+            field=models.CharField(choices=[('legacy', 'Legacy rows'), ('full', 'Full'), ('delta', 'Delta'), ('ref', 'Reference')], default='legacy', max_length=8),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['language', 'content_hash'], name='core_submis_languag_0a1f7a_idx'),
+        ),
+        # gli snapshot compatti già scritti sono completi
+        migrations.RunSQL(
+            "UPDATE core_submission SET storage = 'full' WHERE snapshot IS NOT NULL;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_submission_backup_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParamValueHistory',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('parameter_id', models.CharField(max_length=20)),
+                ('changed_at', models.DateTimeField()),
+                ('value_eval', models.CharField(blank=True, max_length=1, null=True)),
+                ('previous', models.CharField(blank=True, max_length=1, null=True)),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='param_history', to='core.language')),
+                ('submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.submission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['parameter_id', 'changed_at'], name='core_paramv_paramet_16cf8d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('language', 'parameter_id', 'changed_at'), name='uq_param_history_point')],
+            },
+        ),
+    ]
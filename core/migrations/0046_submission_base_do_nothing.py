@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_param_value_history'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='dependents', to='core.submission'),
+        ),
+    ]
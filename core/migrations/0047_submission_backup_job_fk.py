@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_submission_base_do_nothing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='backup_job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='core.submissionbackupjob'),
+        ),
+    ]
@@ -1,10 +1,11 @@
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
-from django.db import models, transaction, connection
-from django.db.models.functions import Lower
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models, transaction
+from django.db.models.functions import Concat, Lower
 from django.utils import timezone
-from django.db.models import Q, F, Max, UniqueConstraint, Deferrable
-from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db.models import Q, F, UniqueConstraint, Deferrable
+from django.core.exceptions import ValidationError
 from django.conf import settings
 
 
@@ -73,6 +74,19 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+def search_document(*fields):
+    """
+    Espressione del campo generato 'search_text': i campi indicati in minuscolo,
+    separati da spazi (NULL -> ''). Indicizzato con GIN gin_trgm_ops, vedi core.services.search.
+    """
+    parts = []
+    for f in fields:
+        if parts:
+            parts.append(models.Value(" "))
+        parts.append(F(f))
+    return Lower(Concat(*parts, output_field=models.TextField()))
+
+
 # =============
 # GLOSSARY
 # =============
@@ -80,6 +94,11 @@ class Glossary(models.Model):
     id = models.BigAutoField(primary_key=True) 
     word = models.CharField(max_length=255, unique=True)
     description = models.TextField()
+    search_text = models.GeneratedField(
+        expression=search_document("word", "description"),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
 
     class Meta:
         constraints = [
@@ -88,6 +107,9 @@ class Glossary(models.Model):
                 name="uq_glossary_word_lower"
             )
         ]
+        indexes = [
+            GinIndex(fields=["search_text"], opclasses=["gin_trgm_ops"], name="glossary_search_trgm"),
+        ]
 
     def __str__(self):
         return self.word
@@ -96,11 +118,59 @@ class Glossary(models.Model):
 # =============
 # LANGUAGE
 # =============
-from django.db import models, transaction, connection
-from django.db.models import F, Max, UniqueConstraint, Deferrable
-from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.db.models import F, UniqueConstraint, Deferrable
+from django.core.exceptions import ValidationError
+
+
+class GapOrderedMixin:
+    """
+    'position' di Language/ParameterDef è la chiave a intervalli di
+    core.services.ordering, non un rango: per inserire o spostare una riga al
+    rango N si assegna requested_rank = N (anche come argomento di create /
+    update_or_create) e si salva (vedi _save_ordered).
+    """
 
-class Language(models.Model):
+    @property
+    def requested_rank(self):
+        return getattr(self, "_requested_rank", None)
+
+    @requested_rank.setter
+    def requested_rank(self, value):
+        self._requested_rank = value
+
+
+def _save_ordered(obj, save, *args, **kwargs):
+    """
+    Salvataggio di Language/ParameterDef. Il rango richiesto (requested_rank,
+    1..N come prima) diventa una chiave a intervalli; senza rango la riga va in
+    coda (insert) o resta dov'è (update: si riscrive la chiave in tabella).
+    Solo insert e spostamenti prendono il lock dell'ordinamento; le altre
+    modifiche toccano solo la riga.
+    """
+    from core.services.ordering import lock_ordering, next_position, position_for_rank, rank_of
+
+    model = type(obj)
+    rank = obj.requested_rank
+    requested = rank if rank and rank >= 1 else None
+    obj.requested_rank = None  # vale per questo salvataggio
+    if not (obj._state.adding or obj.pk is None):
+        stored = model.objects.filter(pk=obj.pk).values_list("position", flat=True).first()
+        if stored is not None and (
+            requested is None or rank_of(model(pk=obj.pk, position=stored)) == requested
+        ):
+            obj.position = stored
+            return save(*args, **kwargs)
+
+    with transaction.atomic():
+        lock_ordering(model)
+        obj.position = (
+            position_for_rank(model, requested, exclude_pk=obj.pk) if requested else next_position(model)
+        )
+        return save(*args, **kwargs)
+
+
+class Language(GapOrderedMixin, models.Model):
     id = models.CharField(primary_key=True, max_length=10)  
     name_full = models.CharField(max_length=255)
 
@@ -121,6 +191,14 @@ class Language(models.Model):
     assigned_user = models.ForeignKey(
         "core.User", null=True, blank=True, on_delete=models.SET_NULL, related_name="languages"
     )
+    search_text = models.GeneratedField(
+        expression=search_document(
+            "id", "name_full", "isocode", "glottocode", "grp", "informant",
+            "supervisor", "family", "top_level_family", "source", "location",
+        ),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
 
     class Meta:
         indexes = [
@@ -128,6 +206,7 @@ class Language(models.Model):
             models.Index(fields=["assigned_user"]),
             models.Index(fields=["family"]),
             models.Index(fields=["top_level_family"]),
+            GinIndex(fields=["search_text"], opclasses=["gin_trgm_ops"], name="language_search_trgm"),
 
         ]
         ordering = ["position"]
@@ -142,61 +221,14 @@ class Language(models.Model):
     def __str__(self):
         return self.name_full
 
-    def _advisory_lock(self):
-        with connection.cursor() as cur:
-            cur.execute("SELECT pg_advisory_xact_lock(%s);", [123456789])
-
     def save(self, *args, **kwargs):
         """
-        Mantiene 'position' univoca e compatta:
-        - INSERT senza position -> append in coda (max+1)
-        - INSERT con position N -> shifta (>=N) di +1 e inserisce a N
-        - UPDATE old->new:
-            * se new > old: decrementa (old, new] di 1
-            * se new < old: incrementa [new, old) di 1
+        Mantiene 'position' univoca senza shift (vedi _save_ordered):
+        - INSERT senza requested_rank -> in coda
+        - INSERT/UPDATE con requested_rank N -> al rango N, riscrivendo solo questa riga
+          (rinumerazione completa solo se tra i vicini non c'è più spazio)
         """
-        is_new = self._state.adding or self.pk is None
-
-        with transaction.atomic():
-            self._advisory_lock()
-
-            if is_new:
-                # Se manca una position valida, append in coda
-                if not self.position or self.position < 1:
-                    max_pos = type(self).objects.aggregate(m=Max("position"))["m"] or 0
-                    self.position = max_pos + 1
-                    return super().save(*args, **kwargs)
-
-                # Inserisce a position richiesta e shifto le successive
-                type(self).objects.filter(position__gte=self.position).update(position=F("position") + 1)
-                return super().save(*args, **kwargs)
-
-            # UPDATE
-            try:
-                old = type(self).objects.get(pk=self.pk)
-            except ObjectDoesNotExist:
-                return super().save(*args, **kwargs)
-
-            old_pos = old.position
-            new_pos = self.position or old_pos
-
-            if new_pos == old_pos:
-                return super().save(*args, **kwargs)
-
-            if new_pos > old_pos:
-                # sposto in basso: le righe tra (old_pos, new_pos] scalano -1
-                type(self).objects.filter(
-                    position__gt=old_pos,
-                    position__lte=new_pos
-                ).exclude(pk=self.pk).update(position=F("position") - 1)
-            else:
-                # sposto in alto: le righe tra [new_pos, old_pos) scalano +1
-                type(self).objects.filter(
-                    position__gte=new_pos,
-                    position__lt=old_pos
-                ).exclude(pk=self.pk).update(position=F("position") + 1)
-
-            return super().save(*args, **kwargs)
+        _save_ordered(self, super().save, *args, **kwargs)
 
     # Evita che la validazione lato Django blocchi per 'position'
     def validate_unique(self, exclude=None):
@@ -266,7 +298,7 @@ class ParamLevelOfComparison(models.Model):
 # PARAMETER DEFINITIONS
 # =======================
 
-class ParameterDef(models.Model):
+class ParameterDef(GapOrderedMixin, models.Model):
     id = models.CharField(primary_key=True, max_length=10)
     name = models.CharField(max_length=200)
     short_description = models.TextField(blank=True, default="")
@@ -296,50 +328,9 @@ class ParameterDef(models.Model):
             ),
         ]
 
-    def _advisory_lock(self):
-        with connection.cursor() as cur:
-            cur.execute("SELECT pg_advisory_xact_lock(%s);", [987654321])
-
     def save(self, *args, **kwargs):
-        is_new = self._state.adding or self.pk is None
-        with transaction.atomic():
-            self._advisory_lock()
-
-            if is_new:
-                if not self.position:  
-                    max_pos = type(self).objects.aggregate(m=Max("position"))["m"] or 0
-                    self.position = max_pos + 1
-                    return super().save(*args, **kwargs)
-
-                # inserisce a 'position' richiesta e shifto le successive
-                type(self).objects.filter(position__gte=self.position)\
-                    .update(position=F("position") + 1)
-                return super().save(*args, **kwargs)
-
-            # UPDATE (gestione shift ordinamento)
-            try:
-                old = type(self).objects.get(pk=self.pk)
-            except ObjectDoesNotExist:
-                return super().save(*args, **kwargs)
-
-            old_pos = old.position
-            new_pos = self.position or old_pos
-
-            if new_pos == old_pos:
-                return super().save(*args, **kwargs)
-
-            if new_pos > old_pos:
-                type(self).objects.filter(
-                    position__gt=old_pos,
-                    position__lte=new_pos
-                ).exclude(pk=self.pk).update(position=F("position") - 1)
-            else:
-                type(self).objects.filter(
-                    position__gte=new_pos,
-                    position__lt=old_pos
-                ).exclude(pk=self.pk).update(position=F("position") + 1)
-
-            return super().save(*args, **kwargs)
+        # stessa gestione di Language.save (ordinamento a intervalli)
+        _save_ordered(self, super().save, *args, **kwargs)
 
     def validate_unique(self, exclude=None):
         ex = set(exclude or [])
@@ -420,10 +411,17 @@ class Question(models.Model):
         blank=True,
     )
 
+    search_text = models.GeneratedField(
+        expression=search_document("id", "parameter_id", "text"),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
+
     class Meta:
         indexes = [
             models.Index(fields=["parameter"]),
             models.Index(fields=["parameter", "is_stop_question"]),
+            GinIndex(fields=["search_text"], opclasses=["gin_trgm_ops"], name="question_search_trgm"),
         ]
 
     def __str__(self):
@@ -514,6 +512,31 @@ class Answer(models.Model):
         ]
         indexes = [models.Index(fields=["language"]), models.Index(fields=["question"]), models.Index(fields=["language", "status"]),]
 
+
+
+class LanguageProgress(models.Model):
+    """
+    Riepilogo denormalizzato delle risposte di una lingua (conteggi per stato,
+    risposte a domande attive, ultima modifica, stato complessivo).
+    Aggiornato da core.services.language_progress: signal su Answer e chiamate
+    esplicite dopo gli update() massivi di submit/approve/reject/reopen.
+    """
+    language = models.OneToOneField(Language, on_delete=models.CASCADE, primary_key=True, related_name="progress")
+    answered = models.PositiveIntegerField(default=0)  # risposte a domande di parametri attivi
+    total = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    waiting = models.PositiveIntegerField(default=0)
+    approved = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    last_change = models.DateTimeField(null=True, blank=True, db_index=True)
+    overall = models.CharField(max_length=24, choices=AnswerStatus.choices, default=AnswerStatus.PENDING)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["overall"]), models.Index(fields=["answered"])]
+
+    def __str__(self):
+        return f"{self.language_id}: {self.answered} answered ({self.overall})"
         
 class ParameterReviewFlag(models.Model):
     """
@@ -645,9 +668,74 @@ class LanguageParameterEval(models.Model):
         return f"Eval({self.language_parameter_id}): {self.value_eval or 'NULL'}{' !' if self.warning_eval else ''}"
 
 
+# ============================
+# CONSISTENZA EVAL (report sul corpus)
+# ============================
+class EvalConsistencyIssue(models.Model):
+    """
+    Coppie (lingua, parametro) il cui value_eval/warning_eval salvato non coincide
+    con la rivalutazione della condizione sui valori eval correnti.
+    Tabella rigenerata per intero da core.services.eval_consistency.scan_eval_consistency.
+    """
+    REASON_VALUE = "value"
+    REASON_WARNING = "warning"
+    REASON_MISSING = "missing_eval"
+    REASON_CHOICES = (
+        (REASON_VALUE, "Valore diverso"),
+        (REASON_WARNING, "Warning diverso"),
+        (REASON_MISSING, "Eval mancante"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    language = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="eval_issues")
+    parameter = models.ForeignKey(ParameterDef, on_delete=models.CASCADE, related_name="eval_issues")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    stored_value = models.CharField(max_length=1, null=True, blank=True)
+    expected_value = models.CharField(max_length=1, null=True, blank=True)
+    stored_warning = models.BooleanField(default=False)
+    expected_warning = models.BooleanField(default=False)
+    detected_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["language__position", "parameter__position"]
+        constraints = [
+            models.UniqueConstraint(fields=["language", "parameter"], name="uq_eval_issue_lang_param"),
+        ]
+        indexes = [
+            models.Index(fields=["parameter"]),
+            models.Index(fields=["reason"]),
+        ]
+
+    def __str__(self):
+        return f"{self.language_id}/{self.parameter_id}: {self.stored_value or 'NULL'} -> {self.expected_value or 'NULL'}"
+
+
 # ============================
 # AUDIT / SUBMISSION
 # ============================
+class SubmissionKeyIndex(models.Model):
+    """
+    Elenco ordinato di id domanda e parametro, condiviso dagli snapshot compatti:
+    nel blob di Submission le righe sono indici in queste liste (submissions_ui.snapshot).
+    Una riga per combinazione distinta (digest), riusata finché domande e parametri non cambiano.
+    """
+    id = models.BigAutoField(primary_key=True)
+    digest = models.CharField(max_length=64, unique=True)
+    questions = models.JSONField(default=list)
+    parameters = models.JSONField(default=list)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"KeyIndex {self.id} ({len(self.questions)} q, {len(self.parameters)} p)"
+
+
+class SnapshotStorage(models.TextChoices):
+    LEGACY = "legacy", "Legacy rows"
+    FULL = "full", "Full"
+    DELTA = "delta", "Delta"
+    REF = "ref", "Reference"
+
+
 class Submission(models.Model):
     id = models.BigAutoField(primary_key=True)
     language = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="submissions")
@@ -658,12 +746,34 @@ class Submission(models.Model):
     algo_code_hash = models.TextField(null=True, blank=True)
     param_def_checksum = models.TextField(null=True, blank=True)
 
+    # Snapshot compatto: JSON a colonne compresso con zlib, righe indicizzate su key_index.
+    # NULL = snapshot "legacy" nelle tabelle SubmissionAnswer/Motivation/Example/Param.
+    key_index = models.ForeignKey(
+        SubmissionKeyIndex, null=True, blank=True, on_delete=models.PROTECT, related_name="submissions",
+    )
+    snapshot = models.BinaryField(null=True, blank=True)
+    # full: blob completo; delta: differenze rispetto a base (full); ref: identico a base, nessun blob
+    storage = models.CharField(max_length=8, choices=SnapshotStorage.choices, default=SnapshotStorage.LEGACY)
+    # DO_NOTHING: le catene sono gestite da submissions_ui.services.delete_submissions
+    # (ricodifica di chi resta, eliminazione per dipendenza). Il vincolo FK di
+    # PostgreSQL è deferred: il cascade da Language elimina base e dipendenti
+    # nella stessa transazione e viene verificato solo al commit.
+    base = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.DO_NOTHING, related_name="dependents",
+    )
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
+    # backup di tutte le lingue che l'ha creata (per eliminarne le righe se il job si interrompe)
+    backup_job = models.ForeignKey(
+        "SubmissionBackupJob", null=True, blank=True, on_delete=models.SET_NULL, related_name="submissions",
+    )
+
     class Meta:
         indexes = [
             models.Index(fields=["language"]),
             models.Index(fields=["submitted_by"]),
             models.Index(fields=["submitted_at"]),
             models.Index(fields=["language", "submitted_at"]),
+            models.Index(fields=["language", "content_hash"]),
         ]
 
 
@@ -755,6 +865,65 @@ class SubmissionParam(models.Model):
         ]
 
 
+class ParamValueHistory(models.Model):
+    """
+    Storia di value_eval per (lingua, parametro) costruita dalle submission
+    (submissions_ui.history): una riga solo quando il valore cambia rispetto
+    alla riga precedente della coppia; changed_at è il submitted_at della
+    submission in cui il cambio è stato osservato. value_eval NULL = parametro
+    assente dallo snapshot.
+    """
+    id = models.BigAutoField(primary_key=True)
+    language = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="param_history")
+    parameter_id = models.CharField(max_length=20)
+    changed_at = models.DateTimeField()
+    value_eval = models.CharField(max_length=1, null=True, blank=True)
+    previous = models.CharField(max_length=1, null=True, blank=True)
+    submission = models.ForeignKey(Submission, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["language", "parameter_id", "changed_at"], name="uq_param_history_point"),
+        ]
+        indexes = [models.Index(fields=["parameter_id", "changed_at"])]
+
+    def __str__(self):
+        return f"{self.language_id}/{self.parameter_id} @ {self.changed_at:%Y-%m-%d}: {self.previous} -> {self.value_eval}"
+
+
+class BackupJobStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    RUNNING = "running", "Running"
+    DONE = "done", "Done"
+    FAILED = "failed", "Failed"
+
+
+class SubmissionBackupJob(models.Model):
+    """
+    Backup di tutte le lingue eseguito in background (submissions_ui.backup).
+    Le submission create condividono submitted_at; done/total e pruned
+    riportano l'avanzamento, letto dalla pagina del backup.
+    """
+    id = models.BigAutoField(primary_key=True)
+    status = models.CharField(max_length=8, choices=BackupJobStatus.choices, default=BackupJobStatus.PENDING)
+    submitted_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="backup_jobs")
+    submitted_at = models.DateTimeField()
+    note = models.TextField(null=True, blank=True)
+    total = models.PositiveIntegerField(default=0)  # lingue da fotografare
+    done = models.PositiveIntegerField(default=0)
+    pruned = models.PositiveIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status"])]
+
+    def __str__(self):
+        return f"Backup {self.submitted_at:%Y-%m-%d %H:%M:%S}: {self.done}/{self.total} ({self.status})"
+
+
 # ============================
 # DYNAMIC SITE CONTENT
 # ============================
@@ -0,0 +1,438 @@
+from __future__ import annotations
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.models import Answer, AnswerMotivation, Example, Language, Question, QuestionAllowedMotivation
+from core.services.language_data_cache import invalidate_fragment
+from core.services.language_progress import refresh_language_progress_on_commit
+from core.services.locks import lock_language_parameters
+from core.services.param_consolidate import recompute_and_persist_language_parameter
+
+
+# ------------------------------------------------------------
+# Salvataggio delle risposte di un parametro (parameter_save, answer_save).
+#
+# Tre fasi:
+#   1) parse: UN passaggio su request.POST -> payload strutturato per domanda
+#      (resp_/com_/mot_<qid>, newex_<qid>_<uid>_<campo>) più modifiche ed
+#      eliminazioni degli esempi esistenti (ex_<id>_<campo>, del_ex_<id>);
+#   2) validazione di tutto il payload prima di scrivere (YES => almeno due
+#      esempi con testo): se fallisce non si salva nulla;
+#   3) applicazione con un numero fisso di statement, indipendente dal numero di
+#      domande: upsert delle Answer, delete/insert delle motivazioni,
+#      delete/bulk_update/bulk_create degli esempi.
+# Le scritture massive non passano dai signal di Answer: ricalcolo del
+# LanguageParameter, avanzamento e frammento della pagina dati sono fatti qui,
+# una volta sola, a transazione confermata.
+#
+# Autosave (autosave_answer): patch JSON di UNA domanda, senza select_for_update.
+# La concorrenza è ottimistica: il client invia la versione letta
+# (Answer.updated_at) e la scrittura è un UPDATE ... WHERE updated_at = versione;
+# zero righe aggiornate => AnswerConflict con la versione corrente.
+# ------------------------------------------------------------
+
+EXAMPLE_FIELDS = ("number", "textarea", "transliteration", "gloss", "translation", "reference")
+NEW_EXAMPLE_PAYLOAD = ("textarea", "transliteration", "gloss", "translation", "reference")
+MIN_YES_EXAMPLES = 2
+RESPONSES = ("yes", "no")
+
+
+class AnswerValidationError(ValueError):
+    """Payload non salvabile; question_ids sono le domande che non passano la validazione."""
+
+    def __init__(self, message: str, question_ids: List[str]):
+        super().__init__(message)
+        self.question_ids = question_ids
+
+
+class AnswerConflict(Exception):
+    """La risposta è cambiata dopo la versione letta dal client."""
+
+    def __init__(self, version: str):
+        super().__init__("This answer was changed by someone else.")
+        self.version = version
+
+
+class AnswerLocked(PermissionError):
+    """Risposta non modificabile (in attesa di revisione o approvata)."""
+
+
+@dataclass
+class QuestionPayload:
+    question_id: str
+    response_text: str = ""
+    comments: str = ""
+    motivation_ids: Set[int] = field(default_factory=set)
+    new_examples: Dict[str, Dict[str, str]] = field(default_factory=dict)  # uid -> campi, in ordine di invio
+
+    @property
+    def answered(self) -> bool:
+        return self.response_text in RESPONSES
+
+
+@dataclass
+class SavePayload:
+    questions: Dict[str, QuestionPayload] = field(default_factory=dict)
+    example_updates: Dict[int, Dict[str, str]] = field(default_factory=dict)  # id esempio -> campi
+    example_deletes: Set[int] = field(default_factory=set)
+
+    @property
+    def answered(self) -> List[QuestionPayload]:
+        return [p for p in self.questions.values() if p.answered]
+
+
+# ------------------------------------------------------------
+# 1) Parse
+# ------------------------------------------------------------
+def _int_set(values: Iterable[str]) -> Set[int]:
+    try:
+        return {int(v) for v in values}
+    except ValueError:
+        return set()
+
+
+def _split_new_example_key(rest: str, qids: Set[str]):
+    """
+    "<qid>_<uid>_<campo>" -> (qid, uid, campo) o None. uid e qid possono contenere
+    '_': vince il prefisso più lungo che sia una domanda del payload.
+    """
+    try:
+        head, fname = rest.rsplit("_", 1)
+    except ValueError:
+        return None
+    if fname not in EXAMPLE_FIELDS:
+        return None
+    cut = head.rfind("_")
+    while cut > 0:
+        if head[:cut] in qids:
+            return head[:cut], head[cut + 1:], fname
+        cut = head.rfind("_", 0, cut)
+    return None
+
+
+def parse_parameter_post(post, question_ids: Iterable[str]) -> SavePayload:
+    """Payload del form di un parametro (data.html / param_questions.html)."""
+    payload = SavePayload(questions={qid: QuestionPayload(qid) for qid in question_ids})
+    qids = set(payload.questions)
+
+    for key, values in post.lists():
+        val = (values[-1] if values else "").strip()  # come QueryDict.get
+        if key.startswith("resp_"):
+            qp = payload.questions.get(key[5:])
+            if qp is not None:
+                qp.response_text = val.lower()
+        elif key.startswith("com_"):
+            qp = payload.questions.get(key[4:])
+            if qp is not None:
+                qp.comments = val
+        elif key.startswith("mot_"):
+            qp = payload.questions.get(key[4:])
+            if qp is not None:
+                qp.motivation_ids = _int_set(values)
+        elif key.startswith("del_ex_"):
+            if val == "1":
+                payload.example_deletes |= _int_set([key[7:]])
+        elif key.startswith("ex_"):
+            try:
+                ex_id, fname = key[3:].split("_", 1)
+                ex_id = int(ex_id)
+            except ValueError:
+                continue
+            if fname in EXAMPLE_FIELDS:
+                payload.example_updates.setdefault(ex_id, {})[fname] = val
+        elif key.startswith("newex_"):
+            parts = _split_new_example_key(key[6:], qids)
+            if parts is not None:
+                qid, uid, fname = parts
+                payload.questions[qid].new_examples.setdefault(uid, {})[fname] = val
+    return payload
+
+
+def parse_answer_post(post, question_id: str) -> SavePayload:
+    """Payload del form di una singola domanda (answer_save: response_text, comments, motivation_ids)."""
+    payload = parse_parameter_post(post, [question_id])
+    qp = payload.questions[question_id]
+    qp.response_text = (post.get("response_text") or "").strip().lower()
+    qp.comments = (post.get("comments") or "").strip()
+    qp.motivation_ids = _int_set(post.getlist("motivation_ids"))
+    return payload
+
+
+# ------------------------------------------------------------
+# 2) + 3) Validazione e applicazione
+# ------------------------------------------------------------
+YES_EXAMPLES_MESSAGE = "If you answer YES, you must provide at least two examples with a non-empty text."
+
+
+def _has_payload(data: Dict[str, str]) -> bool:
+    return any(data.get(f) for f in NEW_EXAMPLE_PAYLOAD)
+
+
+def _yes_examples(existing: List[Example], payload: SavePayload, qp: QuestionPayload) -> int:
+    """Esempi con testo dopo il salvataggio: esistenti non eliminati (col testo aggiornato) + nuovi."""
+    n = sum(
+        1 for ex in existing
+        if ex.id not in payload.example_deletes
+        and payload.example_updates.get(ex.id, {}).get("textarea", (ex.textarea or "").strip())
+    )
+    return n + sum(1 for data in qp.new_examples.values() if data.get("textarea"))
+
+
+def _write_examples(items: List[Tuple[int, List[Example], QuestionPayload]], payload: SavePayload) -> Dict[str, int]:
+    """
+    Eliminazioni, modifiche e nuovi esempi di più risposte in tre statement.
+    items: (id risposta, esempi esistenti, payload della domanda).
+    Restituisce uid -> id degli esempi creati.
+    """
+    ex_del: List[int] = []
+    ex_upd: List[Example] = []
+    upd_fields: Set[str] = set()
+    ex_new: List[Example] = []
+    uids: List[str] = []
+    for answer_id, existing, qp in items:
+        for ex in existing:
+            if ex.id in payload.example_deletes:
+                ex_del.append(ex.id)
+                continue
+            changed = {f: v for f, v in payload.example_updates.get(ex.id, {}).items() if getattr(ex, f) != v}
+            if changed:
+                for f, v in changed.items():
+                    setattr(ex, f, v)
+                upd_fields.update(changed)
+                ex_upd.append(ex)
+        for idx, (uid, data) in enumerate(qp.new_examples.items()):
+            if not _has_payload(data):
+                continue
+            uids.append(uid)
+            ex_new.append(Example(
+                answer_id=answer_id,
+                number=data.get("number") or str(idx + 1),
+                **{f: data.get(f, "") for f in NEW_EXAMPLE_PAYLOAD},
+            ))
+    if ex_del:
+        Example.objects.filter(id__in=ex_del).delete()
+    if ex_upd:
+        Example.objects.bulk_update(ex_upd, sorted(upd_fields))
+    if ex_new:
+        Example.objects.bulk_create(ex_new)
+    return {uid: ex.pk for uid, ex in zip(uids, ex_new)}
+
+
+def _after_commit(lang_id: str, parameter_id: str) -> None:
+    """Consolidamento del parametro, frammento e avanzamento della lingua, a commit avvenuto."""
+    transaction.on_commit(lambda: recompute_and_persist_language_parameter(lang_id, parameter_id))
+    transaction.on_commit(lambda: invalidate_fragment(lang_id, parameter_id))
+    refresh_language_progress_on_commit(lang_id)
+
+
+@transaction.atomic
+def save_answers(lang: Language, parameter_id: str, payload: SavePayload) -> List[str]:
+    """
+    Valida e salva le risposte del payload (solo domande con yes/no).
+    Restituisce gli id delle domande salvate; AnswerValidationError senza scritture.
+    """
+    answered = payload.answered
+    if not answered:
+        return []
+    qids = [p.question_id for p in answered]
+
+    # lock della coppia (lingua, parametro), poi le righe delle risposte (core.services.locks)
+    lock_language_parameters(lang.id, [parameter_id])
+    # letture: risposte (bloccate), esempi, motivazioni ammesse e correnti
+    existing: Dict[str, Answer] = {
+        a.question_id: a
+        for a in Answer.objects.select_for_update().filter(language=lang, question_id__in=qids)
+    }
+    answer_qid = {a.id: qid for qid, a in existing.items()}
+    examples_by_q: Dict[str, List[Example]] = defaultdict(list)
+    for ex in Example.objects.filter(answer_id__in=answer_qid):
+        examples_by_q[answer_qid[ex.answer_id]].append(ex)
+    allowed: Dict[str, Set[int]] = defaultdict(set)
+    for qid, mid in QuestionAllowedMotivation.objects.filter(question_id__in=qids).values_list(
+        "question_id", "motivation_id"
+    ):
+        allowed[qid].add(mid)
+    current_mot: Dict[str, Dict[int, int]] = defaultdict(dict)  # qid -> motivation_id -> id riga
+    for row_id, aid, mid in AnswerMotivation.objects.filter(answer_id__in=answer_qid).values_list(
+        "id", "answer_id", "motivation_id"
+    ):
+        current_mot[answer_qid[aid]][mid] = row_id
+
+    invalid = [
+        p.question_id for p in answered
+        if p.response_text == "yes" and _yes_examples(examples_by_q[p.question_id], payload, p) < MIN_YES_EXAMPLES
+    ]
+    if invalid:
+        raise AnswerValidationError(YES_EXAMPLES_MESSAGE, invalid)
+
+    # risposte: un upsert (le nuove nascono PENDING/modificabili, stato delle esistenti invariato)
+    answers = Answer.objects.bulk_create(
+        [
+            Answer(language=lang, question_id=p.question_id, response_text=p.response_text, comments=p.comments)
+            for p in answered
+        ],
+        update_conflicts=True,
+        unique_fields=["language", "question"],
+        update_fields=["response_text", "comments", "updated_at"],
+    )
+    answer_id = {a.question_id: a.pk for a in answers}
+
+    # motivazioni: diff rispetto alle correnti, filtrate sulle ammesse
+    mot_add: List[AnswerMotivation] = []
+    mot_del: List[int] = []
+    for p in answered:
+        target = p.motivation_ids & allowed[p.question_id]
+        current = current_mot[p.question_id]
+        mot_add += [AnswerMotivation(answer_id=answer_id[p.question_id], motivation_id=m) for m in target - set(current)]
+        mot_del += [row_id for m, row_id in current.items() if m not in target]
+    if mot_del:
+        AnswerMotivation.objects.filter(id__in=mot_del).delete()
+    if mot_add:
+        AnswerMotivation.objects.bulk_create(mot_add, ignore_conflicts=True)
+
+    # esempi: solo quelli delle risposte salvate
+    _write_examples([(answer_id[p.question_id], examples_by_q[p.question_id], p) for p in answered], payload)
+
+    _after_commit(lang.id, parameter_id)
+    return qids
+
+
+# ------------------------------------------------------------
+# Autosave di una domanda (JSON, concorrenza ottimistica)
+# ------------------------------------------------------------
+PATCH_KEYS = ("response_text", "comments", "motivation_ids", "examples")
+
+
+@dataclass
+class AutosaveResult:
+    version: str
+    created: Dict[str, int] = field(default_factory=dict)  # uid client -> id esempio
+    deleted: List[int] = field(default_factory=list)
+
+
+def answer_version(answer: Optional[Answer]) -> str:
+    """Token di versione dato al client: updated_at ISO ("" se la risposta non esiste)."""
+    return answer.updated_at.isoformat() if answer is not None and answer.updated_at else ""
+
+
+def _text(value: Any, key: str) -> str:
+    if value is None:
+        return ""
+    if not isinstance(value, (str, int, float)):
+        raise ValueError(f"'{key}' must be a string.")
+    return str(value).strip()
+
+
+def parse_autosave_patch(data: Any, question_id: str) -> Tuple[SavePayload, Set[str], str]:
+    """
+    Patch JSON -> (payload, chiavi presenti, versione base). Formato:
+      {"version": "...", "response_text": "yes", "comments": "...", "motivation_ids": [1, 2],
+       "examples": {"update": {"<id>": {"textarea": "..."}}, "delete": [<id>],
+                    "create": [{"uid": "...", "textarea": "...", ...}]}}
+    Le chiavi assenti restano invariate. ValueError se il formato non è valido.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Patch must be a JSON object.")
+    qp = QuestionPayload(question_id)
+    payload = SavePayload(questions={question_id: qp})
+    present = {k for k in PATCH_KEYS if k in data}
+
+    if "response_text" in present:
+        qp.response_text = _text(data["response_text"], "response_text").lower()
+    if "comments" in present:
+        qp.comments = _text(data["comments"], "comments")
+    if "motivation_ids" in present:
+        if not isinstance(data["motivation_ids"], list):
+            raise ValueError("'motivation_ids' must be a list.")
+        qp.motivation_ids = _int_set(data["motivation_ids"])
+    if "examples" in present:
+        ex = data["examples"]
+        if not isinstance(ex, dict):
+            raise ValueError("'examples' must be an object.")
+        try:
+            for ex_id, fields in (ex.get("update") or {}).items():
+                payload.example_updates[int(ex_id)] = {
+                    f: _text(v, f) for f, v in fields.items() if f in EXAMPLE_FIELDS
+                }
+            payload.example_deletes = {int(x) for x in ex.get("delete") or []}
+            for i, row in enumerate(ex.get("create") or []):
+                uid = _text(row.get("uid"), "uid") or str(i)
+                qp.new_examples[uid] = {f: _text(v, f) for f, v in row.items() if f in EXAMPLE_FIELDS}
+        except (AttributeError, TypeError):
+            raise ValueError("Malformed 'examples'.")
+    return payload, present, _text(data.get("version"), "version")
+
+
+@transaction.atomic
+def autosave_answer(lang: Language, question: Question, payload: SavePayload, present: Set[str],
+                    version: str, allow_locked: bool = False) -> AutosaveResult:
+    """
+    Applica la patch di una domanda se la risposta è ancora alla versione `version`.
+    AnswerConflict (versione cambiata), AnswerLocked, AnswerValidationError: nessuna scrittura.
+    """
+    qid = question.id
+    qp = payload.questions[qid]
+    answer = Answer.objects.filter(language=lang, question=question).first()
+    if answer_version(answer) != version:
+        raise AnswerConflict(answer_version(answer))
+    if answer is not None and not answer.modifiable and not allow_locked:
+        raise AnswerLocked("This answer is locked (waiting/approved).")
+
+    # stato risultante: le chiavi non inviate restano come sono
+    if "response_text" not in present:
+        qp.response_text = answer.response_text if answer else ""
+    if "comments" not in present:
+        qp.comments = (answer.comments or "") if answer else ""
+    if not qp.answered:
+        raise AnswerValidationError("Invalid answer value.", [qid])
+    existing = list(Example.objects.filter(answer=answer)) if answer and "examples" in present else []
+    if qp.response_text == "yes":
+        if answer and "examples" not in present:
+            existing = list(Example.objects.filter(answer=answer))
+        if _yes_examples(existing, payload, qp) < MIN_YES_EXAMPLES:
+            raise AnswerValidationError(YES_EXAMPLES_MESSAGE, [qid])
+
+    # compare-and-swap sulla versione: la riga resta bloccata fino al commit,
+    # quindi una patch concorrente con la stessa versione trova 0 righe
+    now = timezone.now()
+    if answer is None:
+        try:
+            with transaction.atomic():
+                answer = Answer.objects.create(
+                    language=lang, question=question, response_text=qp.response_text, comments=qp.comments,
+                )
+        except IntegrityError:
+            raise AnswerConflict(answer_version(Answer.objects.filter(language=lang, question=question).first()))
+    else:
+        updated = Answer.objects.filter(pk=answer.pk, updated_at=answer.updated_at).update(
+            response_text=qp.response_text, comments=qp.comments, updated_at=now,
+        )
+        if not updated:
+            raise AnswerConflict(answer_version(Answer.objects.filter(pk=answer.pk).first()))
+        answer.updated_at = now
+
+    if "motivation_ids" in present:
+        target = qp.motivation_ids & set(
+            QuestionAllowedMotivation.objects.filter(question=question).values_list("motivation_id", flat=True)
+        )
+        current = dict(AnswerMotivation.objects.filter(answer=answer).values_list("motivation_id", "id"))
+        stale = [row_id for mid, row_id in current.items() if mid not in target]
+        if stale:
+            AnswerMotivation.objects.filter(id__in=stale).delete()
+        if target - set(current):
+            AnswerMotivation.objects.bulk_create(
+                [AnswerMotivation(answer=answer, motivation_id=mid) for mid in target - set(current)],
+                ignore_conflicts=True,
+            )
+
+    result = AutosaveResult(version=answer_version(answer))
+    if "examples" in present:
+        result.deleted = sorted(ex.id for ex in existing if ex.id in payload.example_deletes)
+        result.created = _write_examples([(answer.pk, existing, qp)], payload)
+
+    _after_commit(lang.id, question.parameter_id)
+    return result
@@ -0,0 +1,335 @@
+from __future__ import annotations
+import itertools
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+from core.models import ParameterDef
+from core.services.logic_parser import CompiledExpression, compile_expression
+from core.services.language_vector import PLUS, MINUS, ZERO, CODES, SYMBOLS
+
+
+# ------------------------------------------------------------
+# Analisi statica delle implicational_condition.
+#
+# Sul grafo ref -> target dei parametri attivi si cercano:
+#   - cicli (con il percorso), che _topo_sort accoderebbe in silenzio
+#   - referenze a parametri inattivi o inesistenti, per cui
+#     _build_graph_active_scope scarterebbe la regola
+#   - condizioni mai vere / sempre vere: ogni parametro ha UN solo valore tra
+#     '+', '-', '0', quindi basta la tabella di verità sulle referenze
+#     (3^k righe, valutate in un colpo con l'espressione compilata)
+#   - parametri "morti": condizione soddisfacibile in astratto ma mai vera con
+#     i valori che le referenze possono davvero assumere (propagati in ordine
+#     topologico: senza condizione {+,-}; con condizione {+,-} se può essere
+#     vera, {0} se può essere falsa). '?' è escluso: la regola non viene valutata.
+# ------------------------------------------------------------
+
+MAX_TRUTH_TABLE_REFS = 12  # 3^12 ≈ 531k righe
+FULL_DOMAIN: FrozenSet[int] = frozenset((PLUS, MINUS, ZERO))
+BASE_DOMAIN: FrozenSet[int] = frozenset((PLUS, MINUS))
+
+
+@lru_cache(maxsize=4096)
+def compiled_condition(expression: str) -> CompiledExpression:
+    """compile_expression con cache per testo: il parsing pyparsing è la parte costosa."""
+    return compile_expression(expression)
+
+
+@dataclass
+class ConditionReport:
+    parameters: int = 0
+    cycles: List[List[str]] = field(default_factory=list)
+    unsatisfiable: List[str] = field(default_factory=list)
+    tautologies: List[str] = field(default_factory=list)
+    dead: List[str] = field(default_factory=list)
+    inactive_refs: Dict[str, List[str]] = field(default_factory=dict)
+    unknown_refs: Dict[str, List[str]] = field(default_factory=dict)
+    parse_errors: Dict[str, str] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)  # troppe referenze per la tabella di verità
+    domains: Dict[str, str] = field(default_factory=dict)  # valori raggiungibili, es. "+-0"
+    ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not (self.cycles or self.unsatisfiable or self.tautologies or self.dead
+                    or self.inactive_refs or self.unknown_refs or self.parse_errors)
+
+    def problems_for(self, pid: str) -> List[str]:
+        """Messaggi leggibili sui problemi che riguardano un parametro."""
+        out: List[str] = []
+        if pid in self.parse_errors:
+            out.append(f"Invalid condition: {self.parse_errors[pid]}")
+        if pid in self.unknown_refs:
+            out.append("Unknown parameters in condition: " + ", ".join(self.unknown_refs[pid]))
+        if pid in self.inactive_refs:
+            out.append("Condition references inactive parameters: " + ", ".join(self.inactive_refs[pid]))
+        for cyc in self.cycles:
+            if pid in cyc:
+                out.append("Cyclic dependency: " + " → ".join(cyc))
+        if pid in self.unsatisfiable:
+            out.append("Condition can never be true: the parameter would always be 0.")
+        if pid in self.tautologies:
+            out.append("Condition is always true: leave it empty instead.")
+        if pid in self.dead:
+            out.append("Condition can never be true given the values its references can take.")
+        return out
+
+
+# ------------------------------------------------------------
+# Cicli: SCC di Tarjan (iterativo) + percorso esplicito dentro ogni componente
+# ------------------------------------------------------------
+def _sccs(graph: Mapping[str, List[str]]) -> List[List[str]]:
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    out: List[List[str]] = []
+    counter = 0
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph.get(root, ())))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, it = work[-1]
+            advanced = False
+            for nxt in it:
+                if nxt not in index:
+                    index[nxt] = low[nxt] = counter
+                    counter += 1
+                    stack.append(nxt)
+                    on_stack.add(nxt)
+                    work.append((nxt, iter(graph.get(nxt, ()))))
+                    advanced = True
+                    break
+                if nxt in on_stack:
+                    low[node] = min(low[node], index[nxt])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                comp = []
+                while True:
+                    w = stack.pop()
+                    on_stack.discard(w)
+                    comp.append(w)
+                    if w == node:
+                        break
+                out.append(comp)
+    return out
+
+
+def _cycle_path(graph: Mapping[str, List[str]], comp: Set[str], start: str) -> List[str]:
+    """Percorso start -> ... -> start restando nella componente (BFS, quindi il più corto)."""
+    prev: Dict[str, str] = {}
+    queue = [start]
+    while queue:
+        nxt_queue = []
+        for u in queue:
+            for v in graph.get(u, ()):
+                if v == start:
+                    path = [u]
+                    while path[-1] != start:
+                        path.append(prev[path[-1]])
+                    return path[::-1] + [start]
+                if v in comp and v not in prev:
+                    prev[v] = u
+                    nxt_queue.append(v)
+        queue = nxt_queue
+    return [start]
+
+
+def find_cycles(graph: Mapping[str, List[str]]) -> List[List[str]]:
+    cycles = []
+    for comp in _sccs(graph):
+        if len(comp) == 1 and comp[0] not in graph.get(comp[0], ()):
+            continue
+        start = min(comp)
+        cycles.append(_cycle_path(graph, set(comp), start))
+    return cycles
+
+
+# ------------------------------------------------------------
+# Tabella di verità
+# ------------------------------------------------------------
+def truth_table(compiled: CompiledExpression,
+                domains: Mapping[str, FrozenSet[int]]) -> Optional[Tuple[bool, bool]]:
+    """
+    (può_essere_vera, può_essere_falsa) enumerando tutte le combinazioni dei
+    valori ammessi per le referenze. None se le referenze sono troppe.
+    Referenze senza dominio (fuori scope) valgono "assente" come nel DAG.
+    """
+    refs = sorted(r for r in compiled.refs if r in domains)
+    if len(refs) > MAX_TRUTH_TABLE_REFS:
+        return None
+    choices = [sorted(domains[r]) for r in refs]
+    rows = np.array(list(itertools.product(*choices)), dtype=np.int8).reshape(-1, len(refs)) \
+        if refs else np.zeros((1, 0), dtype=np.int8)
+    n = rows.shape[0]
+    col = {r: i for i, r in enumerate(refs)}
+    absent = np.zeros(n, dtype=bool)
+
+    def leaf(sign: str, pid: str) -> np.ndarray:
+        i = col.get(pid)
+        return absent if i is None else (rows[:, i] == CODES[sign])
+
+    res = np.broadcast_to(np.asarray(compiled(leaf), dtype=bool), (n,))
+    return bool(res.any()), bool(not res.all())
+
+
+# ------------------------------------------------------------
+# Analisi completa
+# ------------------------------------------------------------
+def _load_conditions() -> Tuple[Dict[str, str], Set[str]]:
+    """({param_id attivo: condizione}, id di tutti i parametri esistenti)."""
+    active: Dict[str, str] = {}
+    all_ids: Set[str] = set()
+    for pid, cond, is_active in ParameterDef.objects.values_list("id", "implicational_condition", "is_active"):
+        all_ids.add(pid)
+        if is_active:
+            active[pid] = (cond or "").strip()
+    return active, all_ids
+
+
+def _topo_order(graph: Mapping[str, List[str]], cyclic: Set[str]) -> List[str]:
+    indeg = {n: 0 for n in graph}
+    for outs in graph.values():
+        for v in outs:
+            indeg[v] += 1
+    queue = [n for n, d in indeg.items() if d == 0]
+    order: List[str] = []
+    while queue:
+        u = queue.pop()
+        order.append(u)
+        for v in graph[u]:
+            indeg[v] -= 1
+            if indeg[v] == 0:
+                queue.append(v)
+    return order + [n for n in graph if n in cyclic and n not in set(order)]
+
+
+def analyze_conditions(conditions: Optional[Mapping[str, str]] = None,
+                       all_ids: Optional[Set[str]] = None) -> ConditionReport:
+    """
+    Analizza le condizioni dei parametri attivi ({param_id: condizione}).
+    Senza argomenti le legge dal DB; ParameterForm passa invece la mappa con la
+    modifica proposta già applicata.
+    """
+    t0 = time.perf_counter()
+    if conditions is None:
+        conditions, all_ids = _load_conditions()
+    active = set(conditions)
+    all_ids = set(all_ids or ()) | active
+    report = ConditionReport(parameters=len(active))
+
+    compiled: Dict[str, CompiledExpression] = {}
+    graph: Dict[str, List[str]] = {pid: [] for pid in active}
+    for pid, cond in conditions.items():
+        if not cond:
+            continue
+        try:
+            c = compiled_condition(cond)
+        except Exception as e:
+            report.parse_errors[pid] = str(e)
+            continue
+        compiled[pid] = c
+        unknown = sorted(r for r in c.refs if r not in all_ids)
+        inactive = sorted(r for r in c.refs if r in all_ids and r not in active)
+        if unknown:
+            report.unknown_refs[pid] = unknown
+        if inactive:
+            report.inactive_refs[pid] = inactive
+        for r in sorted(c.refs & active):
+            graph[r].append(pid)
+
+    report.cycles = find_cycles(graph)
+    cyclic = {p for cyc in report.cycles for p in cyc}
+
+    # 1) soddisfacibilità "logica": ogni referenza attiva può valere + - 0
+    full = {pid: FULL_DOMAIN for pid in active}
+    for pid, c in compiled.items():
+        tt = truth_table(c, full)
+        if tt is None:
+            report.skipped.append(pid)
+            continue
+        can_true, can_false = tt
+        if not can_true:
+            report.unsatisfiable.append(pid)
+        elif not can_false:
+            report.tautologies.append(pid)
+
+    # 2) valori raggiungibili, in ordine topologico (nei cicli: dominio pieno)
+    domains: Dict[str, FrozenSet[int]] = {}
+    for pid in _topo_order(graph, cyclic):
+        c = compiled.get(pid)
+        if pid in cyclic:
+            domains[pid] = FULL_DOMAIN
+            continue
+        if c is None:
+            # senza condizione: + o -; condizione non parsabile: sempre falsa => 0
+            domains[pid] = frozenset((ZERO,)) if pid in report.parse_errors else BASE_DOMAIN
+            continue
+        tt = truth_table(c, domains) if pid not in report.skipped else None
+        if tt is None:
+            domains[pid] = FULL_DOMAIN
+            continue
+        can_true, can_false = tt
+        dom = (BASE_DOMAIN if can_true else frozenset()) | (frozenset((ZERO,)) if can_false else frozenset())
+        domains[pid] = dom
+        if not can_true and pid not in report.unsatisfiable:
+            report.dead.append(pid)
+
+    report.domains = {pid: "".join(SYMBOLS[v] for v in sorted(d)) for pid, d in domains.items()}
+    for lst in (report.unsatisfiable, report.tautologies, report.dead, report.skipped):
+        lst.sort()
+    report.ms = round((time.perf_counter() - t0) * 1000, 2)
+    return report
+
+
+def _refs(condition: str) -> FrozenSet[str]:
+    try:
+        return frozenset(compiled_condition(condition).refs)
+    except Exception:
+        return frozenset()
+
+
+def check_parameter(pid: str, condition: str, is_active: bool = True, old_pid: Optional[str] = None) -> List[str]:
+    """
+    Problemi che la modifica proposta a un parametro introdurrebbe nel grafo
+    (usata da ParameterForm). Lista vuota = ok.
+    `old_pid` è l'id attuale del parametro quando la modifica lo rinomina.
+    """
+    active, all_ids = _load_conditions()
+    before = analyze_conditions(active, all_ids)
+
+    # l'id vecchio esce dal grafo prima di inserire il nuovo
+    if old_pid and old_pid != pid:
+        active.pop(old_pid, None)
+        all_ids.discard(old_pid)
+    if is_active:
+        active[pid] = (condition or "").strip()
+    else:
+        active.pop(pid, None)
+    all_ids.add(pid)
+    report = analyze_conditions(active, all_ids)
+    out = report.problems_for(pid) if is_active else []
+
+    # parametri la cui condizione usa l'id vecchio o nuovo: solo i problemi nuovi
+    touched = {pid, old_pid} - {None, ""}
+    for other in sorted(active):
+        if other == pid or not (_refs(active[other]) & touched):
+            continue
+        known = set(before.problems_for(other)) | set(out)  # i cicli sono già riportati per pid
+        out += [f"Parameter {other}: {msg}" for msg in report.problems_for(other) if msg not in known]
+    return out
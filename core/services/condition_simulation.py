@@ -0,0 +1,167 @@
+from __future__ import annotations
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+import numpy as np
+
+from core.models import ParameterDef
+from core.services.condition_analysis import compiled_condition, find_cycles
+from core.services.dag_eval import _extract_refs
+from core.services.eval_consistency import load_corpus_state, eval_column
+from core.services.language_vector import SYMBOLS
+
+
+# ------------------------------------------------------------
+# Simulazione "what-if" di una modifica a implicational_condition.
+#
+# Niente scritture: si carica lo stato del corpus (orig/eval/warning di tutte le
+# lingue come matrici), si individua il cono a valle del parametro modificato
+# (lui + tutti i parametri attivi che ne dipendono, anche indirettamente) e lo
+# si rivaluta in ordine topologico due volte, con la condizione attuale e con
+# quella proposta, usando le stesse regole vettoriali del DAG (eval_column).
+# Il diff tra le due valutazioni isola l'effetto della sola modifica, anche se
+# qualche eval salvato non fosse allineato.
+# ------------------------------------------------------------
+
+MAX_CHANGED_LANGUAGES = 500
+
+
+class SimulationError(ValueError):
+    """Condizione proposta non valutabile (parse error o ciclo)."""
+
+
+@dataclass
+class SimulationResult:
+    parameter_id: str
+    old_condition: str
+    new_condition: str
+    cone: List[str]
+    languages: int
+    changed: List[Dict[str, object]] = field(default_factory=list)  # per lingua
+    changed_total: int = 0
+    transitions: Dict[str, Dict[str, int]] = field(default_factory=dict)  # param -> {"+→0": n}
+    ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "parameter_id": self.parameter_id,
+            "old_condition": self.old_condition,
+            "new_condition": self.new_condition,
+            "cone": self.cone,
+            "languages": self.languages,
+            "changed_total": self.changed_total,
+            "truncated": self.changed_total > len(self.changed),
+            "transitions": self.transitions,
+            "changed": self.changed,
+            "ms": self.ms,
+        }
+
+
+def _downstream_cone(conditions: Dict[str, str], root: str) -> List[str]:
+    """root e i suoi discendenti, in ordine topologico. SimulationError se c'è un ciclo."""
+    graph: Dict[str, List[str]] = {pid: [] for pid in conditions}
+    for pid, cond in conditions.items():
+        if not cond:
+            continue
+        for r in sorted(_extract_refs(cond)):
+            if r in graph:
+                graph[r].append(pid)
+
+    cone: Set[str] = {root}
+    queue = deque([root])
+    while queue:
+        for v in graph[queue.popleft()]:
+            if v not in cone:
+                cone.add(v)
+                queue.append(v)
+
+    sub = {u: [v for v in graph[u] if v in cone] for u in cone}
+    cycles = find_cycles(sub)
+    if cycles:
+        raise SimulationError("Cyclic dependency: " + " → ".join(cycles[0]))
+
+    indeg = {u: 0 for u in sub}
+    for outs in sub.values():
+        for v in outs:
+            indeg[v] += 1
+    ready = sorted(u for u, d in indeg.items() if d == 0)
+    order: List[str] = []
+    while ready:
+        u = ready.pop(0)
+        order.append(u)
+        for v in sub[u]:
+            indeg[v] -= 1
+            if indeg[v] == 0:
+                ready.append(v)
+    return order
+
+
+def simulate_condition_change(parameter_id: str, new_condition: str) -> SimulationResult:
+    """
+    Diff dei valori eval che si otterrebbero salvando new_condition su parameter_id.
+    Solleva SimulationError se la condizione non è parsabile o crea un ciclo.
+    """
+    t0 = time.perf_counter()
+    new_condition = (new_condition or "").strip()
+    if new_condition:
+        try:
+            compiled_condition(new_condition)
+        except Exception as e:
+            raise SimulationError(f"Invalid condition: {e}")
+
+    conditions = {
+        pid: (cond or "").strip()
+        for pid, cond in ParameterDef.objects.filter(is_active=True).values_list("id", "implicational_condition")
+    }
+    if parameter_id not in conditions:
+        raise SimulationError("Only active parameters are evaluated by the DAG.")
+    old_condition = conditions[parameter_id]
+    proposed = dict(conditions)
+    proposed[parameter_id] = new_condition
+
+    cone = _downstream_cone(proposed, parameter_id)
+    st = load_corpus_state()
+    pos = st.index.pos
+    cols = [pos[pid] for pid in cone if pid in pos]
+
+    def run(conds: Dict[str, str]):
+        codes, warn = st.eval.copy(), st.warn_eval.copy()
+        for j in cols:
+            pid = st.index.ids[j]
+            codes[:, j], warn[:, j], _ = eval_column(
+                codes, warn, pos, st.orig[:, j], st.warn_orig[:, j], conds.get(pid, "")
+            )
+        return codes[:, cols], warn[:, cols]
+
+    before, _ = run(conditions)
+    after, _ = run(proposed)
+
+    result = SimulationResult(
+        parameter_id=parameter_id, old_condition=old_condition, new_condition=new_condition,
+        cone=[st.index.ids[j] for j in cols], languages=len(st.language_ids),
+    )
+
+    diff = before != after
+    for k, j in enumerate(cols):
+        rows = np.flatnonzero(diff[:, k])
+        if len(rows):
+            pairs = Counter(zip(before[rows, k].tolist(), after[rows, k].tolist()))
+            result.transitions[st.index.ids[j]] = {
+                f"{SYMBOLS[b] or '∅'}→{SYMBOLS[a] or '∅'}": n for (b, a), n in sorted(pairs.items())
+            }
+
+    changed_rows = np.flatnonzero(diff.any(axis=1))
+    result.changed_total = len(changed_rows)
+    for i in changed_rows[:MAX_CHANGED_LANGUAGES]:
+        ks = np.flatnonzero(diff[i])
+        result.changed.append({
+            "language_id": st.language_ids[i],
+            "changes": {
+                st.index.ids[cols[k]]: [SYMBOLS[before[i, k]], SYMBOLS[after[i, k]]] for k in ks
+            },
+        })
+
+    result.ms = round((time.perf_counter() - t0) * 1000, 1)
+    return result
@@ -0,0 +1,48 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from core.services.logic_parser import compile_expression
+from core.services.value_index import ValueIndex, get_value_index
+
+
+# ------------------------------------------------------------
+# Query sul corpus con la sintassi di implicational_condition
+# (es. '+FGM & (-SCO | 0ABC)'): l'espressione è compilata una volta e
+# valutata su TUTTE le lingue in un solo passaggio sulle bitmap dell'indice
+# invertito. Un parametro sconosciuto vale "falso" per ogni lingua (come nel
+# parser scalare) ed è riportato in unknown_refs.
+# ------------------------------------------------------------
+
+@dataclass
+class CorpusQueryResult:
+    expression: str
+    language_ids: List[str]
+    total: int
+    unknown_refs: List[str]
+
+    @property
+    def count(self) -> int:
+        return len(self.language_ids)
+
+
+def run_corpus_query(expression: str, idx: Optional[ValueIndex] = None) -> CorpusQueryResult:
+    """Valuta l'espressione su tutte le lingue. Solleva ParseException se l'espressione è invalida."""
+    compiled = compile_expression(expression)
+    idx = idx if idx is not None else get_value_index()
+    n = len(idx.language_ids)
+
+    def leaf(sign: str, pid: str) -> np.ndarray:
+        return idx.match(pid, sign)
+
+    mask = np.asarray(compiled(leaf), dtype=bool)
+    if mask.shape != (n,):
+        mask = np.broadcast_to(mask, (n,))
+    return CorpusQueryResult(
+        expression=compiled.expression,
+        language_ids=idx.languages(mask),
+        total=n,
+        unknown_refs=sorted(r for r in compiled.refs if r not in idx.params),
+    )
@@ -1,8 +1,9 @@
 from __future__ import annotations
-from typing import Dict, Tuple, List, Optional, Set
+from typing import Dict, List, Optional, Set
 from django.db.models import QuerySet
-from core.models import Language, ParameterDef, LanguageParameter, LanguageParameterEval
+from core.models import Language, ParameterDef, LanguageParameter
 from core.services.logic_parser import evaluate_with_parser, pretty_print_expression
+from core.services.language_vector import LanguageVector, ParamIndex, load_sources
 
 # ------------------------------------------------------------
 # 1) ORIG → mantenuto solo per compatibilità (non più usato)
@@ -30,16 +31,8 @@ def build_cond_values_from_eval(lang: Language, active_ids: Set[str]) -> Dict[st
     già calcolati dal DAG. Le referenze con value_eval NULL NON vengono inserite
     (assenza di chiave = ignoto per il parser).
     """
-    vals: Dict[str, str] = {}
-    for pid, ve in (
-        LanguageParameterEval.objects
-        .filter(language_parameter__language=lang,
-                language_parameter__parameter_id__in=active_ids)
-        .values_list("language_parameter__parameter_id", "value_eval")
-    ):
-        if ve in ("+", "-", "0"):
-            vals[pid] = ve
-    return vals
+    index = ParamIndex(sorted(active_ids))
+    return LanguageVector.from_db(lang.pk, index, source="eval").to_dict(only=("+", "-", "0"))
 
 # ------------------------------------------------------------
 # 3) Diagnostica allineata al DAG:
@@ -65,28 +58,15 @@ def diagnostics_for_language(lang: Language) -> List[dict]:
         .only("id", "implicational_condition", "position")
         .order_by("position", "id")
     )
-    active_ids = set(active_params.values_list("id", flat=True))
-
-    # Mappa condizioni basata sui value_eval già prodotti dal DAG
-    cond_values_eval = build_cond_values_from_eval(lang, active_ids)
-
-    # Mappa (orig, eval) per stampa
-    lp_by_pid: Dict[str, Tuple[Optional[str], Optional[str]]] = {pid: (None, None) for pid in active_ids}
+    active_params = list(active_params)
+    index = ParamIndex(p.id for p in active_params)
 
-    for pid, v in (
-        LanguageParameter.objects
-        .filter(language=lang, parameter_id__in=active_ids)
-        .values_list("parameter_id", "value_orig")
-    ):
-        lp_by_pid[pid] = (v, lp_by_pid[pid][1])
+    # Orig ed eval in una sola query, come vettori compatti
+    vecs = load_sources([lang.pk], index, ("orig", "eval"))
+    orig_vec, eval_vec = vecs["orig"][lang.pk], vecs["eval"][lang.pk]
 
-    for pid, ve in (
-        LanguageParameterEval.objects
-        .filter(language_parameter__language=lang,
-                language_parameter__parameter_id__in=active_ids)
-        .values_list("language_parameter__parameter_id","value_eval")
-    ):
-        lp_by_pid[pid] = (lp_by_pid[pid][0], ve)
+    # Mappa condizioni basata sui value_eval già prodotti dal DAG
+    cond_values_eval = eval_vec.to_dict(only=("+", "-", "0"))
 
     rows: List[dict] = []
     for p in active_params:
@@ -121,7 +101,7 @@ def diagnostics_for_language(lang: Language) -> List[dict]:
                 if missing_refs:
                     note_parts.append(f"Missing eval for: {', '.join(sorted(missing_refs))}")
 
-        v_orig, v_eval = lp_by_pid.get(p.id, (None, None))
+        v_orig, v_eval = orig_vec.get(p.id), eval_vec.get(p.id)
 
         rows.append({
             "param_id": p.id,
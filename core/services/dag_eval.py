@@ -10,6 +10,8 @@ from core.models import (
     Language, ParameterDef, LanguageParameter, LanguageParameterEval
 )
 from .logic_parser import evaluate_with_parser
+from .final_values import bump_final_values
+from .locks import lock_language_dag
 
 import logging
 logger = logging.getLogger(__name__)
@@ -55,7 +57,10 @@ def _build_graph_active_scope(active_ids: Set[str]) -> Dict[str, List[str]]:
         if not refs:
             continue
         # Se la cond cita parametri fuori scope, ignora completamente la regola
+        # (segnalata da condition_analysis come inactive/unknown ref)
         if not refs.issubset(active_ids):
+            logger.warning("DAG: rule of %s ignored, references out of scope: %s",
+                           p.id, ", ".join(sorted(refs - active_ids)))
             continue
 
         for r in refs:
@@ -84,7 +89,10 @@ def _topo_sort(graph: Dict[str, List[str]]) -> List[str]:
                 q.append(v)
 
     if len(order) < len(indeg):
-        order.extend([n for n in indeg if n not in order])
+        # nodi in un ciclo: accodati in fondo (vedi condition_analysis.find_cycles per il percorso)
+        leftover = [n for n in indeg if n not in set(order)]
+        logger.warning("DAG: cyclic dependencies among %s", ", ".join(sorted(leftover)))
+        order.extend(leftover)
     return order
 
 
@@ -103,19 +111,35 @@ def _collect_param_values_orig(lang: Language, active_ids: Set[str]) -> Dict[str
     return values
 
 
-# Assicura che nel database esista una riga nella tabella LanguageParameterEval per ospitare il risultato del calcolo.
-def _ensure_eval_row(lang: Language, pid: str, lp_id: int | None) -> LanguageParameterEval:
- 
-    if lp_id is None:
-        lp = LanguageParameter.objects.create(language=lang, parameter_id=pid, value_orig=None, warning_orig=False)
-    else:
-        from core.models import LanguageParameter as LP
-        lp = LP.objects.get(pk=lp_id)
-    lpe, _ = LanguageParameterEval.objects.get_or_create(
-        language_parameter=lp,
-        defaults={"value_eval": "0", "warning_eval": False}
+# Assicura che nel database esistano le righe LanguageParameter/LanguageParameterEval
+# che ospitano il risultato del calcolo, per tutti i parametri attivi.
+# Insert in blocco con ignore_conflicts: un consolidamento concorrente che crea la
+# stessa LanguageParameter non fa fallire il DAG (qui non si prendono lock di coppia).
+def _ensure_eval_rows(lang: Language, active_ids: Set[str]) -> Dict[str, LanguageParameterEval]:
+    existing = set(
+        LanguageParameter.objects.filter(language=lang, parameter_id__in=active_ids)
+        .values_list("parameter_id", flat=True)
     )
-    return lpe
+    if active_ids - existing:
+        LanguageParameter.objects.bulk_create(
+            [
+                LanguageParameter(language=lang, parameter_id=pid, value_orig=None, warning_orig=False)
+                for pid in active_ids - existing
+            ],
+            ignore_conflicts=True,
+        )
+    pid_by_lp: Dict[int, str] = dict(
+        LanguageParameter.objects.filter(language=lang, parameter_id__in=active_ids)
+        .values_list("id", "parameter_id")
+    )
+    LanguageParameterEval.objects.bulk_create(
+        [LanguageParameterEval(language_parameter_id=lp_id, value_eval="0", warning_eval=False) for lp_id in pid_by_lp],
+        ignore_conflicts=True,
+    )
+    return {
+        pid_by_lp[lpe.language_parameter_id]: lpe
+        for lpe in LanguageParameterEval.objects.filter(language_parameter_id__in=pid_by_lp)
+    }
 
 
 
@@ -131,8 +155,10 @@ def run_dag_for_language(language_id: str) -> DagReport:
     - Nessun forcing a '0' per la sola presenza di ref='0'.
     - Warning: si propaga se una qualsiasi referenza è in warning.
     """
-    # blocca la riga del db e recupera gli id attivi
-    lang = Language.objects.select_for_update().get(pk=language_id) 
+    # lock dei soli run DAG di questa lingua: editor e consolidamento proseguono
+    # (core.services.locks); poi gli id attivi
+    lock_language_dag(language_id)
+    lang = Language.objects.get(pk=language_id)
     active_ids = _active_parameter_ids()
 
     # valori originali (+, -, None) per param attivi
@@ -172,6 +198,9 @@ def run_dag_for_language(language_id: str) -> DagReport:
     cond_values: dict[str, str] = {}
     unknown_params: Set[str] = set()
 
+    # Righe di destinazione (create in blocco se mancano)
+    lpe_by_pid = _ensure_eval_rows(lang, active_ids)
+
     # Cache condizioni
     cond_map: dict[str, str] = {
         p.id: (p.implicational_condition or "")
@@ -182,8 +211,8 @@ def run_dag_for_language(language_id: str) -> DagReport:
 
 
     for target in order:
-        lp_id, v_orig = lp_map[target]
-        lpe = _ensure_eval_row(lang, target, lp_id)
+        _lp_id, v_orig = lp_map[target]
+        lpe = lpe_by_pid[target]
         cond = (cond_map.get(target) or "").strip()
 
         # MODIFICA: Gestione parametri base (senza condizione)
@@ -272,6 +301,9 @@ def run_dag_for_language(language_id: str) -> DagReport:
         
         processed.append(target)
 
+    # i valori finali in cache di questa lingua non sono più validi
+    transaction.on_commit(lambda: bump_final_values(language_id))
+
     return DagReport(
         language_id=language_id,
         processed=processed,
@@ -0,0 +1,55 @@
+from __future__ import annotations
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from core.models import Glossary, Language, LanguageProgress, ParameterDef, Question
+from core.services.language_progress import completed_languages_count
+
+
+# ------------------------------------------------------------
+# Snapshot delle statistiche globali della dashboard.
+#
+# Tutte le cifre sono calcolate insieme e tenute in cache per
+# DASHBOARD_STATS_TTL secondi; le scritture rilevanti (lingue, parametri,
+# domande, glossario, risposte: vedi core.signals) invalidano subito lo snapshot.
+# Nessuna query tocca Answer: risposte e lingue complete vengono da
+# LanguageProgress (una riga per lingua).
+# ------------------------------------------------------------
+
+CACHE_KEY = "dashboard_stats"
+
+
+def _compute() -> Dict[str, Any]:
+    total_questions = Question.objects.filter(parameter__is_active=True).count()
+    lang = Language.objects.aggregate(
+        languages=Count("id"),
+        families=Count("family", filter=~Q(family=""), distinct=True),
+    )
+    answers = LanguageProgress.objects.aggregate(n=Sum("total"))["n"]
+    return {
+        "languages": lang["languages"],
+        "completed_languages": completed_languages_count(total_questions),
+        "families": lang["families"],
+        "parameters": ParameterDef.objects.filter(is_active=True).count(),
+        "answers": answers or 0,
+        "glossary": Glossary.objects.count(),
+        "questions": total_questions,
+        "computed_at": timezone.now().isoformat(),
+    }
+
+
+def get_dashboard_stats() -> Dict[str, Any]:
+    """Statistiche globali dallo snapshot in cache (ricalcolate se scadute o invalidate)."""
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = _compute()
+        cache.set(CACHE_KEY, stats, settings.DASHBOARD_STATS_TTL)
+    return dict(stats)
+
+
+def invalidate_dashboard_stats() -> None:
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Language, ParameterDef, LanguageParameter, EvalConsistencyIssue
+from core.services.language_vector import ParamIndex, CODES, SYMBOLS, UNSET, ZERO, UNKNOWN
+from core.services.condition_analysis import compiled_condition
+from core.services.dag_eval import _extract_refs
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------
+# Verifica di coerenza degli eval su tutto il corpus.
+#
+# Per ogni parametro attivo si ricalcola, per TUTTE le lingue insieme, il
+# value_eval/warning_eval che run_dag_for_language scriverebbe partendo dai
+# value_eval correnti delle referenze (come il Check di dag_debug), e lo si
+# confronta con quello salvato. Regole (vedi dag_eval):
+#   - senza condizione: orig mancante o warning_orig => '?', altrimenti orig
+#   - referenza in warning => '?' (warning propagato)
+#   - condizione FALSA => '0'; VERA => orig, oppure '?' se orig manca
+#   - condizione non parsabile => FALSA (come evaluate_with_parser) => '0'
+#   - warning_orig del target => '?' in ogni caso
+# ------------------------------------------------------------
+
+
+@dataclass
+class CorpusEvalState:
+    language_ids: List[str]
+    index: ParamIndex
+    orig: np.ndarray        # int8 codici value_orig
+    warn_orig: np.ndarray   # bool
+    eval: np.ndarray        # int8 codici value_eval
+    warn_eval: np.ndarray   # bool
+    has_eval: np.ndarray    # bool: esiste la riga LanguageParameterEval
+
+
+@dataclass
+class ScanReport:
+    languages: int
+    parameters: int
+    issues: List[Tuple[str, str, str, Optional[str], Optional[str], bool, bool]] = field(default_factory=list)
+    parse_errors: Dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def load_corpus_state(language_ids: Optional[Sequence[str]] = None,
+                      index: Optional[ParamIndex] = None) -> CorpusEvalState:
+    """Orig/eval/warning di tutte le lingue sui parametri attivi, in una query, come matrici."""
+    if language_ids is None:
+        language_ids = list(Language.objects.order_by("position").values_list("id", flat=True))
+    language_ids = list(language_ids)
+    index = index if index is not None else ParamIndex.from_db(active_only=True)
+    shape = (len(language_ids), len(index))
+    st = CorpusEvalState(
+        language_ids=language_ids, index=index,
+        orig=np.zeros(shape, dtype=np.int8), warn_orig=np.zeros(shape, dtype=bool),
+        eval=np.zeros(shape, dtype=np.int8), warn_eval=np.zeros(shape, dtype=bool),
+        has_eval=np.zeros(shape, dtype=bool),
+    )
+    if not language_ids or not len(index):
+        return st
+
+    lpos = {lid: i for i, lid in enumerate(language_ids)}
+    ppos = index.pos
+    rows = (
+        LanguageParameter.objects
+        .filter(parameter_id__in=index.ids)
+        .values_list("language_id", "parameter_id", "value_orig", "warning_orig",
+                     "eval__id", "eval__value_eval", "eval__warning_eval")
+        .iterator(chunk_size=20000)
+    )
+    ri, ci, o, wo, he, e, we = [], [], [], [], [], [], []
+    for lid, pid, v_orig, w_orig, eval_id, v_eval, w_eval in rows:
+        i = lpos.get(lid)
+        if i is None:
+            continue
+        ri.append(i)
+        ci.append(ppos[pid])
+        o.append(CODES.get(v_orig, UNSET))
+        wo.append(bool(w_orig))
+        he.append(eval_id is not None)
+        e.append(CODES.get(v_eval, UNSET))
+        we.append(bool(w_eval))
+    if ri:
+        st.orig[ri, ci] = o
+        st.warn_orig[ri, ci] = wo
+        st.has_eval[ri, ci] = he
+        st.eval[ri, ci] = e
+        st.warn_eval[ri, ci] = we
+    return st
+
+
+def eval_column(codes: np.ndarray, warn: np.ndarray, pos: Dict[str, int],
+                orig: np.ndarray, warn_orig: np.ndarray,
+                cond: str) -> Tuple[np.ndarray, np.ndarray, Optional[str]]:
+    """
+    value_eval/warning_eval di UN parametro per tutte le lingue, date le matrici
+    dei valori/warning correnti delle referenze. Il terzo elemento è l'eventuale
+    errore di parsing (condizione trattata come FALSA, come evaluate_with_parser).
+    """
+    n = codes.shape[0]
+    false_col = np.zeros(n, dtype=bool)
+    no_orig = (orig == UNSET)
+
+    if not cond:
+        w = warn_orig | no_orig
+        return np.where(w, UNKNOWN, orig).astype(np.int8), w, None
+
+    def leaf(sign: str, pid: str) -> np.ndarray:
+        col = pos.get(pid)
+        # referenza fuori scope (inattiva/sconosciuta): assente per il parser => falso
+        return false_col if col is None else (codes[:, col] == CODES[sign])
+
+    refs = [pos[r] for r in _extract_refs(cond) if r in pos]
+    ref_warn = warn[:, refs].any(axis=1) if refs else false_col
+    error = None
+    try:
+        ok = np.broadcast_to(np.asarray(compiled_condition(cond)(leaf), dtype=bool), (n,))
+    except Exception as e:
+        error, ok = str(e), false_col
+    w = warn_orig | ref_warn | (ok & no_orig)
+    return np.where(w, UNKNOWN, np.where(ok, orig, ZERO)).astype(np.int8), w, error
+
+
+def expected_eval(st: CorpusEvalState, conditions: Dict[str, str]) -> Tuple[np.ndarray, np.ndarray, Dict[str, str]]:
+    """
+    value_eval/warning_eval attesi (matrici lingue × parametri) secondo le regole del DAG,
+    valutando ogni condizione su tutte le lingue con un'unica espressione vettoriale.
+    """
+    n, m = st.eval.shape
+    exp = np.zeros((n, m), dtype=np.int8)
+    expw = np.zeros((n, m), dtype=bool)
+    parse_errors: Dict[str, str] = {}
+    pos = st.index.pos
+
+    for j, pid in enumerate(st.index.ids):
+        o, wo = st.orig[:, j], st.warn_orig[:, j]
+        cond = (conditions.get(pid) or "").strip()
+        exp[:, j], expw[:, j], err = eval_column(st.eval, st.warn_eval, pos, o, wo, cond)
+        if err:
+            parse_errors[pid] = err
+
+    return exp, expw, parse_errors
+
+
+def scan_eval_consistency(persist: bool = True) -> ScanReport:
+    """
+    Scansione completa. Con persist=True sostituisce il contenuto di
+    EvalConsistencyIssue con i problemi trovati.
+    Le righe eval mancanti sono segnalate solo per lingue già passate dal DAG.
+    """
+    t0 = time.perf_counter()
+    st = load_corpus_state()
+    conditions = dict(
+        ParameterDef.objects.filter(id__in=st.index.ids).values_list("id", "implicational_condition")
+    )
+    exp, expw, parse_errors = expected_eval(st, conditions)
+
+    evaluated_lang = st.has_eval.any(axis=1, keepdims=True)
+    value_diff = st.has_eval & (st.eval != exp)
+    warn_diff = st.has_eval & ~value_diff & (st.warn_eval != expw)
+    missing = ~st.has_eval & evaluated_lang
+
+    report = ScanReport(languages=len(st.language_ids), parameters=len(st.index), parse_errors=parse_errors)
+    for reason, mask in (
+        (EvalConsistencyIssue.REASON_VALUE, value_diff),
+        (EvalConsistencyIssue.REASON_WARNING, warn_diff),
+        (EvalConsistencyIssue.REASON_MISSING, missing),
+    ):
+        for i, j in zip(*np.nonzero(mask)):
+            report.issues.append((
+                st.language_ids[i], st.index.ids[j], reason,
+                SYMBOLS[st.eval[i, j]] if st.has_eval[i, j] else None,
+                SYMBOLS[exp[i, j]],
+                bool(st.warn_eval[i, j]), bool(expw[i, j]),
+            ))
+
+    if persist:
+        now = timezone.now()
+        with transaction.atomic():
+            EvalConsistencyIssue.objects.all().delete()
+            EvalConsistencyIssue.objects.bulk_create(
+                [
+                    EvalConsistencyIssue(
+                        language_id=lid, parameter_id=pid, reason=reason,
+                        stored_value=sv, expected_value=ev,
+                        stored_warning=sw, expected_warning=ew, detected_at=now,
+                    )
+                    for lid, pid, reason, sv, ev, sw, ew in report.issues
+                ],
+                batch_size=5000,
+            )
+
+    report.seconds = round(time.perf_counter() - t0, 3)
+    logger.info("Eval consistency scan: %d issues on %d languages × %d parameters in %.2fs",
+                len(report.issues), report.languages, report.parameters, report.seconds)
+    return report
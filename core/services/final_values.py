@@ -0,0 +1,113 @@
+from __future__ import annotations
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from django.core.cache import cache
+
+from core.models import LanguageParameter
+from core.services.language_vector import LanguageVector, ParamIndex
+
+
+# ------------------------------------------------------------
+# Risolutore batch dei valori finali (eval > orig).
+#
+# Regola (la stessa di TableA/queries): se esiste la riga LanguageParameterEval
+# vale value_eval (anche se NULL), altrimenti value_orig.
+#
+# Cache: una voce per lingua con la mappa completa param_id -> valore, sotto una
+# versione per lingua. run_dag_for_language e il consolidamento la incrementano
+# (bump_final_values) a commit avvenuto, quindi non serve invalidare a mano.
+# ------------------------------------------------------------
+
+CACHE_TTL = 60 * 60
+_VER_KEY = "final_values:ver:{}"
+_DATA_KEY = "final_values:{}:{}"
+
+
+def bump_final_values(*language_ids: str) -> None:
+    """Invalida la cache dei valori finali per le lingue indicate."""
+    if not language_ids:
+        return
+    now = time.time_ns()
+    cache.set_many({_VER_KEY.format(lid): now for lid in language_ids}, None)
+
+
+def language_versions(language_ids: Sequence[str]) -> Dict[str, int]:
+    """Versione corrente dei valori finali per lingua (cambia a ogni bump_final_values)."""
+    keys = {_VER_KEY.format(lid): lid for lid in language_ids}
+    got = cache.get_many(list(keys))
+    # Versione assente (mai creata o espulsa): ne crea una nuova, così eventuali
+    # dati rimasti in cache sotto una versione precedente non vengono più letti.
+    missing = {k: time.time_ns() for k in keys if k not in got}
+    if missing:
+        cache.set_many(missing, None)
+        got.update(missing)
+    return {lid: got[k] for k, lid in keys.items()}
+
+
+def _load(language_ids: Sequence[str], parameter_ids: Optional[Sequence[str]]) -> Dict[str, Dict[str, Optional[str]]]:
+    """Una sola query per tutte le lingue (ed eventualmente solo alcuni parametri)."""
+    out: Dict[str, Dict[str, Optional[str]]] = {lid: {} for lid in language_ids}
+    qs = LanguageParameter.objects.filter(language_id__in=language_ids)
+    if parameter_ids is not None:
+        qs = qs.filter(parameter_id__in=parameter_ids)
+    for lid, pid, v_orig, eval_id, v_eval in (
+        qs.values_list("language_id", "parameter_id", "value_orig", "eval__id", "eval__value_eval")
+          .iterator(chunk_size=10000)
+    ):
+        out[lid][pid] = v_eval if eval_id is not None else v_orig
+    return out
+
+
+def final_values(language_ids: Iterable[str],
+                 parameter_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Valori finali per un insieme qualunque di lingue e parametri.
+    Ritorna {language_id: {param_id: valore}}; le coppie senza LanguageParameter
+    sono assenti. Le lingue in cache non toccano il DB; le altre sono lette con
+    UNA query (e messe in cache se si sono chiesti tutti i parametri).
+    """
+    lids = list(dict.fromkeys(language_ids))
+    pids = None if parameter_ids is None else list(dict.fromkeys(parameter_ids))
+    if not lids:
+        return {}
+
+    versions = language_versions(lids)
+    data_keys = {_DATA_KEY.format(lid, versions[lid]): lid for lid in lids}
+    cached = cache.get_many(list(data_keys))
+    full: Dict[str, Dict[str, Optional[str]]] = {data_keys[k]: v for k, v in cached.items()}
+
+    misses = [lid for lid in lids if lid not in full]
+    if misses:
+        loaded = _load(misses, pids)
+        if pids is None:
+            cache.set_many({_DATA_KEY.format(lid, versions[lid]): loaded[lid] for lid in misses}, CACHE_TTL)
+        full.update(loaded)
+
+    if pids is None:
+        return {lid: full[lid] for lid in lids}
+    return {lid: {pid: full[lid][pid] for pid in pids if pid in full[lid]} for lid in lids}
+
+
+def final_map(language_id: str) -> Dict[str, Optional[str]]:
+    return final_values([language_id])[language_id]
+
+
+def final_value(language_id: str, parameter_id: str) -> Optional[str]:
+    return final_values([language_id], [parameter_id])[language_id].get(parameter_id)
+
+
+def final_vectors(language_ids: Iterable[str], index: ParamIndex) -> Dict[str, LanguageVector]:
+    """Come final_values, ma come LanguageVector sull'indice dato (per i confronti vettoriali)."""
+    values = final_values(language_ids, None)
+    return {lid: LanguageVector.from_mapping(lid, index, m) for lid, m in values.items()}
+
+
+def languages_with(parameter_id: str, language_ids: Sequence[str]) -> Dict[str, List[str]]:
+    """Raggruppa le lingue per valore finale di un parametro: {'+': [...], '-': [...], ...}."""
+    out: Dict[str, List[str]] = {}
+    for lid, m in final_values(language_ids, [parameter_id]).items():
+        v = m.get(parameter_id)
+        if v is not None:
+            out.setdefault(v, []).append(lid)
+    return out
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence
+
+from django.db.models import F, Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+
+# ------------------------------------------------------------
+# Paginazione keyset ("seek") per le liste ordinabili.
+#
+# Invece di OFFSET (che rilegge e scarta tutte le righe precedenti) la pagina
+# successiva parte dai valori delle chiavi di ordinamento dell'ultima riga
+# mostrata: WHERE (k1, k2, ...) "dopo" (v1, v2, ...) ORDER BY k1, k2 ... LIMIT n.
+# Il cursore è quella tupla di valori, serializzata in una stringa opaca.
+#
+# L'ultima chiave deve essere univoca (es. position) perché l'ordine sia totale.
+# I NULL seguono il default di PostgreSQL (ultimi in ASC, primi in DESC) e sono
+# gestiti esplicitamente, visto che (x > NULL) non è mai vero.
+# ------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class SortKey:
+    field: str
+    descending: bool = False
+    nullable: bool = False
+
+    def order_by(self):
+        f = F(self.field)
+        if self.nullable:
+            return f.desc(nulls_first=True) if self.descending else f.asc(nulls_last=True)
+        return f.desc() if self.descending else f.asc()
+
+    def equal(self, value: Any) -> Q:
+        if value is None:
+            return Q(**{f"{self.field}__isnull": True})
+        return Q(**{self.field: value})
+
+    def after(self, value: Any) -> Optional[Q]:
+        """Righe strettamente successive a value su questa chiave (None = nessuna)."""
+        if value is None:
+            # ASC: i NULL sono in fondo, dopo non c'è nulla; DESC: sono in testa, segue tutto il resto
+            return Q(**{f"{self.field}__isnull": False}) if self.descending else None
+        q = Q(**{f"{self.field}__{'lt' if self.descending else 'gt'}": value})
+        if self.nullable and not self.descending:
+            q |= Q(**{f"{self.field}__isnull": True})
+        return q
+
+
+@dataclass
+class KeysetPage:
+    rows: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+# ------------------------------------------------------------
+# Cursore: lista JSON di valori (datetime/Decimal marcati), base64 url-safe
+# ------------------------------------------------------------
+def _dump(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    if isinstance(v, Decimal):
+        return {"dec": str(v)}
+    return v
+
+
+def _load(v: Any) -> Any:
+    if isinstance(v, dict):
+        if "dt" in v:
+            return parse_datetime(v["dt"])
+        if "dec" in v:
+            return Decimal(v["dec"])
+    return v
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_dump(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, n_keys: int) -> Optional[List[Any]]:
+    """Valori del cursore, o None se il token è assente/malformato (=> prima pagina)."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = [_load(v) for v in json.loads(raw)]
+    except (ValueError, TypeError):
+        return None
+    return values if len(values) == n_keys else None
+
+
+def keyset_filter(keys: Sequence[SortKey], values: Sequence[Any]) -> Q:
+    """OR_i (k_1 = v_1 AND ... AND k_{i-1} = v_{i-1} AND k_i "dopo" v_i)."""
+    out = Q(pk__in=[])
+    prefix = Q()
+    for key, value in zip(keys, values):
+        step = key.after(value)
+        if step is not None:
+            out |= prefix & step
+        prefix &= key.equal(value)
+    return out
+
+
+def keyset_page(qs: QuerySet, keys: Sequence[SortKey], cursor: str = "", size: int = 50) -> KeysetPage:
+    """
+    Una pagina di qs ordinata per keys, a partire dal cursore (vuoto = inizio).
+    Le chiavi possono essere annotazioni già presenti su qs.
+    """
+    qs = qs.order_by(*(k.order_by() for k in keys))
+    values = decode_cursor(cursor, len(keys))
+    if values is not None:
+        qs = qs.filter(keyset_filter(keys, values))
+    rows = list(qs[:size + 1])
+    page = KeysetPage(rows=rows[:size])
+    if len(rows) > size:
+        last = page.rows[-1]
+        page.next_cursor = encode_cursor([getattr(last, k.field) for k in keys])
+    return page
@@ -0,0 +1,148 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.models import Language
+from core.services.final_values import final_vectors
+from core.services.language_vector import ParamIndex, stack, PLUS, MINUS
+
+
+# ------------------------------------------------------------
+# Confronto tra lingue su tutti i parametri attivi.
+#
+# Per ogni coppia (A, B):
+#   shared   = parametri determinati (+/-) in entrambe
+#   agree    = shared con lo stesso valore
+#   disagree = shared con valore opposto
+# Le tre matrici si ottengono con prodotti matriciali sulle maschere one-hot
+# di '+' e '-', a blocchi di righe per limitare la memoria.
+# ------------------------------------------------------------
+
+BLOCK_ROWS = 512
+
+
+@dataclass
+class CorpusMatrix:
+    language_ids: List[str]
+    index: ParamIndex
+    codes: np.ndarray  # int8, lingue × parametri
+    pos: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.pos = {lid: i for i, lid in enumerate(self.language_ids)}
+
+    def row(self, language_id: str) -> int:
+        return self.pos[language_id]
+
+
+@dataclass
+class PairCounts:
+    shared: np.ndarray
+    agree: np.ndarray
+
+    @property
+    def disagree(self) -> np.ndarray:
+        return self.shared - self.agree
+
+
+def corpus_matrix(language_ids: Optional[Sequence[str]] = None,
+                  index: Optional[ParamIndex] = None) -> CorpusMatrix:
+    """Valori finali di tutte (o alcune) le lingue sui parametri attivi, come matrice int8."""
+    if language_ids is None:
+        language_ids = list(Language.objects.order_by("position").values_list("id", flat=True))
+    language_ids = list(language_ids)
+    index = index if index is not None else ParamIndex.from_db(active_only=True)
+    vecs = final_vectors(language_ids, index)
+    codes = stack([vecs[lid] for lid in language_ids]) if language_ids \
+        else np.zeros((0, len(index)), dtype=np.int8)
+    return CorpusMatrix(language_ids=language_ids, index=index, codes=codes)
+
+
+def _masks(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return (codes == PLUS).astype(np.int32), (codes == MINUS).astype(np.int32)
+
+
+def pair_counts(cm: CorpusMatrix, rows: Optional[Sequence[int]] = None) -> PairCounts:
+    """
+    Conteggi per le righe indicate (default: tutte) contro tutte le lingue.
+    Le matrici risultanti sono len(rows) × n_lingue.
+    """
+    P, M = _masks(cm.codes)
+    D = P + M
+    if rows is not None:
+        rows = list(rows)
+        Pl, Ml, Dl = P[rows], M[rows], D[rows]
+    else:
+        Pl, Ml, Dl = P, M, D
+    return PairCounts(shared=Dl @ D.T, agree=Pl @ P.T + Ml @ M.T)
+
+
+def pair_params(cm: CorpusMatrix, a: str, b: str) -> Tuple[List[str], List[str]]:
+    """Id dei parametri in accordo e in disaccordo tra due lingue."""
+    return _pair_params_rows(cm, cm.row(a), cm.row(b))
+
+
+def _pair_params_rows(cm: CorpusMatrix, i: int, j: int) -> Tuple[List[str], List[str]]:
+    va, vb = cm.codes[i], cm.codes[j]
+    det = np.isin(va, (PLUS, MINUS)) & np.isin(vb, (PLUS, MINUS))
+    return cm.index.take(det & (va == vb)), cm.index.take(det & (va != vb))
+
+
+def compare_one_to_all(cm: CorpusMatrix, language_id: str) -> List[Dict[str, object]]:
+    """Una riga per ogni altra lingua del corpus, ordinate per accordo decrescente."""
+    i = cm.row(language_id)
+    pc = pair_counts(cm, [i])
+    shared, agree = pc.shared[0], pc.agree[0]
+    out = []
+    for j, lid in enumerate(cm.language_ids):
+        if j == i:
+            continue
+        s, a = int(shared[j]), int(agree[j])
+        out.append({
+            "language_id": lid,
+            "shared": s,
+            "agree": a,
+            "disagree": s - a,
+            "agreement": (a / s) if s else None,
+        })
+    out.sort(key=lambda r: (-(r["agreement"] or 0.0), -r["shared"], r["language_id"]))
+    return out
+
+
+def iter_pairs(cm: CorpusMatrix, language_id: Optional[str] = None,
+               include_params: bool = False) -> Iterator[Dict[str, object]]:
+    """
+    Tutte le coppie non ordinate (A < B nell'ordine del corpus), oppure una lingua
+    contro tutte se language_id è dato. Con include_params aggiunge le liste
+    dei parametri in accordo/disaccordo.
+    """
+    n = len(cm.language_ids)
+    ids = cm.language_ids
+    if language_id is not None:
+        blocks = [[cm.row(language_id)]]
+    else:
+        blocks = [list(range(s, min(s + BLOCK_ROWS, n))) for s in range(0, n, BLOCK_ROWS)]
+
+    for rows in blocks:
+        pc = pair_counts(cm, rows)
+        for k, i in enumerate(rows):
+            start = 0 if language_id is not None else i + 1
+            for j in range(start, n):
+                if j == i:
+                    continue
+                s, a = int(pc.shared[k, j]), int(pc.agree[k, j])
+                rec: Dict[str, object] = {
+                    "language_a": ids[i],
+                    "language_b": ids[j],
+                    "shared": s,
+                    "agree": a,
+                    "disagree": s - a,
+                    "agreement": round(a / s, 6) if s else None,
+                }
+                if include_params:
+                    agree_ids, disagree_ids = _pair_params_rows(cm, i, j)
+                    rec["agree_params"] = agree_ids
+                    rec["disagree_params"] = disagree_ids
+                yield rec
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# ------------------------------------------------------------
+# Cache dei frammenti per parametro della pagina dati lingua.
+#
+# La pagina carica le domande di ogni parametro su richiesta (HTMX); l'HTML
+# renderizzato è in cache per (lingua, parametro, variante). La variante
+# distingue ciò che cambia il markup senza cambiare i dati (admin/utente,
+# stato della lingua che blocca i campi).
+#
+# Niente delete per chiave: la chiave include tre versioni e un salvataggio
+# ne sostituisce una, rendendo irraggiungibili i frammenti vecchi:
+#   - globale:   domande, motivazioni, parametri (modifiche admin, rare)
+#   - lingua:    import Excel e scritture massive su una lingua
+#   - parametro: salvataggio di risposte/esempi/motivazioni (parameter_save, signal)
+#
+# Il frammento contiene un form: servirlo vecchio farebbe sovrascrivere
+# risposte più recenti al salvataggio. Per questo si usa la cache solo se è
+# condivisa tra i processi (settings.CACHES); con una cache locale al
+# processo (LocMem, Dummy) ogni richiesta renderizza il frammento.
+# ------------------------------------------------------------
+
+_PROCESS_LOCAL_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+_GLOBAL_VER = "langdata:gv"
+_LANG_VER = "langdata:lv:{}"
+_PARAM_VER = "langdata:pv:{}:{}"
+_FRAGMENT = "langdata:{}:{}:{}:{}:{}:{}"
+
+
+def fragments_enabled() -> bool:
+    """True se la cache di default è condivisa tra i worker (non locale al processo)."""
+    return settings.CACHES["default"]["BACKEND"] not in _PROCESS_LOCAL_BACKENDS
+
+
+def _bump(key: str) -> None:
+    cache.set(key, time.time_ns(), None)
+
+
+def invalidate_fragment(language_id: str, parameter_id: str) -> None:
+    _bump(_PARAM_VER.format(language_id, parameter_id))
+
+
+def invalidate_language_fragments(language_id: str) -> None:
+    _bump(_LANG_VER.format(language_id))
+
+
+def invalidate_all_fragments() -> None:
+    _bump(_GLOBAL_VER)
+
+
+def fragment_key(language_id: str, parameter_id: str, variant: str) -> str:
+    """
+    Chiave del frammento con le versioni correnti. Va calcolata UNA volta, prima
+    di leggere i dati: se un salvataggio arriva durante il render, il frammento
+    finisce sotto la chiave vecchia e non viene più servito.
+    """
+    keys = [_GLOBAL_VER, _LANG_VER.format(language_id), _PARAM_VER.format(language_id, parameter_id)]
+    vers = cache.get_many(keys)
+    missing = [k for k in keys if k not in vers]
+    if missing:
+        # versione sparita (cache svuotata o culling): una nuova, mai 0, così
+        # frammenti rimasti sotto chiavi vecchie non tornano raggiungibili
+        for k in missing:
+            cache.add(k, time.time_ns(), None)
+        vers.update(cache.get_many(missing))
+    return _FRAGMENT.format(*(vers.get(k, 0) for k in keys), language_id, parameter_id, variant)
+
+
+def get_fragment(key: str) -> Optional[str]:
+    return cache.get(key) if fragments_enabled() else None
+
+
+def set_fragment(key: str, html: str) -> None:
+    if fragments_enabled():
+        cache.set(key, html, settings.LANGUAGE_DATA_FRAGMENT_TTL)
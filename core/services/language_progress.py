@@ -0,0 +1,126 @@
+from __future__ import annotations
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from core.models import Answer, AnswerStatus, Language, LanguageProgress, Question
+
+
+# ------------------------------------------------------------
+# Avanzamento per lingua (tabella LanguageProgress).
+#
+# Lista lingue, pagina dati e dashboard leggono da qui invece di aggregare
+# Answer a ogni richiesta. Il ricalcolo di una o più lingue è UNA query
+# (aggregati condizionali raggruppati per lingua) + un upsert.
+# Chi scrive Answer:
+#   - save/delete singoli -> signal in core.signals
+#   - update() massivi (submit/approve/reject/reopen), import, corpus
+#     sintetici -> refresh_language_progress esplicito
+#   - attivazione/disattivazione di parametri o domande -> refresh_all_progress
+# ------------------------------------------------------------
+
+_FIELDS = ("answered", "total", "pending", "waiting", "approved", "rejected", "last_change", "overall")
+
+
+def overall_status(waiting: int, approved: int, rejected: int) -> str:
+    """Stato complessivo con priorità WAITING > APPROVED > REJECTED > PENDING."""
+    if waiting:
+        return AnswerStatus.WAITING
+    if approved:
+        return AnswerStatus.APPROVED
+    if rejected:
+        return AnswerStatus.REJECTED
+    return AnswerStatus.PENDING
+
+
+def _compute(language_ids: Iterable[str]) -> Dict[str, LanguageProgress]:
+    lids = list(dict.fromkeys(language_ids))
+    rows = {
+        r["language_id"]: r
+        for r in (
+            Answer.objects
+            .filter(language_id__in=lids)
+            .values("language_id")
+            .annotate(
+                total=Count("id"),
+                answered=Count("id", filter=Q(question__parameter__is_active=True)),
+                pending=Count("id", filter=Q(status=AnswerStatus.PENDING)),
+                waiting=Count("id", filter=Q(status=AnswerStatus.WAITING)),
+                approved=Count("id", filter=Q(status=AnswerStatus.APPROVED)),
+                rejected=Count("id", filter=Q(status=AnswerStatus.REJECTED)),
+                last_change=Max("updated_at"),
+            )
+        )
+    }
+    out: Dict[str, LanguageProgress] = {}
+    for lid in lids:
+        r = rows.get(lid, {})
+        p = LanguageProgress(
+            language_id=lid,
+            answered=r.get("answered", 0), total=r.get("total", 0),
+            pending=r.get("pending", 0), waiting=r.get("waiting", 0),
+            approved=r.get("approved", 0), rejected=r.get("rejected", 0),
+            last_change=r.get("last_change"),
+        )
+        p.overall = overall_status(p.waiting, p.approved, p.rejected)
+        out[lid] = p
+    return out
+
+
+def refresh_language_progress(*language_ids: str) -> Dict[str, LanguageProgress]:
+    """Ricalcola e salva l'avanzamento delle lingue indicate (lingue inesistenti ignorate)."""
+    if not language_ids:
+        return {}
+    existing = set(Language.objects.filter(id__in=language_ids).values_list("id", flat=True))
+    progress = _compute(lid for lid in language_ids if lid in existing)
+    if progress:
+        LanguageProgress.objects.bulk_create(
+            list(progress.values()),
+            update_conflicts=True,
+            unique_fields=["language"],
+            update_fields=list(_FIELDS) + ["refreshed_at"],
+        )
+    # risposte e lingue complete della dashboard dipendono da qui
+    from core.services.dashboard_stats import invalidate_dashboard_stats
+    invalidate_dashboard_stats()
+    return progress
+
+
+def refresh_language_progress_on_commit(*language_ids: str) -> None:
+    """Come refresh_language_progress, ma a transazione confermata."""
+    if language_ids:
+        transaction.on_commit(lambda: refresh_language_progress(*language_ids))
+
+
+def refresh_all_progress(batch_size: int = 500) -> int:
+    """Ricalcola tutte le lingue (es. dopo un cambio di is_active su parametri)."""
+    lids = list(Language.objects.order_by("id").values_list("id", flat=True))
+    for i in range(0, len(lids), batch_size):
+        refresh_language_progress(*lids[i:i + batch_size])
+    return len(lids)
+
+
+def get_progress(language_id: str) -> LanguageProgress:
+    """Riga di avanzamento della lingua; se manca (lingua nuova) la crea al volo."""
+    p: Optional[LanguageProgress] = LanguageProgress.objects.filter(language_id=language_id).first()
+    if p is None:
+        p = refresh_language_progress(language_id).get(language_id) or LanguageProgress(language_id=language_id)
+    return p
+
+
+def active_question_count() -> int:
+    return Question.objects.filter(parameter__is_active=True).count()
+
+
+def is_complete(progress: LanguageProgress, active_questions: Optional[int] = None) -> bool:
+    """Tutte le domande attive hanno risposta (Answer è unica per lingua/domanda)."""
+    n = active_question_count() if active_questions is None else active_questions
+    return n > 0 and progress.answered >= n
+
+
+def completed_languages_count(active_questions: Optional[int] = None) -> int:
+    n = active_question_count() if active_questions is None else active_questions
+    if n <= 0:
+        return 0
+    return LanguageProgress.objects.filter(answered__gte=n).count()
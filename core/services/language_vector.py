@@ -0,0 +1,183 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.models import ParameterDef, LanguageParameter
+
+
+# ------------------------------------------------------------
+# Rappresentazione compatta dei valori di una lingua.
+#
+# Invece di dict {param_id: '+'} (≈100 byte per voce) ogni lingua è un
+# bytearray lungo quanto l'indice dei parametri: un byte per parametro,
+# codificato come sotto. Più vettori si impilano in una matrice int8
+# (lingue × parametri) su cui fare confronti vettoriali con numpy.
+# ------------------------------------------------------------
+
+UNSET, PLUS, MINUS, ZERO, UNKNOWN = 0, 1, 2, 3, 4
+SYMBOLS: Tuple[Optional[str], ...] = (None, "+", "-", "0", "?")
+CODES: Dict[Optional[str], int] = {None: UNSET, "": UNSET, "+": PLUS, "-": MINUS, "0": ZERO, "?": UNKNOWN}
+
+SOURCES = ("final", "eval", "orig")
+
+
+def encode(value: Optional[str]) -> int:
+    return CODES.get(value, UNSET)
+
+
+def decode(code: int) -> Optional[str]:
+    return SYMBOLS[code]
+
+
+class ParamIndex:
+    """
+    Indice condiviso param_id -> colonna. L'ordine è quello di ParameterDef.position,
+    quindi vettori costruiti sullo stesso indice sono direttamente confrontabili.
+    """
+    __slots__ = ("ids", "pos")
+
+    def __init__(self, ids: Iterable[str]):
+        self.ids: Tuple[str, ...] = tuple(ids)
+        self.pos: Dict[str, int] = {pid: i for i, pid in enumerate(self.ids)}
+
+    @classmethod
+    def from_db(cls, active_only: bool = True) -> "ParamIndex":
+        qs = ParameterDef.objects.all()
+        if active_only:
+            qs = qs.filter(is_active=True)
+        return cls(qs.order_by("position", "id").values_list("id", flat=True))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, pid: str) -> bool:
+        return pid in self.pos
+
+    def column(self, pid: str) -> Optional[int]:
+        return self.pos.get(pid)
+
+    def take(self, mask: np.ndarray) -> List[str]:
+        """Id dei parametri nelle colonne selezionate da una maschera booleana."""
+        return [self.ids[i] for i in np.flatnonzero(mask)]
+
+
+class LanguageVector:
+    """Valori di una lingua come array di byte indicizzato da un ParamIndex."""
+    __slots__ = ("language_id", "index", "codes")
+
+    def __init__(self, language_id: str, index: ParamIndex, codes: Optional[bytearray] = None):
+        self.language_id = language_id
+        self.index = index
+        self.codes = codes if codes is not None else bytearray(len(index))
+
+    # --- costruttori ---
+    @classmethod
+    def from_mapping(cls, language_id: str, index: ParamIndex, values: Mapping[str, Optional[str]]) -> "LanguageVector":
+        vec = cls(language_id, index)
+        for pid, v in values.items():
+            col = index.pos.get(pid)
+            if col is not None:
+                vec.codes[col] = encode(v)
+        return vec
+
+    @classmethod
+    def from_db(cls, language_id: str, index: Optional[ParamIndex] = None, source: str = "final") -> "LanguageVector":
+        index = index if index is not None else ParamIndex.from_db(active_only=False)
+        return load_vectors([language_id], index, source=source)[language_id]
+
+    # --- accesso ---
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def get(self, pid: str, default: Optional[str] = None) -> Optional[str]:
+        col = self.index.pos.get(pid)
+        if col is None:
+            return default
+        v = SYMBOLS[self.codes[col]]
+        return default if v is None else v
+
+    def __getitem__(self, pid: str) -> Optional[str]:
+        return SYMBOLS[self.codes[self.index.pos[pid]]]
+
+    def set(self, pid: str, value: Optional[str]) -> None:
+        self.codes[self.index.pos[pid]] = encode(value)
+
+    def as_array(self) -> np.ndarray:
+        """Vista int8 (senza copia) sui codici."""
+        return np.frombuffer(self.codes, dtype=np.int8)
+
+    def ids_with(self, *values: Optional[str]) -> List[str]:
+        wanted = [encode(v) for v in values]
+        return self.index.take(np.isin(self.as_array(), wanted))
+
+    def to_dict(self, only: Sequence[str] = ("+", "-", "0", "?")) -> Dict[str, str]:
+        """Mappa param_id -> simbolo, limitata ai simboli richiesti (default: tutti i valori non nulli)."""
+        wanted = {CODES[s] for s in only}
+        ids = self.index.ids
+        return {ids[i]: SYMBOLS[c] for i, c in enumerate(self.codes) if c in wanted}
+
+    def symbols(self, blank: str = "") -> List[str]:
+        return [SYMBOLS[c] or blank for c in self.codes]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.codes)
+
+    def __repr__(self) -> str:
+        return f"LanguageVector({self.language_id!r}, {len(self.codes)} params)"
+
+
+# ------------------------------------------------------------
+# Caricamento dal DB: UNA query per qualunque insieme di lingue
+# ------------------------------------------------------------
+def _rows(language_ids: Sequence[str], index: ParamIndex):
+    return (
+        LanguageParameter.objects
+        .filter(language_id__in=language_ids, parameter_id__in=index.ids)
+        .values_list("language_id", "parameter_id", "value_orig", "eval__id", "eval__value_eval")
+        .iterator(chunk_size=10000)
+    )
+
+
+def load_sources(language_ids: Sequence[str], index: ParamIndex,
+                 sources: Sequence[str] = ("final",)) -> Dict[str, Dict[str, LanguageVector]]:
+    """
+    Carica in un colpo solo più viste degli stessi dati:
+      - 'orig'  : LanguageParameter.value_orig
+      - 'eval'  : LanguageParameterEval.value_eval
+      - 'final' : value_eval se la riga eval esiste, altrimenti value_orig
+    Ritorna {source: {language_id: LanguageVector}}.
+    """
+    for s in sources:
+        if s not in SOURCES:
+            raise ValueError(f"Sorgente sconosciuta: {s}")
+    out: Dict[str, Dict[str, LanguageVector]] = {
+        s: {lid: LanguageVector(lid, index) for lid in language_ids} for s in sources
+    }
+    if not language_ids or not len(index):
+        return out
+
+    pos = index.pos
+    want_orig, want_eval, want_final = ("orig" in out), ("eval" in out), ("final" in out)
+    for lid, pid, v_orig, eval_id, v_eval in _rows(language_ids, index):
+        col = pos[pid]
+        if want_orig:
+            out["orig"][lid].codes[col] = CODES.get(v_orig, UNSET)
+        if want_eval:
+            out["eval"][lid].codes[col] = CODES.get(v_eval, UNSET)
+        if want_final:
+            out["final"][lid].codes[col] = CODES.get(v_eval if eval_id is not None else v_orig, UNSET)
+    return out
+
+
+def load_vectors(language_ids: Sequence[str], index: ParamIndex, source: str = "final") -> Dict[str, LanguageVector]:
+    return load_sources(language_ids, index, (source,))[source]
+
+
+def stack(vectors: Sequence[LanguageVector]) -> np.ndarray:
+    """Matrice int8 (lingue × parametri) dai vettori, nello stesso ordine."""
+    if not vectors:
+        return np.zeros((0, 0), dtype=np.int8)
+    buf = b"".join(bytes(v.codes) for v in vectors)
+    return np.frombuffer(buf, dtype=np.int8).reshape(len(vectors), len(vectors[0].codes))
@@ -0,0 +1,55 @@
+from __future__ import annotations
+from typing import Iterable
+
+from django.db import connection
+
+
+# ------------------------------------------------------------
+# Lock advisory a grana fine sui dati di una lingua.
+#
+# Prima DAG, consolidamento e parameter_save prendevano select_for_update
+# sull'intera riga Language: un DAG in approvazione bloccava tutti gli editor
+# della lingua e ogni consolidamento restava in coda dietro di lui.
+# Ora:
+#   - lock_language_parameters(lingua, [parametri]): un lock per coppia
+#     (lingua, parametro), preso da chi scrive le risposte o il
+#     LanguageParameter di quel parametro (save_answers, consolidamento);
+#   - lock_language_dag(lingua): un lock per lingua, conteso solo tra run del
+#     DAG (scrivono le stesse LanguageParameterEval).
+# Sono lock di transazione (pg_advisory_xact_lock): rilasciati a commit/rollback.
+# L'autosave (answer_save.autosave_answer) resta ottimistico e non ne prende.
+#
+# Ordine di acquisizione, per evitare deadlock:
+#   - coppie (lingua, parametro) sempre in ordine crescente, e prima dei lock
+#     di riga (Answer, LanguageParameter) di quelle coppie;
+#   - chi tiene il lock DAG non chiede lock di coppia e viceversa.
+# ------------------------------------------------------------
+
+_PAIR_NS = "lp"
+_DAG_NS = "dag"
+_BACKUP_NS = "backup"
+
+
+def _xact_lock(namespace: str, key: str, sub: str = "") -> None:
+    # forma a due int4: spazio di chiavi separato dai lock a bigint (core.services.ordering)
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s), hashtext(%s));",
+            [f"{namespace}:{key}", sub],
+        )
+
+
+def lock_language_parameters(language_id: str, parameter_ids: Iterable[str]) -> None:
+    """Lock delle coppie (language_id, parametro), in ordine crescente di parametro."""
+    for pid in sorted(set(parameter_ids)):
+        _xact_lock(_PAIR_NS, language_id, pid)
+
+
+def lock_language_dag(language_id: str) -> None:
+    """Lock dei run del DAG di language_id (non blocca editor né consolidamento)."""
+    _xact_lock(_DAG_NS, language_id)
+
+
+def lock_submission_backup() -> None:
+    """Serializza l'avvio dei backup di tutte le lingue (uno alla volta)."""
+    _xact_lock(_BACKUP_NS, "all")
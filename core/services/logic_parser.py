@@ -171,4 +171,64 @@ def pretty_print_expression(expression: str) -> str:
 
         raise ValueError(f"Nodo non gestito in render: {n}")
 
-    return render(root)
\ No newline at end of file
+    return render(root)
+
+# ---------- COMPILAZIONE per valutazione vettoriale ----------
+
+class CompiledExpression:
+    """
+    Espressione già parsata e trasformata in una chiusura.
+    La chiusura riceve una funzione foglia leaf(sign, param_id) e combina i suoi
+    risultati con & | ~: se leaf ritorna array booleani numpy (una voce per
+    lingua) l'intera espressione è valutata su tutte le lingue in un passaggio.
+    """
+    __slots__ = ("expression", "refs", "_fn")
+
+    def __init__(self, expression: str, refs: frozenset, fn):
+        self.expression = expression
+        self.refs = refs
+        self._fn = fn
+
+    def __call__(self, leaf):
+        return self._fn(leaf)
+
+
+def compile_expression(expression: str) -> CompiledExpression:
+    """Compila un'espressione (sintassi di implicational_condition). Solleva ParseException se invalida."""
+    expr = (expression or "").strip()
+    res = build_parser().parseString(expr, parseAll=True)
+    if len(res) == 0:
+        raise ParseException("empty parse")
+    refs: set[str] = set()
+
+    def comp(node):
+        if isinstance(node, tuple):
+            sign, param = node
+            refs.add(param)
+            return lambda leaf: leaf(sign, param)
+
+        node = _as_list(node)
+        if isinstance(node, list) and len(node) == 2 and str(node[0]).lower() == 'not':
+            inner = comp(node[1])
+            return lambda leaf: ~inner(leaf)
+
+        if isinstance(node, list) and len(node) >= 3 and len(node) % 2 == 1:
+            first = comp(node[0])
+            rest = []
+            for i in range(1, len(node), 2):
+                op = str(node[i]).lower()
+                if op not in ('&', 'and', '|', 'or'):
+                    raise ValueError(f"Operatore non gestito: {op}")
+                rest.append((op in ('&', 'and'), comp(node[i + 1])))
+
+            def chain(leaf):
+                acc = first(leaf)
+                for is_and, f in rest:
+                    acc = (acc & f(leaf)) if is_and else (acc | f(leaf))
+                return acc
+            return chain
+
+        raise ValueError(f"Nodo non gestito: {node}")
+
+    fn = comp(res[0])
+    return CompiledExpression(expr, frozenset(refs), fn)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import hashlib
+import json
+import time
+from typing import Iterable, Optional, Tuple
+
+from django.core.cache import cache
+
+from core.models import Language
+
+
+# ------------------------------------------------------------
+# Layer GeoJSON delle lingue con coordinate, condiviso da lista lingue e
+# dashboard pubblica. Due varianti:
+#   - pubblica: tutte le lingue, solo nome e famiglie (PUBLIC_PROPERTIES);
+#   - completa (lista lingue): tutti i campi, sulle stesse lingue delle righe
+#     della lista per la ricerca e i filtri correnti (language_ids, calcolati
+#     dalla view e non messi in cache); in cache solo quella senza filtri
+#     degli admin.
+#
+# I payload in cache (già serializzati, compatti) stanno sotto una versione
+# che cambia a ogni save/delete di Language (signal in core.signals); la
+# stessa versione fa da ETag, quindi il browser rivalida con If-None-Match e
+# riceve 304 finché nessuna lingua cambia.
+# ------------------------------------------------------------
+
+CACHE_TTL = 60 * 60 * 24
+_VER_KEY = "map_data:ver"
+_DATA_KEY = "map_data:{}:{}"
+COORD_DIGITS = 5  # ~1 m
+
+PUBLIC_PROPERTIES = ("name", "family", "top_level_family")
+
+
+def bump_map_data() -> None:
+    cache.set(_VER_KEY, time.time_ns(), None)
+
+
+def map_data_version() -> int:
+    ver = cache.get(_VER_KEY)
+    if ver is None:
+        ver = time.time_ns()
+        cache.set(_VER_KEY, ver, None)
+    return ver
+
+
+def _etag(ver: int, full: bool) -> str:
+    return f'"lm-{ver}-{"f" if full else "p"}"'
+
+
+def map_data_etag(full: bool = False, language_ids: Optional[Iterable[str]] = None) -> str:
+    """ETag della variante richiesta (vedi map_payload)."""
+    ver = map_data_version()
+    if language_ids is not None:
+        digest = hashlib.sha1(",".join(sorted(language_ids)).encode("utf-8")).hexdigest()[:12]
+        return f'"lm-{ver}-u{digest}"'
+    return _etag(ver, full)
+
+
+def _build(full: bool, language_ids: Optional[Iterable[str]] = None) -> bytes:
+    features = []
+    rows = (
+        Language.objects
+        .filter(latitude__isnull=False, longitude__isnull=False)
+        .order_by("position")
+        .values_list("id", "name_full", "latitude", "longitude", "family", "top_level_family",
+                     "grp", "isocode", "glottocode", "historical_language")
+    )
+    if language_ids is not None:
+        rows = rows.filter(id__in=list(language_ids))
+    for lid, name, lat, lng, family, top, grp, iso, glotto, hist in rows:
+        try:
+            coords = [round(float(lng), COORD_DIGITS), round(float(lat), COORD_DIGITS)]
+        except (TypeError, ValueError):
+            continue
+        properties = {
+            "name": name,
+            "family": family or "Unknown",
+            "top_level_family": top or "Unknown",
+            "grp": grp or "",
+            "isocode": iso or "",
+            "glottocode": glotto or "",
+            "historical": bool(hist),
+        }
+        if not full:
+            properties = {k: properties[k] for k in PUBLIC_PROPERTIES}
+        features.append({
+            "type": "Feature",
+            "id": lid,
+            "geometry": {"type": "Point", "coordinates": coords},
+            "properties": properties,
+        })
+    payload = {"type": "FeatureCollection", "features": features}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def map_payload(full: bool = False, language_ids: Optional[Iterable[str]] = None) -> Tuple[str, bytes]:
+    """
+    (ETag, GeoJSON serializzato) della versione corrente.
+    full=False: variante pubblica. full=True: tutti i campi; con language_ids
+    solo quelle lingue (variante per utente, senza cache).
+    """
+    if language_ids is not None:
+        language_ids = sorted(language_ids)
+        return map_data_etag(True, language_ids), _build(True, language_ids)
+    ver = map_data_version()
+    key = _DATA_KEY.format("full" if full else "public", ver)
+    body = cache.get(key)
+    if body is None:
+        body = _build(full)
+        cache.set(key, body, CACHE_TTL)
+    return _etag(ver, full), body
@@ -0,0 +1,131 @@
+from __future__ import annotations
+from typing import List, Optional, Sequence, Type
+
+from django.db import connection, models, transaction
+from django.db.models import F, Max, Window
+from django.db.models.functions import RowNumber
+
+
+# ------------------------------------------------------------
+# Ordinamento a intervalli ("gap") per Language.position e ParameterDef.position.
+#
+# position resta la chiave di ordinamento letta ovunque (order_by("position"),
+# position__gt=..., cursori keyset), ma non è più compatta 1..N: i valori sono
+# distanziati di POSITION_GAP. Così:
+#   - append: max + GAP, una riga;
+#   - spostamento/inserimento al rango N (Model.save con position = N, come
+#     prima): valore intermedio tra i vicini, una riga;
+#   - solo se tra i vicini non c'è più spazio: rebalance(), UN UPDATE che
+#     rinumera tutto a multipli di GAP (il vincolo unique è DEFERRED);
+#   - reorder(): un intero nuovo ordine in UN UPDATE ... FROM unnest().
+# Il rango 1..N mostrato agli utenti (form, export) si ricava con rank_of/with_rank.
+# Il lock advisory serializza solo chi cambia l'ordine, non le modifiche agli altri campi.
+# ------------------------------------------------------------
+
+POSITION_GAP = 1024
+
+_LOCK_KEYS = {
+    "core.language": 123456789,
+    "core.parameterdef": 987654321,
+}
+
+
+def lock_ordering(model: Type[models.Model]) -> None:
+    """Lock advisory di transazione per l'ordinamento di model."""
+    with connection.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s);", [_LOCK_KEYS[model._meta.label_lower]])
+
+
+def next_position(model: Type[models.Model]) -> int:
+    """Chiave per un append in coda (da chiamare sotto lock_ordering)."""
+    return (model.objects.aggregate(m=Max("position"))["m"] or 0) + POSITION_GAP
+
+
+def rank_of(obj: models.Model) -> int:
+    """Rango 1..N di obj nell'ordinamento corrente."""
+    return type(obj).objects.filter(position__lt=obj.position).count() + 1
+
+
+def with_rank(qs: models.QuerySet) -> models.QuerySet:
+    """Annota `rank` (1..N secondo position) su qs; il rango è calcolato sull'insieme filtrato."""
+    return qs.annotate(rank=Window(RowNumber(), order_by=[F("position").asc(), F("pk").asc()]))
+
+
+def rebalance(model: Type[models.Model]) -> int:
+    """Rinumera tutte le righe a multipli di POSITION_GAP, in un solo UPDATE. Restituisce le righe toccate."""
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {table} AS t SET position = r.rn * %s
+            FROM (SELECT {pk} AS id, row_number() OVER (ORDER BY position, {pk}) AS rn FROM {table}) AS r
+            WHERE t.{pk} = r.id AND t.position <> r.rn * %s
+            """,
+            [POSITION_GAP, POSITION_GAP],
+        )
+        return cur.rowcount
+
+
+def _neighbours(model: Type[models.Model], rank: int, exclude_pk=None) -> tuple[Optional[int], Optional[int]]:
+    """Chiavi delle righe che, senza exclude_pk, occupano i ranghi rank-1 e rank."""
+    qs = model.objects.order_by("position")
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    start = max(rank - 2, 0)
+    keys = list(qs.values_list("position", flat=True)[start:rank])
+    if rank <= 1:
+        return None, (keys[0] if keys else None)
+    before = keys[0] if keys else None
+    after = keys[1] if len(keys) > 1 else None
+    if before is None:  # rango oltre la fine: append
+        before = model.objects.exclude(pk=exclude_pk).aggregate(m=Max("position"))["m"]
+    return before, after
+
+
+def position_for_rank(model: Type[models.Model], rank: int, exclude_pk=None) -> int:
+    """
+    Chiave che mette una riga al rango `rank` (1 = prima; oltre la fine = in coda).
+    Da chiamare sotto lock_ordering; può eseguire un rebalance se non c'è spazio.
+    """
+    rank = max(int(rank), 1)
+    for _ in range(2):
+        before, after = _neighbours(model, rank, exclude_pk)
+        low = before or 0
+        if after is None:
+            return low + POSITION_GAP
+        if after - low > 1:
+            return (low + after) // 2
+        rebalance(model)
+    raise RuntimeError("No room left between positions after rebalance.")
+
+
+@transaction.atomic
+def reorder(model: Type[models.Model], ids: Sequence[str]) -> int:
+    """
+    Applica un ordine completo (tutti gli id, ciascuno una volta) con un solo UPDATE:
+    l'i-esimo id riceve position = i * POSITION_GAP. ValueError se ids non è una permutazione.
+    """
+    ids: List[str] = [str(i) for i in ids]
+    lock_ordering(model)
+    existing = set(model.objects.values_list("pk", flat=True))
+    if len(ids) != len(set(ids)) or set(ids) != existing:
+        missing, unknown = existing - set(ids), set(ids) - existing
+        raise ValueError(
+            "The new order must list every item exactly once"
+            + (f"; missing: {', '.join(sorted(missing)[:10])}" if missing else "")
+            + (f"; unknown: {', '.join(sorted(unknown)[:10])}" if unknown else "")
+            + "."
+        )
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {table} AS t SET position = v.rn * %s
+            FROM unnest(%s::text[]) WITH ORDINALITY AS v(id, rn)
+            WHERE t.{pk} = v.id AND t.position <> v.rn * %s
+            """,
+            [POSITION_GAP, ids, POSITION_GAP],
+        )
+        return cur.rowcount
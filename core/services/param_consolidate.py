@@ -8,6 +8,8 @@ from django.db.models import Q
 from core.models import (
     Language, ParameterDef, Question, Answer, AnswerStatus, LanguageParameter
 )
+from core.services.final_values import bump_final_values
+from core.services.locks import lock_language_parameters
 
 # Considera valide TUTTE le risposte tranne le REJECTED
 ALLOWED_STATUSES = (
@@ -103,10 +105,12 @@ def recompute_and_persist_language_parameter(language_id: str, parameter_id: str
     - Se determinato => value_orig in {'+','-'}; warning_orig=True solo nel conflitto
     Ritorna l'oggetto LanguageParameter aggiornato.
     """
+    # Lock della sola coppia (lingua, parametro): un DAG o il salvataggio di
+    # altri parametri della stessa lingua non fanno attendere (core.services.locks).
+    lock_language_parameters(language_id, [parameter_id])
     # Se la lingua è stata cancellata (es. delete con cascade), non fare nulla.
-    try:
-        lang = Language.objects.select_for_update().get(pk=language_id)
-    except Language.DoesNotExist:
+    lang = Language.objects.filter(pk=language_id).first()
+    if lang is None:
         return None
     param = ParameterDef.objects.get(pk=parameter_id)
 
@@ -116,5 +120,6 @@ def recompute_and_persist_language_parameter(language_id: str, parameter_id: str
     lp.value_orig = value  # può essere '+', '-', oppure None
     lp.warning_orig = bool(warning)
     lp.save(update_fields=["value_orig", "warning_orig"])
+    transaction.on_commit(lambda: bump_final_values(language_id))
 
     return lp
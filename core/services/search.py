@@ -0,0 +1,99 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import FloatField, Q, QuerySet
+from django.db.models.functions import Cast
+from django.urls import reverse
+
+from core.models import Glossary, Language, Question
+
+
+# ------------------------------------------------------------
+# Ricerca testuale condivisa (lista lingue, glossario, domande, suggerimenti
+# della toolbar).
+#
+# Ogni modello ha un campo generato 'search_text' (campi ricercabili in
+# minuscolo, vedi core.models.search_document) con indice GIN gin_trgm_ops.
+# Il filtro è "search_text LIKE '%q%'": stessa semantica degli icontains in OR
+# di prima, ma risolto dall'indice trigram invece che con una scansione
+# sequenziale (sotto i 3 caratteri pg_trgm non ha trigrammi: scansione dell'indice).
+# Il punteggio (search_rank) privilegia la somiglianza con l'etichetta
+# principale (nome lingua, voce, testo domanda) rispetto al resto del documento.
+# ------------------------------------------------------------
+
+LABEL_FIELD: Dict[type, str] = {
+    Language: "name_full",
+    Glossary: "word",
+    Question: "text",
+}
+
+SUGGEST_LIMIT = 8
+
+
+def normalize_query(q: Optional[str]) -> str:
+    return (q or "").strip().lower()
+
+
+def search_filter(q: str) -> Q:
+    """Condizione sull'indice trigram (q già normalizzata)."""
+    return Q(search_text__contains=q)
+
+
+def search(qs: QuerySet, q: Optional[str], extra: Optional[Q] = None) -> QuerySet:
+    """
+    Filtra qs sul testo q e annota search_rank (più alto = più rilevante).
+    extra: condizioni aggiuntive in OR (es. lingue storiche per "hist").
+    Con q vuota restituisce qs invariato.
+    """
+    q = normalize_query(q)
+    if not q:
+        return qs
+    filt = search_filter(q)
+    if extra is not None:
+        filt |= extra
+    label = LABEL_FIELD[qs.model]
+    return qs.filter(filt).annotate(
+        search_rank=Cast(
+            TrigramWordSimilarity(q, label) * 2 + TrigramWordSimilarity(q, "search_text"),
+            FloatField(),
+        )
+    )
+
+
+# ------------------------------------------------------------
+# Suggerimenti della toolbar (_toolbar_search.html)
+# ------------------------------------------------------------
+def _visible_languages(user: Any) -> QuerySet:
+    qs = Language.objects.all()
+    if not (user.is_staff or user.is_superuser or getattr(user, "role", "") == "admin"):
+        qs = qs.filter(Q(assigned_user=user) | Q(users=user)).distinct()
+    return qs
+
+
+def suggest(scope: str, q: Optional[str], user: Any, limit: int = SUGGEST_LIMIT) -> List[Dict[str, str]]:
+    """
+    Prime `limit` voci per rilevanza: [{"label", "detail", "url"}].
+    scope: "languages" | "glossary" | "questions" (le domande solo per admin).
+    """
+    if len(normalize_query(q)) < 2:
+        return []
+    out: List[Dict[str, str]] = []
+    if scope == "languages":
+        qs = search(_visible_languages(user), q).only("id", "name_full")
+        for l in qs.order_by("-search_rank", "position")[:limit]:
+            out.append({"label": l.name_full, "detail": l.id, "url": reverse("language_data", args=[l.id])})
+    elif scope == "glossary":
+        qs = search(Glossary.objects.only("id", "word"), q)
+        for g in qs.order_by("-search_rank", "word")[:limit]:
+            out.append({"label": g.word, "detail": "", "url": reverse("glossary_view", args=[g.word])})
+    elif scope == "questions":
+        if not (user.is_staff or getattr(user, "role", "") == "admin"):
+            return []
+        qs = search(Question.objects.only("id", "parameter_id", "text"), q)
+        for qu in qs.order_by("-search_rank", "id")[:limit]:
+            out.append({
+                "label": qu.text[:80], "detail": qu.id,
+                "url": reverse("question_edit", args=[qu.parameter_id, qu.id]),
+            })
+    return out
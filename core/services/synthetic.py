@@ -0,0 +1,194 @@
+from __future__ import annotations
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Max
+
+from core.models import (
+    Language, ParameterDef, Question, Answer, AnswerStatus,
+    LanguageParameter, LanguageParameterEval,
+)
+from core.services.language_progress import refresh_all_progress
+from core.services.map_data import bump_map_data
+from core.services.ordering import POSITION_GAP
+
+
+# Corpus sintetici per benchmark e test di scala.
+# Tutti gli id generati iniziano con il prefisso dello spec: così è possibile
+# ripulire il DB senza toccare i dati reali (vedi purge_corpus).
+
+@dataclass
+class SyntheticSpec:
+    languages: int = 50
+    parameters: int = 100
+    questions_per_param: int = 3
+    condition_depth: int = 2        # profondità massima dell'albero della condizione (0 = nessuna condizione)
+    answer_density: float = 0.9     # frazione di domande con risposta per lingua
+    seed: int = 42
+    prefix: str = "SY"
+
+    def as_dict(self) -> dict:
+        return {
+            "languages": self.languages,
+            "parameters": self.parameters,
+            "questions_per_param": self.questions_per_param,
+            "condition_depth": self.condition_depth,
+            "answer_density": self.answer_density,
+            "seed": self.seed,
+            "prefix": self.prefix,
+        }
+
+
+@dataclass
+class SyntheticCorpus:
+    spec: SyntheticSpec
+    language_ids: List[str] = field(default_factory=list)
+    parameter_ids: List[str] = field(default_factory=list)
+    question_ids: List[str] = field(default_factory=list)
+    answers: int = 0
+
+
+def _param_id(spec: SyntheticSpec, i: int) -> str:
+    return f"{spec.prefix}P{i:05d}"
+
+
+def _lang_id(spec: SyntheticSpec, i: int) -> str:
+    return f"{spec.prefix}L{i:05d}"
+
+
+def _random_condition(rng: random.Random, earlier: List[str], depth: int) -> str:
+    """
+    Genera un'espressione nella sintassi di implicational_condition
+    (es. '(+P1 | -P2) & 0P3') citando SOLO parametri precedenti: il grafo resta aciclico.
+    """
+    if depth <= 0 or not earlier:
+        return ""
+
+    def node(d: int) -> str:
+        if d <= 1 or rng.random() < 0.3:
+            return f"{rng.choice('+-0')}{rng.choice(earlier)}"
+        op = rng.choice(("&", "|"))
+        parts = [node(d - 1) for _ in range(rng.randint(2, 3))]
+        return "(" + f" {op} ".join(parts) + ")"
+
+    expr = node(depth)
+    # le parentesi esterne sono superflue
+    if expr.startswith("(") and expr.endswith(")"):
+        expr = expr[1:-1]
+    return expr
+
+
+def _consolidate(answers: Dict[str, str], normals: List[str], stops: List[str]) -> Tuple[Optional[str], bool]:
+    """Stesse regole di param_consolidate.consolidate_parameter_for_language, ma in memoria."""
+    has_norm_yes = any(answers.get(q) == "yes" for q in normals)
+    has_stop_yes = any(answers.get(q) == "yes" for q in stops)
+    if has_norm_yes:
+        return "+", has_stop_yes
+    if has_stop_yes:
+        return "-", False
+    if normals and all(answers.get(q) == "no" for q in normals):
+        return "-", False
+    return None, False
+
+
+@transaction.atomic
+def generate_corpus(spec: SyntheticSpec, with_eval: bool = True) -> SyntheticCorpus:
+    """
+    Crea (con bulk_create, senza signals) un corpus sintetico riproducibile:
+    parametri con condizioni, domande (l'ultima di ogni parametro è stop-question
+    se ce ne sono almeno due), lingue, risposte, LanguageParameter consolidati
+    e, se richiesto, una riga LanguageParameterEval per ogni coppia.
+    """
+    rng = random.Random(spec.seed)
+    corpus = SyntheticCorpus(spec=spec)
+
+    # bulk_create salta save(): chiavi a intervalli assegnate qui, in coda
+    param_pos = (ParameterDef.objects.aggregate(m=Max("position"))["m"] or 0) + POSITION_GAP
+    lang_pos = (Language.objects.aggregate(m=Max("position"))["m"] or 0) + POSITION_GAP
+
+    # --- Parametri ---
+    params: List[ParameterDef] = []
+    for i in range(spec.parameters):
+        pid = _param_id(spec, i)
+        earlier = corpus.parameter_ids[-20:]
+        params.append(ParameterDef(
+            id=pid,
+            name=f"Synthetic parameter {i}",
+            implicational_condition=_random_condition(rng, earlier, spec.condition_depth) if i else "",
+            is_active=True,
+            position=param_pos + i * POSITION_GAP,
+        ))
+        corpus.parameter_ids.append(pid)
+    ParameterDef.objects.bulk_create(params, batch_size=1000)
+
+    # --- Domande ---
+    questions: List[Question] = []
+    q_by_param: Dict[str, Tuple[List[str], List[str]]] = {}
+    for pid in corpus.parameter_ids:
+        normals, stops = [], []
+        for j in range(spec.questions_per_param):
+            qid = f"{pid}_Q{j}"
+            is_stop = spec.questions_per_param > 1 and j == spec.questions_per_param - 1
+            questions.append(Question(id=qid, parameter_id=pid, text=f"Synthetic question {qid}", is_stop_question=is_stop))
+            (stops if is_stop else normals).append(qid)
+            corpus.question_ids.append(qid)
+        q_by_param[pid] = (normals, stops)
+    Question.objects.bulk_create(questions, batch_size=2000)
+
+    # --- Lingue ---
+    langs = [
+        Language(id=_lang_id(spec, i), name_full=f"Synthetic {spec.prefix} {i}", position=lang_pos + i * POSITION_GAP,
+                 family=f"Family {i % 7}", top_level_family=f"Top {i % 3}", grp=f"Group {i % 11}",
+                 latitude=round(rng.uniform(-60, 70), 6), longitude=round(rng.uniform(-170, 170), 6))
+        for i in range(spec.languages)
+    ]
+    Language.objects.bulk_create(langs, batch_size=1000)
+    bump_map_data()  # bulk_create non invia signal
+    corpus.language_ids = [l.id for l in langs]
+
+    # --- Risposte + consolidamento in memoria ---
+    lps: List[LanguageParameter] = []
+    for lid in corpus.language_ids:
+        answers: List[Answer] = []
+        resp_by_q: Dict[str, str] = {}
+        for qid in corpus.question_ids:
+            if rng.random() >= spec.answer_density:
+                continue
+            resp = "yes" if rng.random() < 0.4 else "no"
+            resp_by_q[qid] = resp
+            answers.append(Answer(language_id=lid, question_id=qid, response_text=resp,
+                                  status=AnswerStatus.PENDING, modifiable=True))
+        Answer.objects.bulk_create(answers, batch_size=5000)
+        corpus.answers += len(answers)
+
+        for pid in corpus.parameter_ids:
+            normals, stops = q_by_param[pid]
+            value, warning = _consolidate(resp_by_q, normals, stops)
+            lps.append(LanguageParameter(language_id=lid, parameter_id=pid, value_orig=value, warning_orig=warning))
+
+    LanguageParameter.objects.bulk_create(lps, batch_size=5000)
+    # bulk_create non invia signal: LanguageProgress (lista lingue, statistiche della
+    # dashboard, completamento) va ricalcolato qui, a blocchi, dopo le risposte
+    refresh_all_progress()
+
+    if with_eval:
+        lp_ids = LanguageParameter.objects.filter(language_id__in=corpus.language_ids).values_list("id", flat=True)
+        LanguageParameterEval.objects.bulk_create(
+            [LanguageParameterEval(language_parameter_id=lp_id, value_eval=None) for lp_id in lp_ids],
+            batch_size=5000,
+        )
+
+    return corpus
+
+
+@transaction.atomic
+def purge_corpus(prefix: str = "SY") -> int:
+    """Elimina tutti gli oggetti sintetici con il prefisso dato. Ritorna il numero di lingue rimosse."""
+    langs = Language.objects.filter(id__startswith=f"{prefix}L")
+    n = langs.count()
+    langs.delete()  # cascade: answers, language_parameters, eval, submissions
+    Question.objects.filter(parameter_id__startswith=f"{prefix}P").delete()
+    ParameterDef.objects.filter(id__startswith=f"{prefix}P").delete()
+    return n
@@ -0,0 +1,143 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.core.cache import cache
+
+from core.models import Language
+from core.services.final_values import final_values, language_versions
+from core.services.language_vector import ParamIndex, CODES, SYMBOLS, encode
+
+
+# ------------------------------------------------------------
+# Indice invertito (parametro, valore finale) -> bitmap delle lingue.
+#
+# Per ogni valore '+', '-', '0', '?' si tiene una matrice di bit
+# (ceil(n_lingue/8) × n_parametri): la colonna di un parametro, spacchettata,
+# è la maschera booleana delle lingue con quel valore. Accanto resta la
+# matrice dei codici (lingue × parametri) per le ricerche per riga.
+#
+# L'indice vive in cache. Ogni lingua ricorda la versione dei valori finali con
+# cui è stata indicizzata (vedi final_values.bump_final_values, chiamata dopo
+# ogni DAG run/consolidamento): alla lettura si riallineano SOLO le lingue la
+# cui versione è cambiata. Lingue o parametri aggiunti/rimossi => ricostruzione.
+# ------------------------------------------------------------
+
+CACHE_KEY = "value_index"
+CACHE_TTL = 60 * 60 * 24
+INDEXED_VALUES = ("+", "-", "0", "?")
+
+
+class ValueIndex:
+    __slots__ = ("language_ids", "lang_pos", "params", "codes", "bits", "versions")
+
+    def __init__(self, language_ids: Sequence[str], params: ParamIndex):
+        self.language_ids: Tuple[str, ...] = tuple(language_ids)
+        self.lang_pos: Dict[str, int] = {lid: i for i, lid in enumerate(self.language_ids)}
+        self.params = params
+        self.codes = np.zeros((len(self.language_ids), len(params)), dtype=np.int8)
+        self.bits: Dict[int, np.ndarray] = {}
+        self.versions: Dict[str, int] = {}
+
+    # --- costruzione / aggiornamento ---
+    @classmethod
+    def build(cls, language_ids: Sequence[str], params: ParamIndex) -> "ValueIndex":
+        idx = cls(language_ids, params)
+        idx._load_rows(list(idx.language_ids))
+        idx._pack()
+        return idx
+
+    def _load_rows(self, language_ids: List[str]) -> None:
+        self.versions.update(language_versions(language_ids))
+        pos = self.params.pos
+        for lid, values in final_values(language_ids).items():
+            row = np.zeros(len(self.params), dtype=np.int8)
+            for pid, v in values.items():
+                col = pos.get(pid)
+                if col is not None:
+                    row[col] = encode(v)
+            self.codes[self.lang_pos[lid]] = row
+
+    def _pack(self, rows: Optional[Iterable[int]] = None) -> None:
+        """(Ri)calcola le bitmap; con `rows` solo i byte che contengono quelle lingue."""
+        if rows is None:
+            self.bits = {CODES[v]: np.packbits(self.codes == CODES[v], axis=0) for v in INDEXED_VALUES}
+            return
+        for b in sorted({r // 8 for r in rows}):
+            block = self.codes[b * 8:(b + 1) * 8]
+            for v in INDEXED_VALUES:
+                c = CODES[v]
+                self.bits[c][b] = np.packbits(block == c, axis=0)[0]
+
+    def refresh(self) -> List[str]:
+        """Riallinea le lingue la cui versione dei valori finali è cambiata. Ritorna gli id aggiornati."""
+        current = language_versions(self.language_ids)
+        stale = [lid for lid in self.language_ids if current[lid] != self.versions.get(lid)]
+        if stale:
+            self._load_rows(stale)
+            self._pack(self.lang_pos[lid] for lid in stale)
+        return stale
+
+    # --- interrogazione ---
+    def match(self, parameter_id: str, value: str) -> np.ndarray:
+        """Maschera booleana (per lingua) di parametro == valore."""
+        col = self.params.pos.get(parameter_id)
+        code = CODES.get(value)
+        n = len(self.language_ids)
+        if col is None or code not in self.bits:
+            return np.zeros(n, dtype=bool)
+        return np.unpackbits(self.bits[code][:, col], count=n).astype(bool)
+
+    def combine(self, clauses: Sequence[Tuple[bool, str, str]], op: str = "and") -> np.ndarray:
+        """
+        Combina clausole (negata, param_id, valore) con AND o OR.
+        Es. [(False,'P1','+'), (False,'P2','-'), (True,'P3','0')] con 'and'
+        = P1=+ AND P2=- AND NOT P3=0.
+        """
+        n = len(self.language_ids)
+        if not clauses:
+            return np.zeros(n, dtype=bool)
+        acc = np.ones(n, dtype=bool) if op == "and" else np.zeros(n, dtype=bool)
+        for negate, pid, value in clauses:
+            m = self.match(pid, value)
+            if negate:
+                m = ~m
+            acc = (acc & m) if op == "and" else (acc | m)
+        return acc
+
+    def languages(self, mask: np.ndarray) -> List[str]:
+        return [self.language_ids[i] for i in np.flatnonzero(mask)]
+
+    def params_with(self, language_id: str, value: str) -> List[str]:
+        """Parametri con il valore dato per una lingua (lettura di una riga)."""
+        i = self.lang_pos.get(language_id)
+        if i is None:
+            return []
+        return self.params.take(self.codes[i] == CODES.get(value, -1))
+
+    def value(self, language_id: str, parameter_id: str) -> Optional[str]:
+        i, col = self.lang_pos.get(language_id), self.params.pos.get(parameter_id)
+        if i is None or col is None:
+            return None
+        return SYMBOLS[self.codes[i, col]]
+
+    def distribution(self, parameter_id: str) -> Dict[str, List[str]]:
+        return {v: self.languages(self.match(parameter_id, v)) for v in INDEXED_VALUES}
+
+
+def get_value_index() -> ValueIndex:
+    """Indice corrente: da cache, riallineato in modo incrementale, o ricostruito se la struttura è cambiata."""
+    language_ids = tuple(Language.objects.order_by("position").values_list("id", flat=True))
+    params = ParamIndex.from_db(active_only=False)
+
+    idx: Optional[ValueIndex] = cache.get(CACHE_KEY)
+    if idx is None or idx.language_ids != language_ids or idx.params.ids != params.ids:
+        idx = ValueIndex.build(language_ids, params)
+        cache.set(CACHE_KEY, idx, CACHE_TTL)
+    elif idx.refresh():
+        cache.set(CACHE_KEY, idx, CACHE_TTL)
+    return idx
+
+
+def invalidate_value_index() -> None:
+    cache.delete(CACHE_KEY)
@@ -1,11 +1,20 @@
 # core/signals.py
 
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.db import transaction
 
-from core.models import Answer, Language
+from core.models import (
+    Answer, Glossary, Language, LanguageProgress, Motivation,
+    ParameterDef, Question, QuestionAllowedMotivation,
+)
 from core.services.param_consolidate import recompute_and_persist_language_parameter  # type: ignore[reportMissingImports]
+from core.services.language_progress import refresh_language_progress_on_commit, refresh_all_progress
+from core.services.dashboard_stats import invalidate_dashboard_stats
+from core.services.map_data import bump_map_data
+from core.services.language_data_cache import (
+    invalidate_fragment, invalidate_language_fragments, invalidate_all_fragments,
+)
 
 
 def _safe_recompute(language_id: int, parameter_id: int) -> None:
@@ -39,3 +48,92 @@ def answer_saved_recompute(sender, instance: Answer, **kwargs):
 @receiver(post_delete, sender=Answer)
 def answer_deleted_recompute(sender, instance: Answer, **kwargs):
     _recompute_from_answer(instance)
+
+
+# --- Avanzamento per lingua (LanguageProgress) ---
+
+@receiver(post_save, sender=Answer)
+def answer_saved_progress(sender, instance: Answer, **kwargs):
+    refresh_language_progress_on_commit(instance.language_id)
+
+
+@receiver(post_delete, sender=Answer)
+def answer_deleted_progress(sender, instance: Answer, **kwargs):
+    refresh_language_progress_on_commit(instance.language_id)
+
+
+@receiver(post_save, sender=Language)
+def language_created_progress(sender, instance: Language, created: bool, **kwargs):
+    if created:
+        LanguageProgress.objects.get_or_create(language=instance)
+
+
+@receiver(pre_save, sender=ParameterDef)
+def parameter_remember_active(sender, instance: ParameterDef, **kwargs):
+    instance._was_active = (
+        ParameterDef.objects.filter(pk=instance.pk).values_list("is_active", flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=ParameterDef)
+def parameter_active_changed_progress(sender, instance: ParameterDef, **kwargs):
+    # "answered" conta solo le domande di parametri attivi (parametro nuovo: nessuna risposta)
+    was_active = getattr(instance, "_was_active", None)
+    if was_active is not None and was_active != instance.is_active:
+        transaction.on_commit(refresh_all_progress)
+
+
+# --- Snapshot statistiche dashboard ---
+
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+@receiver(post_save, sender=ParameterDef)
+@receiver(post_delete, sender=ParameterDef)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Glossary)
+@receiver(post_delete, sender=Glossary)
+def dashboard_stats_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_dashboard_stats)
+
+
+# --- Layer GeoJSON della mappa (nuova versione = nuovo ETag) ---
+
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def language_map_changed(sender, **kwargs):
+    transaction.on_commit(bump_map_data)
+
+
+
+# --- Frammenti per parametro della pagina dati lingua ---
+# parameter_save/answer_save e l'import Excel invalidano esplicitamente (scrivono
+# esempi e motivazioni anche con update()/bulk_create); qui le altre scritture
+# di Answer (admin, shell, ...). Niente receiver su Example/AnswerMotivation:
+# impedirebbero le delete in cascata "veloci" di Django.
+
+@receiver(post_save, sender=Answer)
+def answer_fragment_saved(sender, instance: Answer, **kwargs):
+    language_id = instance.language_id
+    parameter_id = Question.objects.filter(pk=instance.question_id).values_list("parameter_id", flat=True).first()
+    if parameter_id:
+        transaction.on_commit(lambda: invalidate_fragment(language_id, parameter_id))
+
+
+@receiver(post_delete, sender=Answer)
+def answer_fragment_deleted(sender, instance: Answer, **kwargs):
+    # anche in cascata dalla lingua: nessuna query, si invalida l'intera lingua
+    language_id = instance.language_id
+    transaction.on_commit(lambda: invalidate_language_fragments(language_id))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=QuestionAllowedMotivation)
+@receiver(post_delete, sender=QuestionAllowedMotivation)
+@receiver(post_save, sender=Motivation)
+@receiver(post_delete, sender=Motivation)
+@receiver(post_save, sender=ParameterDef)
+def structure_fragment_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_all_fragments)
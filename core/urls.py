@@ -1,6 +1,9 @@
 # core/urls.py
 from django.urls import path
 
+from . import views
+
 urlpatterns = [
     # Nessuna URL per il grafico: tutto è gestito da graphs_ui.
+    path("search/suggest/", views.search_suggest, name="search_suggest"),
 ]
@@ -1,4 +1,26 @@
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+from core.services.search import suggest
 
 
 def test_500(request):
     raise Exception("Force error 500")
+
+
+@login_required
+@require_GET
+def search_suggest(request: HttpRequest) -> HttpResponse:
+    """Return ranked search suggestions for the toolbar search box.
+
+    Args:
+        request: Current authenticated request with ``q`` and ``scope``
+            (``languages``, ``glossary`` or ``questions``).
+
+    Returns:
+        ``<option>`` list rendered into the toolbar ``<datalist>`` via HTMX.
+    """
+    items = suggest(request.GET.get("scope", ""), request.GET.get("q"), request.user)
+    return render(request, "_search_suggestions.html", {"items": items})
@@ -22,6 +22,9 @@ done
 # Apply database migrations
 python manage.py migrate --noinput
 
+# Tabella della cache condivisa (idempotente)
+python manage.py createcachetable
+
 # SEED INIZIALE — esegui solo se non esistono ancora utenti o risposte
 if ! python - <<'PY'
 import os
@@ -4,10 +4,10 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q
 from django.http import HttpRequest, HttpResponse
 
 from core.models import Glossary
+from core.services.search import search
 from .forms import GlossaryForm
 
 def _is_admin(user: Any) -> bool:
@@ -27,7 +27,8 @@ def _is_admin(user: Any) -> bool:
 def glossary_list(request: HttpRequest) -> HttpResponse:
     """Show the glossary list with optional search and pagination.
 
-    All authenticated users can access this page. Admin-related actions are
+    Searches use the shared trigram index (``core.services.search``) and are
+    ordered by relevance. All authenticated users can access this page. Admin-related actions are
     enabled in the template through the ``is_admin`` flag.
 
     Args:
@@ -37,12 +38,9 @@ def glossary_list(request: HttpRequest) -> HttpResponse:
         Rendered glossary list page with paginated entries.
     """
     q = (request.GET.get("q") or "").strip()
-    qs = Glossary.objects.all().order_by("word")
+    qs = Glossary.objects.defer("search_text").order_by("word")
     if q:
-        qs = qs.filter(
-            Q(word__icontains=q) |
-            Q(description__icontains=q)
-        )
+        qs = search(qs, q).order_by("-search_rank", "word")
 
     paginator = Paginator(qs, 20)
     page_obj = paginator.get_page(request.GET.get("page"))
@@ -4,12 +4,14 @@ from . import views
 urlpatterns = [
     # lista / CRUD lingue
     path("", views.language_list, name="language_list"),
+    path("map.geojson", views.language_map_data, name="language_map_data"),
     path("add/", views.language_add, name="language_add"),
     path("<str:lang_id>/edit/", views.language_edit, name="language_edit"),
     path("<str:lang_id>/delete/", views.language_delete, name="language_delete"),
 
     # NEW: import da Excel – DEVE stare prima della catch-all <str:lang_id>/
     path("import-excel/", views.language_import_excel, name="language_import_excel"),
+    path("reorder/", views.language_reorder, name="language_reorder"),
 
     # dettaglio lingua + azioni
     path("<str:lang_id>/", views.language_data, name="language_data"),
@@ -18,6 +20,8 @@ urlpatterns = [
     path("<str:lang_id>/run_dag/", views.language_run_dag, name="language_run_dag"),
 
     path("<str:lang_id>/answers/<str:question_id>/save/", views.answer_save, name="answer_save"),
+    path("<str:lang_id>/answers/<str:question_id>/autosave/", views.answer_autosave, name="answer_autosave"),
+    path("<str:lang_id>/parameters/<str:param_id>/", views.language_param_fragment, name="language_param_fragment"),
     path("<str:lang_id>/parameters/<str:param_id>/save/", views.parameter_save, name="parameter_save"),
 
     path("<str:lang_id>/submit/", views.language_submit, name="language_submit"),
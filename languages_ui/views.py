@@ -14,13 +14,16 @@ import logging
 from django.contrib import messages
 from django.utils.safestring import mark_safe
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.exceptions import PermissionDenied
 from django.core.management import call_command  
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Q, Prefetch, Count
+from django.db.models import Q, Prefetch, Count, F, QuerySet
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.utils.translation import gettext as _t
-from django.views.decorators.http import require_http_methods, require_POST
+from django.views.decorators.http import require_http_methods, require_POST, condition
+from django.utils.cache import patch_cache_control
 from django.http import HttpRequest, HttpResponse, Http404, JsonResponse, FileResponse
 import glob
 from django.utils.timezone import now
@@ -69,6 +72,20 @@ from core.models import LanguageReview
 
 from core.services.dag_eval import run_dag_for_language
 from core.services.dag_debug import diagnostics_for_language
+from core.services.map_data import bump_map_data, map_payload, map_data_etag
+from core.services.keyset import SortKey, keyset_page
+from core.services.locks import lock_language_parameters
+from core.services.ordering import reorder
+from core.services.search import search
+from core.services.language_data_cache import fragment_key, get_fragment, set_fragment
+from submissions_ui.services import delete_submissions
+from core.services.answer_save import (
+    AnswerConflict, AnswerLocked, AnswerValidationError, answer_version, autosave_answer,
+    parse_answer_post, parse_autosave_patch, parse_parameter_post, save_answers,
+)
+from core.services.language_progress import (
+    get_progress, is_complete, refresh_language_progress_on_commit,
+)
 
 
 # -----------------------
@@ -113,7 +130,9 @@ def _check_language_access(user: Any, lang: Language) -> bool:
 
 
 def _language_status_summary(lang: Language) -> dict[str, Any]:
-    """Compute status counters and compatibility overall status for a language.
+    """Return status counters and compatibility overall status for a language.
+
+    Reads the denormalized ``LanguageProgress`` row (no aggregation).
 
     Args:
         lang: Language whose answers are analyzed.
@@ -124,27 +143,14 @@ def _language_status_summary(lang: Language) -> dict[str, Any]:
             - ``total``: total number of counted answers.
             - ``overall``: derived status string.
     """
-    # Una query: GROUP BY status
-    rows = (
-        Answer.objects
-        .filter(language=lang)
-        .values("status")
-        .annotate(c=Count("id"))
-    )
-
+    p = get_progress(lang.pk)
     counts = {
-        "pending": 0,
-        "waiting_for_approval": 0,
-        "approved": 0,
-        "rejected": 0,
+        "pending": p.pending,
+        "waiting_for_approval": p.waiting,
+        "approved": p.approved,
+        "rejected": p.rejected,
     }
-    total = 0
-
-    for r in rows:
-        s = r["status"] or ""
-        if s in counts:
-            counts[s] += r["c"]
-            total += r["c"]
+    total = sum(counts.values())
 
     if total == 0:
         overall = "pending"
@@ -162,7 +168,7 @@ def _language_status_summary(lang: Language) -> dict[str, Any]:
 
 
 def _language_overall_status(lang: Language) -> dict[str, Any]:
-    """Compute the language overall status from answer statuses.
+    """Return the language overall status from the denormalized progress row.
 
     Priority order is: ``WAITING`` > ``APPROVED`` > ``REJECTED`` > ``PENDING``.
 
@@ -173,52 +179,23 @@ def _language_overall_status(lang: Language) -> dict[str, Any]:
         A dictionary containing the computed ``overall`` status and the
         per-status ``counts`` map.
     """
-    rows = (
-        Answer.objects
-        .filter(language=lang)
-        .values("status")
-        .annotate(c=Count("id"))
-    )
-
+    p = get_progress(lang.pk)
     counts = {
-        "pending": 0,
-        "waiting": 0,
-        "approved": 0,
-        "rejected": 0,
+        "pending": p.pending,
+        "waiting": p.waiting,
+        "approved": p.approved,
+        "rejected": p.rejected,
     }
-
-    # mappa status DB -> chiavi counts
-    key_map = {
-        AnswerStatus.PENDING: "pending",
-        AnswerStatus.WAITING: "waiting",
-        AnswerStatus.APPROVED: "approved",
-        AnswerStatus.REJECTED: "rejected",
-    }
-
-    seen_status = set()
-    for r in rows:
-        status = r["status"]
-        seen_status.add(status)
-        key = key_map.get(status)
-        if key:
-            counts[key] += r["c"]
-
-    if AnswerStatus.WAITING in seen_status:
-        overall = AnswerStatus.WAITING
-    elif AnswerStatus.APPROVED in seen_status:
-        overall = AnswerStatus.APPROVED
-    elif AnswerStatus.REJECTED in seen_status:
-        overall = AnswerStatus.REJECTED
-    else:
-        overall = AnswerStatus.PENDING
-
-    return {"overall": overall, "counts": counts}
+    return {"overall": p.overall, "counts": counts}
 
 
 
 def _all_questions_answered(language: Language) -> bool:
     """Return whether all active questions have a yes/no answer.
 
+    Answers are unique per (language, question) and always ``yes``/``no``,
+    so the answered count in ``LanguageProgress`` is enough.
+
     Args:
         language: Language to evaluate.
 
@@ -226,19 +203,7 @@ def _all_questions_answered(language: Language) -> bool:
         ``True`` when every active question has a ``yes`` or ``no`` answer for
         the given language; otherwise ``False``.
     """
-    active_qids = set(
-        Question.objects.filter(parameter__is_active=True).values_list("id", flat=True)
-    )
-    if not active_qids:
-        return False 
-    answered_qids = set(
-        Answer.objects.filter(
-            language=language,
-            question_id__in=active_qids,
-            response_text__in=["yes", "no"],
-        ).values_list("question_id", flat=True)
-    )
-    return active_qids.issubset(answered_qids)
+    return is_complete(get_progress(language.pk))
 
 
 # -----------------------
@@ -251,56 +216,45 @@ from urllib.parse import urlencode
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 
-@login_required
-@require_http_methods(["GET"])
-def language_list(request: HttpRequest) -> HttpResponse:
-    """Render the language list with filtering and sortable columns."""
+LANGUAGE_LIST_PAGE_SIZE = 50
+
+LANGUAGE_LIST_FILTERS = ("q", "f_lang_top_family", "f_lang_family", "f_lang_grp", "f_lang_hist")
 
-    q = (request.GET.get("q") or "").strip()
 
-    # --- Nuovi Filtri ---
+def _filter_language_list(qs: QuerySet, request: HttpRequest, is_admin: bool) -> QuerySet:
+    """Apply the language list visibility, search and filters to a queryset.
+
+    Shared by the list rows and its map layer (``language_map_data`` with
+    ``scope=list``), so both always show the same languages.
+
+    Args:
+        qs: Base ``Language`` queryset.
+        request: Current HTTP request; filters are read from ``request.GET``.
+        is_admin: Whether the user sees every language.
+
+    Returns:
+        The filtered queryset (annotated with ``search_rank`` when searching).
+    """
+    user = request.user
+    q = (request.GET.get("q") or "").strip()
     f_lang_top_family = request.GET.get("f_lang_top_family", "").strip()
     f_lang_family = request.GET.get("f_lang_family", "").strip()
     f_lang_hist = request.GET.get("f_lang_hist", "all").strip()
     f_lang_grp = request.GET.get("f_lang_grp", "").strip()
 
-    # Parametri per ordinamento
-    sort_key = (request.GET.get("sort") or "name").strip()
-    sort_dir = (request.GET.get("dir") or "asc").strip()
-
-    user = request.user
-    is_admin = _is_admin(user)
-
-    qs = (
-        Language.objects
-        .select_related("assigned_user")
-        .annotate(last_change=Max("answers__updated_at"))
-    )
-
     if not is_admin:
-        qs = qs.filter(Q(assigned_user=user) | Q(users=user))
+        qs = qs.filter(Q(assigned_user=user) | Q(users=user)).distinct()
 
-    # --- Filtro Ricerca Testuale ---
+    # --- Filtro Ricerca Testuale (indice trigram, vedi core.services.search) ---
     if q:
-        filt = (
-            Q(id__icontains=q)
-            | Q(name_full__icontains=q)
-            | Q(isocode__icontains=q)
-            | Q(glottocode__icontains=q)
-            | Q(grp__icontains=q)
-            | Q(informant__icontains=q)
-            | Q(supervisor__icontains=q)
-            | Q(family__icontains=q)
-            | Q(top_level_family__icontains=q)
-            | Q(source__icontains=q)
-        )
+        extra = Q(pk__in=[])
         if q.lower() in {"hist", "stor", "storica", "storico", "true", "yes"}:
-            filt |= Q(historical_language=True)
+            extra |= Q(historical_language=True)
         if q.lower() in {"false", "no"}:
-            filt |= Q(historical_language=False)
+            extra |= Q(historical_language=False)
         if is_admin:
-            filt |= Q(assigned_user__email__icontains=q)
-        qs = qs.filter(filt)
+            extra |= Q(assigned_user__email__icontains=q)
+        qs = search(qs, q, extra=extra)
 
     # --- Applicazione Filtri Avanzati ---
     if f_lang_top_family:
@@ -309,80 +263,109 @@ def language_list(request: HttpRequest) -> HttpResponse:
         qs = qs.filter(family=f_lang_family)
     if f_lang_grp:
         qs = qs.filter(grp=f_lang_grp)
-    
+
     if f_lang_hist == "yes":
         qs = qs.filter(historical_language=True)
     elif f_lang_hist == "no":
         qs = qs.filter(historical_language=False)
+    return qs
+
+
+@login_required
+@require_http_methods(["GET"])
+def language_list(request: HttpRequest) -> HttpResponse:
+    """Render the language list with filtering and sortable columns.
+
+    Rows are keyset-paginated (``?after=<cursor>``) on the active sort key,
+    with ``position`` as tiebreaker. HTMX requests (live search, "Load more")
+    get only the ``<tbody>`` rows partial.
+    """
+
+    q = (request.GET.get("q") or "").strip()
+
+    # Parametri per ordinamento (con una ricerca attiva il default è la rilevanza)
+    sort_key = (request.GET.get("sort") or ("relevance" if q else "name")).strip()
+    sort_dir = (request.GET.get("dir") or "asc").strip()
+
+    user = request.user
+    is_admin = _is_admin(user)
+
+    qs = _filter_language_list(
+        Language.objects
+        .select_related("assigned_user")
+        .defer("search_text")
+        .annotate(last_change=F("progress__last_change")),
+        request, is_admin,
+    )
 
     # --- Popolamento Dropdown 
     opt_top_families = Language.objects.exclude(top_level_family__isnull=True).exclude(top_level_family="").values_list("top_level_family", flat=True).distinct().order_by("top_level_family")
     opt_families = Language.objects.exclude(family__isnull=True).exclude(family="").values_list("family", flat=True).distinct().order_by("family")
     opt_groups = Language.objects.exclude(grp__isnull=True).exclude(grp="").values_list("grp", flat=True).distinct().order_by("grp")
 
+    # chiave di ordinamento -> (campo/annotazione, può essere NULL); position chiude l'ordine
     sort_map = {
-        "id": "id",
-        "name": "name_full",
-        "top": "top_level_family",
-        "family": "family",
-        "group": "grp",
-        "modified": "last_change",
-        "lat": "latitude",
-        "lon": "longitude",
+        "id": ("id", False),
+        "name": ("_name_ci", False),
+        "top": ("_top_ci", False),
+        "family": ("family", False),
+        "group": ("grp", True),
+        "modified": ("last_change", True),
+        "lat": ("latitude", True),
+        "lon": ("longitude", True),
     }
+    if q:
+        sort_map["relevance"] = ("search_rank", False)
+
+    active_sort = sort_key if sort_key in sort_map else None
+    if active_sort == "name":
+        qs = qs.annotate(_name_ci=Lower("name_full"))
+    elif active_sort == "top":
+        qs = qs.annotate(_top_ci=Lower("top_level_family"))
+
+    if active_sort == "id":
+        keys = [SortKey("id", descending=(sort_dir == "desc"))]
+    elif active_sort == "relevance":
+        keys = [SortKey("search_rank", descending=True), SortKey("position")]
+    elif active_sort:
+        order_field, nullable = sort_map[active_sort]
+        keys = [SortKey(order_field, descending=(sort_dir == "desc"), nullable=nullable), SortKey("position")]
+    else:
+        keys = [SortKey("position")]
 
-    active_sort = None
-    if sort_key in sort_map:
-        active_sort = sort_key
-        if sort_key == "name":
-            qs = qs.annotate(_name_ci=Lower("name_full"))
-            order_field = "_name_ci"
-        elif sort_key == "top":
-            qs = qs.annotate(_top_ci=Lower("top_level_family"))
-            order_field = "_top_ci"
-        else:
-            order_field = sort_map[sort_key]
-
-        if sort_dir == "desc":
-            qs = qs.order_by(f"-{order_field}", "position")
-        else:
-            qs = qs.order_by(order_field, "position")
+    # Paginazione keyset: ?after=<cursore> riparte dall'ultima riga della pagina precedente
+    page = keyset_page(qs, keys, cursor=request.GET.get("after", ""), size=LANGUAGE_LIST_PAGE_SIZE)
+    next_url = None
+    if page.has_next:
+        next_params = request.GET.copy()
+        next_params["after"] = page.next_cursor
+        next_url = "?" + next_params.urlencode()
 
     # Genera gli URL per l'ordinamento mantenendo TUTTI i parametri correnti (ricerca + filtri)
     def _toggle_url(column: str) -> str:
         next_dir = "desc" if (active_sort == column and sort_dir == "asc") else "asc"
         get_params = request.GET.copy()
+        get_params.pop("after", None)
         get_params["sort"] = column
         get_params["dir"] = next_dir
         return "?" + get_params.urlencode()
 
-    sort_urls = {k: _toggle_url(k) for k in sort_map.keys()}
+    rows_ctx = {"languages": page.rows, "next_url": next_url, "is_admin": is_admin}
+    # HTMX: ricerca "live" (sostituisce il tbody) o "Load more" (appende la pagina successiva)
+    if request.headers.get("HX-Request"):
+        return render(request, "languages/partials/list_rows.html", rows_ctx)
 
+    sort_urls = {k: _toggle_url(k) for k in sort_map.keys()}
+    first_params = request.GET.copy()
+    first_params.pop("after", None)
 
-
-    map_languages = qs.exclude(latitude__isnull=True).exclude(longitude__isnull=True)
-    
-    map_data = []
-    for lang in map_languages:
-        try:
-            map_data.append({
-                'id': lang.id,
-                'name': lang.name_full,
-                'lat': float(lang.latitude),  
-                'lng': float(lang.longitude),
-                'family': lang.family if lang.family else 'Unknown',
-                'top_level_family': lang.top_level_family if lang.top_level_family else 'Unknown'
-            })
-        except (ValueError, TypeError):
-            # Ignora le lingue le cui coordinate non sono convertibili in float
-            continue
-
-    map_data_json = json.dumps(map_data)
+    # La mappa carica il layer GeoJSON da language_map_data con scope=list e gli stessi
+    # parametri di ricerca/filtro: il server restituisce le stesse lingue delle righe.
 
 
     ctx = {
-            "languages": qs,
-            "page_obj": None,
+            **rows_ctx,
+            "first_url": ("?" + first_params.urlencode()) if "after" in request.GET else None,
             "q": q,
             "is_admin": is_admin,
             "sort": active_sort,
@@ -392,11 +375,76 @@ def language_list(request: HttpRequest) -> HttpResponse:
             "opt_top_families": opt_top_families,
             "opt_families": opt_families,
             "opt_groups": opt_groups,
-            "map_data_json": map_data_json, 
         }
     return render(request, "languages/list.html", ctx)
 
 
+def _map_layer_scope(request: HttpRequest) -> tuple[bool, list[str] | None]:
+    """Resolve which variant of the map layer the request may see.
+
+    Without ``scope=list`` the public variant is served (name and families of
+    every language). With ``scope=list`` the full variant is served, limited
+    to the languages the list shows for the same search and filters
+    (``_filter_language_list``); admins without filters get the cached layer.
+
+    Args:
+        request: Current HTTP request.
+
+    Returns:
+        ``(full, language_ids)`` as expected by ``map_payload``.
+
+    Raises:
+        PermissionDenied: If ``scope=list`` is requested anonymously.
+    """
+    if not hasattr(request, "_map_layer_scope"):
+        user = request.user
+        if request.GET.get("scope") != "list":
+            scope = (False, None)
+        elif not user.is_authenticated:
+            raise PermissionDenied
+        else:
+            is_admin = _is_admin(user)
+            filtered = any(
+                request.GET.get(k, "").strip() not in ("", "all") for k in LANGUAGE_LIST_FILTERS
+            )
+            if is_admin and not filtered:
+                scope = (True, None)
+            else:
+                qs = _filter_language_list(Language.objects.all(), request, is_admin)
+                scope = (True, list(qs.order_by().values_list("id", flat=True)))
+        request._map_layer_scope = scope
+    return request._map_layer_scope
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=lambda request: map_data_etag(*_map_layer_scope(request)))
+def language_map_data(request: HttpRequest) -> HttpResponse:
+    """Serve the GeoJSON layer of the languages with coordinates.
+
+    Public endpoint shared by the language list and the public dashboard.
+    The public variant only carries name and families; the language list
+    asks for ``scope=list`` with its search and filters, and gets the same
+    languages as its rows (restricted server-side for non-admin users).
+    The payload is versioned: the ETag changes on any ``Language``
+    save/delete, so conditional GETs get ``304 Not Modified`` until then.
+
+    Args:
+        request: Current HTTP request.
+
+    Returns:
+        ``application/geo+json`` response with a ``FeatureCollection``.
+    """
+    full, language_ids = _map_layer_scope(request)
+    etag, body = map_payload(full, language_ids)
+    response = HttpResponse(body, content_type="application/geo+json")
+    response["ETag"] = etag
+    if full:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
 
 
 
@@ -449,6 +497,33 @@ def language_edit(request: HttpRequest, lang_id: str) -> HttpResponse:
     return render(request, "languages/edit.html", {"page_title": "Edit language", "form": form, "language": lang})
 
 
+@login_required
+@require_POST
+def language_reorder(request: HttpRequest) -> JsonResponse:
+    """Apply a complete new order of the languages in one statement (admin only).
+
+    Args:
+        request: Current authenticated HTTP request with a JSON body
+            ``{"ids": [...]}`` listing every language id once, in order.
+
+    Returns:
+        JSON ``{"ok": true, "updated": n}``; 400 with an ``error`` for a body
+        that is not a full permutation, 403 for non-admin users.
+    """
+    if not _is_admin(request.user):
+        return JsonResponse({"error": _t("Only admins can reorder languages.")}, status=403)
+    try:
+        ids = json.loads(request.body or b"{}").get("ids")
+        if not isinstance(ids, list):
+            raise ValueError("Expected a JSON body with an 'ids' list.")
+        updated = reorder(Language, ids)
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({"error": _t(str(e))}, status=400)
+    # UPDATE diretto: nessun post_save, la mappa va riversionata a mano
+    transaction.on_commit(bump_map_data)
+    return JsonResponse({"ok": True, "updated": updated})
+
+
 
 @login_required
 @require_POST
@@ -475,6 +550,8 @@ def language_delete(request: HttpRequest, lang_id: str) -> HttpResponse:
         messages.error(request, _t("Incorrect password. Deletion aborted."))
         return redirect("language_edit", lang_id=lang_id)
 
+    # snapshot prima, in ordine di dipendenza (ref/delta prima delle loro basi)
+    delete_submissions(lang.submissions.values_list("id", flat=True))
     lang.delete()
     messages.success(request, _t(f"Language “{lang_id}” and related data deleted."))
     return redirect("language_list")
@@ -484,10 +561,129 @@ def language_delete(request: HttpRequest, lang_id: str) -> HttpResponse:
 # -----------------------
 # Pagina data/compilazione
 # -----------------------
+_EMPTY_ANSWER = dict(response_text="", comments="", motivation_ids=[], examples=[], answer_id=None, version="")
+
+
+def _questions_with_answers(lang: Language, parameter_ids: list[str] | None = None) -> dict[str, list[Question]]:
+    """Load active questions (optionally of some parameters) with this language's answers.
+
+    Each question gets ``allowed_motivations_list`` and an ``ans`` namespace
+    (response, comments, motivation ids, examples) as used by
+    ``languages/partials/param_questions.html``.
+
+    Args:
+        lang: Language being compiled.
+        parameter_ids: Restrict to these parameters; ``None`` loads all active ones.
+
+    Returns:
+        Mapping ``parameter_id -> [Question, ...]`` ordered by question id.
+    """
+    through_qs = QuestionAllowedMotivation.objects.select_related("motivation").order_by("position", "id")
+    questions_qs = (
+        Question.objects.filter(parameter__is_active=True)
+        .order_by("id")
+        .prefetch_related(Prefetch("allowed_motivation_links", queryset=through_qs, to_attr="pref_links"))
+    )
+    answers_qs = (
+        Answer.objects.filter(language=lang, question__parameter__is_active=True)
+        .prefetch_related("answer_motivations", "examples")
+    )
+    if parameter_ids is not None:
+        questions_qs = questions_qs.filter(parameter_id__in=parameter_ids)
+        answers_qs = answers_qs.filter(question__parameter_id__in=parameter_ids)
+    answers_by_qid = {a.question_id: a for a in answers_qs}
+
+    out: dict[str, list[Question]] = {}
+    for q in questions_qs:
+        links = getattr(q, "pref_links", [])
+        q.allowed_motivations_list = [l.motivation for l in links] if links else []
+        a = answers_by_qid.get(q.id)
+        if a:
+            q.ans = SimpleNamespace(
+                response_text=(a.response_text or ""),
+                comments=(a.comments or ""),
+                motivation_ids=[am.motivation_id for am in a.answer_motivations.all()],
+                examples=list(a.examples.all()),
+                answer_id=a.id,
+                version=answer_version(a),
+            )
+        else:
+            q.ans = SimpleNamespace(**_EMPTY_ANSWER)
+        out.setdefault(q.parameter_id, []).append(q)
+    return out
+
+
+def _parameter_index(lang: Language) -> tuple[list[ParameterDef], int, int]:
+    """Return active parameters with per-language status, without loading questions.
+
+    Two grouped count queries (questions per parameter, yes/no answers per
+    parameter for this language) replace the full prefetch.
+
+    Args:
+        lang: Language being compiled.
+
+    Returns:
+        ``(parameters, active_question_total, active_question_answered)``; each
+        parameter carries ``status``, ``bg_color`` and ``fg_color``.
+    """
+    parameters = list(
+        ParameterDef.objects.filter(is_active=True)
+        .order_by("position")
+        .only("id", "name", "short_description", "position")
+    )
+    totals = dict(
+        Question.objects.filter(parameter__is_active=True)
+        .values("parameter_id").annotate(n=Count("id")).values_list("parameter_id", "n")
+    )
+    answered = dict(
+        Answer.objects.filter(language=lang, question__parameter__is_active=True, response_text__in=("yes", "no"))
+        .values("question__parameter_id").annotate(n=Count("id")).values_list("question__parameter_id", "n")
+    )
+    # Ora guarda se il parametro è rosso, a prescindere da chi lo ha flaggato
+    flagged_pids = set(
+        ParameterReviewFlag.objects.filter(language=lang, flag=True).values_list("parameter_id", flat=True)
+    )
+
+    for p in parameters:
+        p.status, p.bg_color, p.fg_color = _param_status(
+            totals.get(p.id, 0), answered.get(p.id, 0), p.id in flagged_pids
+        )
+
+    return parameters, sum(totals.values()), sum(answered.values())
+
+
+def _param_status(total: int, done: int, is_flagged: bool) -> tuple[str, str, str]:
+    """Return ``(status, bg_color, fg_color)`` of a parameter in the data page index."""
+    is_touched = done > 0
+    is_complete = (total > 0 and done == total)
+
+    if not is_touched:
+        return "untouched", "transparent", "inherit"
+    if is_complete and not is_flagged:
+        return "ok", "#e6f7e9", "#0f5132"
+    return "red", "#ffe8e8", "#842029"
+
+
+def _single_param_status(lang: Language, param_id: str) -> dict[str, Any]:
+    """Status of one parameter for ``lang``, as in ``_parameter_index`` (used by autosave)."""
+    total = Question.objects.filter(parameter_id=param_id).count()
+    done = Answer.objects.filter(
+        language=lang, question__parameter_id=param_id, response_text__in=("yes", "no")
+    ).count()
+    flagged = ParameterReviewFlag.objects.filter(language=lang, parameter_id=param_id, flag=True).exists()
+    status, bg, fg = _param_status(total, done, flagged)
+    return {"id": param_id, "status": status, "bg_color": bg, "fg_color": fg, "answered": done, "total": total}
+
+
 @login_required
 def language_data(request: HttpRequest, lang_id: str) -> HttpResponse:
     """Render the language compilation page with parameters and answers.
 
+    By default the page is progressive: it renders the parameter index with
+    per-parameter status, and each parameter's questions are fetched through
+    HTMX (``language_param_fragment``) when its section is opened.
+    ``?full=1`` renders every parameter inline as before.
+
     Args:
         request: Current authenticated HTTP request.
         lang_id: Primary key of the language being compiled.
@@ -502,71 +698,12 @@ def language_data(request: HttpRequest, lang_id: str) -> HttpResponse:
         messages.error(request, _t("You don't have access to this language."))
         return redirect("language_list")
 
-    questions_qs = Question.objects.order_by("id")
-    through_qs = QuestionAllowedMotivation.objects.select_related("motivation").order_by("position", "id")
-    parameters = (
-        ParameterDef.objects.filter(is_active=True)
-        .order_by("position")
-        .prefetch_related(
-            Prefetch("questions", queryset=questions_qs),
-            Prefetch("questions__allowed_motivation_links", queryset=through_qs, to_attr="pref_links"),
-        )
-    )
-
-    answers_qs = (
-        Answer.objects.filter(language=lang)
-        .select_related("question")
-        .prefetch_related("answer_motivations__motivation", "examples")
-    )
-    answers_by_qid = {a.question_id: a for a in answers_qs}
-
-    # Ora guarda se il parametro è rosso, a prescindere da chi lo ha flaggato
-    flagged_pids = set(
-        ParameterReviewFlag.objects.filter(language=lang, flag=True).values_list("parameter_id", flat=True)
-    )
-
-    active_q_total = 0
-    active_q_answered = 0
-
-    for p in parameters:
-        total = 0
-        answered = 0
-        for q in p.questions.all():
-            total += 1
-            active_q_total += 1
-            links = getattr(q, "pref_links", [])
-            q.allowed_motivations_list = [l.motivation for l in links] if links else []
-            a = answers_by_qid.get(q.id)
-            if a:
-                q.ans = SimpleNamespace(
-                    response_text=(a.response_text or ""),
-                    comments=(a.comments or ""),
-                    motivation_ids=[am.motivation_id for am in a.answer_motivations.all()],
-                    examples=list(a.examples.all()),
-                    answer_id=a.id,
-                )
-                if a.response_text in ("yes", "no"):
-                    answered += 1
-                    active_q_answered += 1
-            else:
-                q.ans = SimpleNamespace(response_text="", comments="", motivation_ids=[], examples=[], answer_id=None)
-
-        is_touched = answered > 0
-        is_complete = (total > 0 and answered == total)
-        is_flagged = p.id in flagged_pids
-
-        if not is_touched:
-            p.status = "untouched"
-            p.bg_color = "transparent"
-            p.fg_color = "inherit"
-        elif is_complete and not is_flagged:
-            p.status = "ok"
-            p.bg_color = "#e6f7e9"
-            p.fg_color = "#0f5132"
-        else:
-            p.status = "red"
-            p.bg_color = "#ffe8e8"
-            p.fg_color = "#842029"
+    progressive = request.GET.get("full") != "1"
+    parameters, active_q_total, active_q_answered = _parameter_index(lang)
+    if not progressive:
+        by_param = _questions_with_answers(lang)
+        for p in parameters:
+            p.question_list = by_param.get(p.id, [])
 
     all_answered = (active_q_total > 0 and active_q_answered == active_q_total)
     lang_status = _language_overall_status(lang)
@@ -577,6 +714,7 @@ def language_data(request: HttpRequest, lang_id: str) -> HttpResponse:
     ctx = {
         "language": lang,
         "parameters": parameters,
+        "progressive": progressive,
         "is_admin": is_admin,
         "all_answered": all_answered,
         "lang_status": lang_status,
@@ -585,6 +723,46 @@ def language_data(request: HttpRequest, lang_id: str) -> HttpResponse:
     return render(request, "languages/data.html", ctx)
 
 
+@login_required
+@require_http_methods(["GET"])
+def language_param_fragment(request: HttpRequest, lang_id: str, param_id: str) -> HttpResponse:
+    """Return the questions, answers and examples of one parameter (HTMX partial).
+
+    The rendered HTML is cached per (language, parameter, variant), where the
+    variant covers what changes the markup only: admin or not, and the
+    language review status that locks the fields. Saves invalidate it (see
+    ``core.services.language_data_cache``).
+
+    Args:
+        request: Current authenticated HTTP request.
+        lang_id: Primary key of the language being compiled.
+        param_id: Primary key of the active parameter to render.
+
+    Returns:
+        HTML fragment for the parameter section body.
+    """
+    lang = get_object_or_404(Language, pk=lang_id)
+    if not _check_language_access(request.user, lang):
+        return HttpResponse(status=403)
+    get_object_or_404(ParameterDef, pk=param_id, is_active=True)
+
+    is_admin = _is_admin(request.user)
+    lang_status = _language_overall_status(lang)
+    key = fragment_key(lang.id, param_id, f"{int(is_admin)}:{lang_status['overall']}")
+    html = get_fragment(key)
+    if html is None:
+        questions = _questions_with_answers(lang, [param_id]).get(param_id, [])
+        html = render_to_string(
+            "languages/partials/param_questions.html",
+            {"questions": questions, "is_admin": is_admin, "lang_status": lang_status},
+            request=request,
+        )
+        set_fragment(key, html)
+    response = HttpResponse(html)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 @login_required
 @require_http_methods(["POST"])
 @transaction.atomic
@@ -601,9 +779,9 @@ def parameter_save(request: HttpRequest, lang_id: str, param_id: str) -> HttpRes
         to the language list when the language no longer exists.
     """
 
-    try:
-        lang = Language.objects.select_for_update().get(pk=lang_id)
-    except Language.DoesNotExist:
+    # Nessun lock sulla riga Language: save_answers blocca solo (lingua, parametro)
+    lang = Language.objects.filter(pk=lang_id).first()
+    if lang is None:
         messages.warning(request, _t("This language was deleted while you were saving. Your changes were not saved."))
         return redirect("language_list")
     if not _check_language_access(request.user, lang):
@@ -611,153 +789,14 @@ def parameter_save(request: HttpRequest, lang_id: str, param_id: str) -> HttpRes
         return redirect("language_list")
 
     param = get_object_or_404(ParameterDef, pk=param_id, is_active=True)
-    questions = list(param.questions.all())
-
-    saved_count = 0
-    FIELDS = {"number", "textarea", "transliteration", "gloss", "translation", "reference"}
-
-    for q in questions:
-        response_text = (request.POST.get(f"resp_{q.id}") or "").strip().lower()
-        comments = (request.POST.get(f"com_{q.id}") or "").strip()
-
-        if response_text not in ("yes", "no"):
-            continue
-
-        # Lock dell'Answer se esiste (evita corse su update concorrenti); se non esiste, la creiamo.
-        answer = (
-            Answer.objects.select_for_update()
-            .filter(language=lang, question=q)
-            .first()
-        )
-        if answer is None:
-            answer = Answer(language=lang, question=q)
-
-        del_ids = []
-        for key, val in request.POST.items():
-            if key.startswith("del_ex_") and (val or "").strip() == "1":
-                try:
-                    del_ids.append(int(key.split("_", 2)[2]))
-                except ValueError:
-                    pass
-
-        updated_textareas = {}
-        for key, val in request.POST.items():
-            if not key.startswith("ex_"):
-                continue
-            try:
-                _ex, ex_id, field = key.split("_", 2)
-                ex_id = int(ex_id)
-            except ValueError:
-                continue
-            if field == "textarea":
-                updated_textareas[ex_id] = (val or "").strip()
-
-        prefix = f"newex_{q.id}_"
-        buckets = {}
-        for key, val in request.POST.items():
-            if not key.startswith(prefix):
-                continue
-            remainder = key[len(prefix):]
-            try:
-                uid, field = remainder.rsplit("_", 1)
-            except ValueError:
-                continue
-            if field not in FIELDS:
-                continue
-            buckets.setdefault(uid, {})[field] = (val or "").strip()
-
-
-
-        if response_text == "yes":
-            nonempty_count = 0
-            existing_qs = Example.objects.filter(answer__language=lang, answer__question=q)
-            existing_map = {ex.id: ex for ex in existing_qs}
-
-            # Conta gli esempi esistenti validi (non eliminati)
-            for ex_id, ex in existing_map.items():
-                if ex_id in del_ids:
-                    continue
-                tx = updated_textareas.get(ex_id, (ex.textarea or "").strip())
-                if tx:
-                    nonempty_count += 1
-
-            # Conta i nuovi esempi validi creati
-            if buckets:
-                for _uid, data in buckets.items():
-                    if (data.get("textarea") or "").strip():
-                        nonempty_count += 1
-
-            if nonempty_count < 2:
-                messages.error(request,
-                               _t("If you answer YES, you must provide at least two examples with a non-empty text."))
-                return redirect(f"{reverse('language_data', kwargs={'lang_id': lang.id})}#p-{param.id}")
-
-
+    questions = list(param.questions.values_list("id", flat=True))
 
-
-        answer.response_text = response_text
-        answer.comments = comments
-        answer.save()
-        saved_count += 1
-
-        try:
-            target_ids = {int(x) for x in request.POST.getlist(f"mot_{q.id}")}
-        except ValueError:
-            target_ids = set()
-        allowed_ids = set(
-            QuestionAllowedMotivation.objects.filter(question=q).values_list("motivation_id", flat=True)
-        )
-        target_ids &= allowed_ids
-        current_ids = set(AnswerMotivation.objects.filter(answer=answer).values_list("motivation_id", flat=True))
-        to_add = target_ids - current_ids
-        to_del = current_ids - target_ids
-        if to_add:
-            AnswerMotivation.objects.bulk_create(
-                [AnswerMotivation(answer=answer, motivation_id=mid) for mid in to_add],
-                ignore_conflicts=True,
-            )
-        if to_del:
-            AnswerMotivation.objects.filter(answer=answer, motivation_id__in=to_del).delete()
-
-        if del_ids:
-            Example.objects.filter(answer=answer, id__in=del_ids).delete()
-
-        for key, val in request.POST.items():
-            if not key.startswith("ex_"):
-                continue
-            try:
-                _ex, ex_id, field = key.split("_", 2)
-                ex_id = int(ex_id)
-            except ValueError:
-                continue
-            if field not in FIELDS:
-                continue
-            cleaned = (val or "").strip()
-            Example.objects.filter(id=ex_id, answer=answer).update(**{field: cleaned})
-
-        if buckets:
-            to_create = []
-            for idx, (uid, data) in enumerate(buckets.items()):
-                has_payload = any([
-                    data.get("textarea"),
-                    data.get("transliteration"),
-                    data.get("gloss"),
-                    data.get("translation"),
-                    data.get("reference"),
-                ])
-                if not has_payload:
-                    continue
-                to_create.append(Example(
-                    answer=answer,
-                    number=str(idx + 1),
-                    textarea=data.get("textarea", ""),
-                    transliteration=data.get("transliteration", ""),
-                    gloss=data.get("gloss", ""),
-                    translation=data.get("translation", ""),
-                    reference=data.get("reference", ""),
-                ))
-            if to_create:
-                Example.objects.bulk_create(to_create, ignore_conflicts=True)
+    payload = parse_parameter_post(request.POST, questions)
+    try:
+        saved_count = len(save_answers(lang, param.id, payload))
+    except AnswerValidationError as e:
+        messages.error(request, _t(f"{e} Questions: {', '.join(e.question_ids)}."))
+        return redirect(f"{reverse('language_data', kwargs={'lang_id': lang.id})}#p-{param.id}")
 
     action = (request.POST.get("action") or "save").strip().lower() 
     
@@ -800,7 +839,7 @@ def parameter_save(request: HttpRequest, lang_id: str, param_id: str) -> HttpRes
 @login_required
 @require_http_methods(["POST"])
 @transaction.atomic
-def answer_save(request: HttpRequest, lang_id: str, question_id: str) -> HttpResponse | None:
+def answer_save(request: HttpRequest, lang_id: str, question_id: str) -> HttpResponse:
     """Save a single answer with motivations and examples.
 
     Args:
@@ -820,15 +859,13 @@ def answer_save(request: HttpRequest, lang_id: str, question_id: str) -> HttpRes
 
     question = get_object_or_404(Question, pk=question_id)
 
-    # 1) Input di base
-    response_text = (request.POST.get("response_text") or "").strip().lower()
-    if response_text not in ("yes", "no"):
+    payload = parse_answer_post(request.POST, question.id)
+    if not payload.questions[question.id].answered:
         messages.error(request, _t("Invalid answer value."))
         return redirect("language_data", lang_id=lang.id)
 
-    comments = (request.POST.get("comments") or "").strip()
-
-    # 2) Lock/crea Answer
+    # prima il lock (lingua, parametro), poi la riga: stesso ordine di save_answers
+    lock_language_parameters(lang.id, [question.parameter_id])
     answer = (
         Answer.objects.select_for_update()
         .filter(language=lang, question=question)
@@ -837,128 +874,74 @@ def answer_save(request: HttpRequest, lang_id: str, question_id: str) -> HttpRes
     if answer and not answer.modifiable and not _is_admin(request.user):
         messages.error(request, _t("This answer is locked (waiting/approved)."))
         return redirect("language_data", lang_id=lang.id)
-    if answer is None:
-        answer = Answer(language=lang, question=question)
-
-    # 3) Salva header
-    answer.response_text = response_text
-    answer.comments = comments
-    answer.save()
 
-    # 4) Motivazioni
     try:
-        motivation_ids = {int(x) for x in request.POST.getlist("motivation_ids")}
-    except ValueError:
-        motivation_ids = set()
-
-    allowed_ids = set(
-        QuestionAllowedMotivation.objects.filter(question=question).values_list("motivation_id", flat=True)
-    )
-    motivation_ids &= allowed_ids
-
-    current_ids = set(AnswerMotivation.objects.filter(answer=answer).values_list("motivation_id", flat=True))
-    to_add = motivation_ids - current_ids
-    to_del = current_ids - motivation_ids
-    if to_add:
-        AnswerMotivation.objects.bulk_create(
-            [AnswerMotivation(answer=answer, motivation_id=mid) for mid in to_add],
-            ignore_conflicts=True,
-        )
-    if to_del:
-        AnswerMotivation.objects.filter(answer=answer, motivation_id__in=to_del).delete()
+        save_answers(lang, question.parameter_id, payload)
+    except AnswerValidationError as e:
+        messages.error(request, _t(f"{e}"))
+    else:
+        messages.success(request, _t("Answer saved."))
+    return redirect(f"{reverse('language_data', kwargs={'lang_id': lang.id})}#p-{question.parameter_id}")
 
-    # 5) ESEMPI: raccolta mutazioni + VALIDAZIONE + applicazione (singola domanda)
-    FIELDS = {"number", "textarea", "transliteration", "gloss", "translation", "reference"}
 
-    # 5.1) Raccolta delete
-    del_ids = []
-    for key, val in request.POST.items():
-        if not key.startswith("del_ex_"):
-            continue
-        if (val or "").strip() != "1":
-            continue
-        try:
-            del_ids.append(int(key.split("_", 2)[2]))
-        except ValueError:
-            pass
-
-    # 5.2) Raccolta update delle textarea esistenti
-    updated_textareas = {}
-    for key, val in request.POST.items():
-        if not key.startswith("ex_"):
-            continue
-        try:
-            _ex, ex_id, field = key.split("_", 2)
-            ex_id = int(ex_id)
-        except ValueError:
-            continue
-        if field == "textarea":
-            updated_textareas[ex_id] = (val or "").strip()
-
-    # 5.3) Raccolta nuovi esempi
-    prefix = f"newex_{question.id}_"
-    buckets = {}
-    for key, val in request.POST.items():
-        if not key.startswith(prefix):
-            continue
-        remainder = key[len(prefix):]
-        try:
-            uid, field = remainder.rsplit("_", 1)
-        except ValueError:
-            continue
-        if field not in FIELDS:
-            continue
-        buckets.setdefault(uid, {})[field] = (val or "").strip()
 
-    # 5.4) VALIDAZIONE per YES
-    if response_text == "yes":
 
-        if del_ids:
-            Example.objects.filter(answer=answer, id__in=del_ids).delete()
+@login_required
+@require_http_methods(["POST"])
+def answer_autosave(request: HttpRequest, lang_id: str, question_id: str) -> JsonResponse:
+    """Apply a JSON patch to one answer with optimistic concurrency (autosave).
 
-        for key, val in request.POST.items():
-            if not key.startswith("ex_"):
-                continue
-            try:
-                _ex, ex_id, field = key.split("_", 2)
-                ex_id = int(ex_id)
-            except ValueError:
-                continue
-            if field not in FIELDS:
-                continue
-            cleaned = (val or "").strip()
-            Example.objects.filter(id=ex_id, answer=answer).update(**{field: cleaned})
-
-        if buckets:
-            to_create = []
-            for idx, (uid, data) in enumerate(buckets.items()):
-                has_payload = any([
-                    data.get("textarea"),
-                    data.get("transliteration"),
-                    data.get("gloss"),
-                    data.get("translation"),
-                    data.get("reference"),
-                ])
+    The body carries the answer version the client last saw (``updated_at``)
+    and only the keys that changed: ``response_text``, ``comments``,
+    ``motivation_ids`` and ``examples`` (``update``/``delete``/``create``).
+    No row locks are taken up front: a stale version yields 409 with the
+    server's copy of the question block, so the client can reload it.
 
-                if not has_payload:
-                    continue
-                to_create.append(Example(
-                    answer=answer,
-                    num=str(idx + 1),
-                    textarea=data.get("textarea", ""),
-                    transliteration=data.get("transliteration", ""),
-                    gloss=data.get("gloss", ""),
-                    translation=data.get("translation", ""),
-                    reference=data.get("reference", ""),
-                ))
-            if to_create:
-                Example.objects.bulk_create(to_create, ignore_conflicts=True)
+    Args:
+        request: Current authenticated HTTP request with a JSON body.
+        lang_id: Primary key of the target language.
+        question_id: Primary key of the question being answered.
 
-        messages.success(request, _t("Answer saved."))
-        return redirect(f"{reverse('language_data', kwargs={'lang_id': lang.id})}#p-{question.parameter_id}")
+    Returns:
+        JSON with the new ``version``, ids of created/deleted examples and the
+        parameter's updated ``status``; 400/403/409/422 with an ``error``.
+    """
+    lang = get_object_or_404(Language, pk=lang_id)
+    if not _check_language_access(request.user, lang):
+        return JsonResponse({"error": _t("You don't have access to this language.")}, status=403)
+    question = get_object_or_404(Question, pk=question_id, parameter__is_active=True)
 
+    try:
+        payload, present, version = parse_autosave_patch(json.loads(request.body or b"{}"), question.id)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
+    is_admin = _is_admin(request.user)
+    try:
+        result = autosave_answer(lang, question, payload, present, version, allow_locked=is_admin)
+    except AnswerConflict as e:
+        questions = [
+            q for q in _questions_with_answers(lang, [question.parameter_id]).get(question.parameter_id, [])
+            if q.id == question.id
+        ]
+        html = render_to_string(
+            "languages/partials/param_questions.html",
+            {"questions": questions, "is_admin": is_admin, "lang_status": _language_overall_status(lang)},
+            request=request,
+        )
+        return JsonResponse({"error": _t(str(e)), "version": e.version, "html": html}, status=409)
+    except AnswerLocked as e:
+        return JsonResponse({"error": _t(str(e))}, status=403)
+    except AnswerValidationError as e:
+        return JsonResponse({"error": _t(str(e))}, status=422)
 
+    return JsonResponse({
+        "ok": True,
+        "version": result.version,
+        "created": result.created,
+        "deleted": result.deleted,
+        "parameter": _single_param_status(lang, question.parameter_id),
+    })
 
 
 @login_required
@@ -1049,14 +1032,14 @@ def language_debug(request: HttpRequest, lang_id: str) -> HttpResponse:
 
     # Costruzione righe tabella principale (con cond_true)
     rows = []
-    for p in params:
+    for rank, p in enumerate(params, start=1):
         q_ids, q_ans = [], []
         for q in p.questions.all():
             q_ids.append(q.id)
             a = answers_by_qid.get(q.id)
             q_ans.append(a.response_text.upper() if (a and a.response_text in ("yes", "no")) else "")
         rows.append({
-            "position": p.position,
+            "position": rank,
             "param_id": p.id,
             "name": p.name or "",
             "questions": q_ids,
@@ -1107,6 +1090,7 @@ def language_run_dag(request: HttpRequest, lang_id: str) -> HttpResponse:
             ).update(
                 status=AnswerStatus.APPROVED, modifiable=False
             )
+            refresh_language_progress_on_commit(lang.id)
 
             if changed > 0:
                 LanguageReview.objects.create(language=lang, decision="approve", created_by=request.user)
@@ -1162,6 +1146,7 @@ def language_submit(request: HttpRequest, lang_id: str) -> HttpResponse:
     changed = Answer.objects.filter(language=lang).update(
         status=AnswerStatus.WAITING, modifiable=False
     )
+    refresh_language_progress_on_commit(lang.id)
     messages.success(request, _t(f"Submitted {changed} answers for approval."))
     return redirect("language_data", lang_id=lang.id)
 
@@ -1195,6 +1180,7 @@ def language_approve(request: HttpRequest, lang_id: str) -> HttpResponse:
             changed = Answer.objects.filter(language=lang, status=AnswerStatus.WAITING).update(
                 status=AnswerStatus.APPROVED, modifiable=False
             )
+            refresh_language_progress_on_commit(lang.id)
 
             LanguageReview.objects.create(language=lang, decision="approve", created_by=request.user)
 
@@ -1246,6 +1232,7 @@ def language_reject(request: HttpRequest, lang_id: str) -> HttpResponse:
         changed = Answer.objects.filter(language=lang).update(
             status=AnswerStatus.REJECTED, modifiable=False
         )
+        refresh_language_progress_on_commit(lang.id)
         LanguageReview.objects.create(language=lang, decision="reject", message=message, created_by=request.user)
 
     if changed == 0:
@@ -1276,6 +1263,7 @@ def language_reopen(request: HttpRequest, lang_id: str) -> HttpResponse:
     changed = Answer.objects.filter(language=lang, status=AnswerStatus.REJECTED).update(
         status=AnswerStatus.PENDING, modifiable=True
     )
+    refresh_language_progress_on_commit(lang.id)
     if changed == 0:
         messages.info(request, _t("Nothing to reopen."))
     else:
@@ -1366,17 +1354,8 @@ def language_list_export_xlsx(request: HttpRequest) -> HttpResponse:
     # 2. Gestione Ricerca (GET) - Solo se non stiamo esportando selezionati
     else:
         if q:
-            qs = qs.filter(
-                Q(id__icontains=q) |
-                Q(name_full__icontains=q) |
-                Q(top_level_family__icontains=q) |
-                Q(family__icontains=q) |
-                Q(grp__icontains=q) |
-                Q(isocode__icontains=q) |
-                Q(glottocode__icontains=q) |
-                Q(source__icontains=q) |
-                Q(location__icontains=q)
-            )
+            # stessa ricerca della lista lingue (il link di export passa lo stesso q)
+            qs = search(qs, q)
 
     if not is_admin:
         qs = qs.filter(Q(assigned_user=user) | Q(users=user)).distinct()
@@ -2070,9 +2049,10 @@ def _build_languages_metadata_workbook() -> Workbook:
     ws.append(headers)
     for c in ws[1]:
         c.font = Font(bold=True, color="FFFFFF")
-    for L in Language.objects.all().order_by("position", "id"):
+    # position in tabella è una chiave a intervalli: nel foglio il rango 1..N
+    for rank, L in enumerate(Language.objects.all().order_by("position", "id"), start=1):
         ws.append([
-            L.id, L.name_full, L.position,
+            L.id, L.name_full, rank,
             L.top_level_family or "", L.family or "", L.grp or "",
             L.isocode or "", L.glottocode or "", L.location or "",
             float(L.latitude) if L.latitude is not None else "",
@@ -2111,9 +2091,9 @@ def _build_parameters_workbook() -> Workbook:
     ws.append(headers)
     for c in ws[1]:
         c.font = Font(bold=True, color="FFFFFF")
-    for p in ParameterDef.objects.all().order_by("position", "id"):
+    for rank, p in enumerate(ParameterDef.objects.all().order_by("position", "id"), start=1):
         ws.append([
-            p.id, p.position, p.name or "",
+            p.id, rank, p.name or "",
             p.schema or "", p.param_type or "", p.level_of_comparison or "",
             p.short_description or "", p.long_description or "",
             p.implicational_condition or "",
@@ -12,6 +12,8 @@ from core.models import (
     ParamType, ParamLevelOfComparison,
 )
 from core.services.logic_parser import validate_expression, ParseException
+from core.services.condition_analysis import check_parameter
+from core.services.ordering import rank_of
 
 
 # =========================
@@ -93,6 +95,9 @@ class ParameterForm(forms.ModelForm):
         # Se il record ha valori legacy non più in lista, aggiungili per mostrare e salvare
         inst = getattr(self, "instance", None)
         if inst and inst.pk:
+            # in tabella position è una chiave a intervalli: il form mostra e riceve il rango
+            if not inst._state.adding:
+                self.initial["position"] = rank_of(inst)
             if inst.schema and inst.schema not in {c for c, _ in schema_choices}:
                 schema_choices.insert(1, (inst.schema, f"{inst.schema} (legacy)"))
             if inst.param_type and inst.param_type not in {c for c, _ in type_choices}:
@@ -130,12 +135,28 @@ class ParameterForm(forms.ModelForm):
             note = (cleaned.get("change_note") or "").strip()
             if changed_fields and not note:
                 raise forms.ValidationError("Insert recap of changes made to this parameter.")
+
+        # Analisi statica del grafo con la modifica proposta (cicli, ref sconosciute/inattive,
+        # condizioni mai vere o sempre vere), anche per i parametri che usano questo id
+        # (rinomina, disattivazione). Solo se id, condizione o stato sono cambiati.
+        graph_fields = {"id", "implicational_condition", "is_active"}
+        if "implicational_condition" not in self.errors and (not has_pk or graph_fields & set(self.changed_data)):
+            pid = (cleaned.get("id") or (instance.pk if has_pk else "") or "").strip()
+            if pid:
+                is_active = bool(cleaned.get("is_active"))
+                # su un parametro disattivato i problemi sono dei dipendenti: errore del form
+                field = "implicational_condition" if is_active else None
+                for msg in check_parameter(pid, cleaned.get("implicational_condition") or "", is_active,
+                                           old_pid=instance.pk if has_pk else None):
+                    self.add_error(field, msg)
         return cleaned
 
     def clean_position(self):
         pos = self.cleaned_data.get("position")
         if pos is None or pos < 1:
             raise forms.ValidationError("Position must be an integer ≥ 1.")
+        # il campo è un rango: ParameterDef.save lo converte nella chiave a intervalli
+        self.instance.requested_rank = pos
         return pos
 
     def clean_implicational_condition(self):
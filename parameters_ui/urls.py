@@ -3,8 +3,10 @@ from . import views
 urlpatterns = [
     path("", views.parameter_list, name="parameter_list"),
     path("add/", views.parameter_add, name="parameter_add"),
+    path("reorder/", views.parameter_reorder, name="parameter_reorder"),
     path("<str:param_id>/edit/", views.parameter_edit, name="parameter_edit"),
     path("<str:param_id>/deactivate/", views.parameter_deactivate, name="parameter_deactivate"),
+    path("<str:param_id>/simulate/", views.parameter_simulate, name="parameter_simulate"),
     path("parameters/<str:param_id>/questions/add/", views.question_add, name="question_add"),
     path("parameters/<str:param_id>/questions/<str:question_id>/edit/", views.question_edit, name="question_edit"),
     path("parameters/<str:param_id>/questions/<str:question_id>/delete/", views.question_delete, name="question_delete"),
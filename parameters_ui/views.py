@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import re
 from typing import Any, List, Tuple
 from django.contrib import messages
@@ -9,7 +10,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods, require_POST
 from django.http import HttpRequest, HttpResponse, JsonResponse, HttpResponseBadRequest
-from django.db.models import Q, Count, Sum, Case, When, IntegerField, Max
+from django.db.models import Q, Count, Sum, Case, When, IntegerField
 import io
 from django.http import FileResponse
 from fpdf import FPDF
@@ -30,6 +31,9 @@ from core.models import (
 
 )
 
+from core.services.language_data_cache import invalidate_all_fragments
+from core.services.ordering import reorder
+
 from .forms import (
     ParameterForm,
     QuestionForm,
@@ -206,17 +210,8 @@ def parameter_add(request: HttpRequest) -> HttpResponse:
             # commit=False ci permette di modificare l'oggetto prima di salvarlo nel DB
             new_param = form.save(commit=False)
 
-            # --- INIZIO NUOVA LOGICA POSITION ---
-            # Trova il valore massimo attuale della colonna 'position'
-            max_pos_aggr = ParameterDef.objects.aggregate(Max('position'))
-            current_max = max_pos_aggr['position__max']
-
-            # Se non ci sono parametri nel DB, current_max sarà None. In tal caso partiamo da 1.
-            if current_max is None:
-                new_param.position = 1
-            else:
-                new_param.position = current_max + 1
-            # --- FINE NUOVA LOGICA POSITION ---
+            # Senza rango: ParameterDef.save lo mette in coda (core.services.ordering)
+            new_param.requested_rank = None
 
             new_param.save()
             messages.success(request, "Parameter added successfully.")
@@ -276,7 +271,7 @@ def parameter_edit(request: HttpRequest, param_id: str) -> HttpResponse:
             changed_fields = [f for f in form.changed_data if f not in ("change_note", "id")]
             diff = {}
             for f in changed_fields:
-                old_val = getattr(old_obj, f, None)
+                old_val = form.initial.get(f) if f == "position" else getattr(old_obj, f, None)
                 new_val = form.cleaned_data.get(f)
                 if old_val != new_val:
                     diff[f] = {"old": _to_jsonable(old_val), "new": _to_jsonable(new_val)}
@@ -384,6 +379,69 @@ def parameter_edit(request: HttpRequest, param_id: str) -> HttpResponse:
 
 
 
+@login_required
+@user_passes_test(_is_admin)
+@require_POST
+def parameter_reorder(request: HttpRequest) -> JsonResponse:
+    """Apply a complete new order of the parameters in one statement.
+
+    Args:
+        request: Current authenticated admin request with a JSON body
+            ``{"ids": [...]}`` listing every parameter id once, in order.
+
+    Returns:
+        JSON ``{"ok": true, "updated": n}``, or 400 with an ``error`` when the
+        body is not a full permutation of the parameter ids.
+    """
+    try:
+        ids = json.loads(request.body or b"{}").get("ids")
+        if not isinstance(ids, list):
+            raise ValueError("Expected a JSON body with an 'ids' list.")
+        updated = reorder(ParameterDef, ids)
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    # UPDATE diretto: nessun post_save, i frammenti (ordine dei parametri) vanno invalidati qui
+    transaction.on_commit(invalidate_all_fragments)
+    return JsonResponse({"ok": True, "updated": updated})
+
+
+@login_required
+@user_passes_test(_is_admin)
+@require_POST
+def parameter_simulate(request: HttpRequest, param_id: str) -> HttpResponse:
+    """Dry-run the effect of a proposed implicational condition on the corpus.
+
+    Re-evaluates the downstream cone of the parameter for every language in
+    memory (nothing is written) and returns the per-language diff of the eval
+    values between the current and the proposed condition.
+
+    Args:
+        request: Current authenticated admin request. ``implicational_condition``
+            in POST holds the proposed condition.
+        param_id: Parameter ID being edited.
+
+    Returns:
+        JSON diff, or an HTML fragment for HTMX requests. Invalid or cyclic
+        conditions return status 400.
+    """
+    from core.services.condition_simulation import simulate_condition_change, SimulationError
+
+    param = get_object_or_404(ParameterDef, pk=param_id)
+    condition = request.POST.get("implicational_condition", "")
+    is_htmx = bool(request.headers.get("HX-Request"))
+
+    try:
+        result = simulate_condition_change(param.id, condition)
+    except SimulationError as e:
+        if is_htmx:
+            return render(request, "parameters/partials/simulation.html", {"error": str(e)})
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if is_htmx:
+        return render(request, "parameters/partials/simulation.html", {"result": result})
+    return JsonResponse(result.as_dict(), json_dumps_params={"ensure_ascii": False})
+
+
 @login_required
 @user_passes_test(_is_admin)
 @require_POST
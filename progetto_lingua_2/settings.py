@@ -65,6 +65,12 @@ X_FRAME_OPTIONS = "DENY"
 # Form con molte domande/esempi (es. parametro FGP) possono superare il default Django (1000).
 DATA_UPLOAD_MAX_NUMBER_FIELDS = int(env("DJANGO_DATA_UPLOAD_MAX_NUMBER_FIELDS", "10000"))
 
+# Snapshot delle statistiche della dashboard: ricalcolo al più ogni N secondi (o dopo scritture rilevanti)
+DASHBOARD_STATS_TTL = int(env("DASHBOARD_STATS_TTL", "300"))
+
+# Frammenti HTML per parametro della pagina dati lingua (invalidati a ogni salvataggio)
+LANGUAGE_DATA_FRAGMENT_TTL = int(env("LANGUAGE_DATA_FRAGMENT_TTL", "3600"))
+
 
 # ---------------------- Apps ----------------------
 INSTALLED_APPS = [
@@ -139,6 +145,20 @@ DATABASES = {
     }
 }
 
+# ---------------------- Cache ----------------------
+# Condivisa tra i worker gunicorn e i comandi di gestione: le invalidazioni a
+# versione (valori finali, indice dei valori, dati mappa, frammenti della pagina
+# dati) devono arrivare a tutti i processi. Default: tabella nel DB
+# (python manage.py createcachetable, eseguito da entrypoint.sh).
+# DJANGO_CACHE_BACKEND/DJANGO_CACHE_LOCATION per un backend diverso (es. Redis).
+CACHES = {
+    "default": {
+        "BACKEND": env("DJANGO_CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"),
+        "LOCATION": env("DJANGO_CACHE_LOCATION", "django_cache"),
+        "OPTIONS": {"MAX_ENTRIES": int(env("DJANGO_CACHE_MAX_ENTRIES", "200000"))},
+    }
+}
+
 # ---------------------- Auth ----------------------
 AUTH_USER_MODEL = "core.User"   
 AUTH_PASSWORD_VALIDATORS = [
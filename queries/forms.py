@@ -1,7 +1,10 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
 
+from pyparsing import ParseException
+
 from core.models import Language, ParameterDef
+from core.services.logic_parser import validate_expression
 
 # -----------------------
 # Helper widget uniformi
@@ -48,7 +51,8 @@ class LangPairForm(forms.Form):
     )
     language_b = forms.ModelChoiceField(
         queryset=Language.objects.order_by("position"),
-        required=True,
+        required=False,
+        empty_label=_("— all languages —"),
         label=_("Second language"),
         widget=forms.Select(attrs=_SELECT),
     )
@@ -60,3 +64,53 @@ class LangPairForm(forms.Form):
         if a and b and a.pk == b.pk:
             self.add_error("language_b", _("Select two different languages"))
         return data
+
+
+class ValueClauseForm(forms.Form):
+    negate = forms.BooleanField(required=False, label=_("NOT"))
+    parameter = forms.ModelChoiceField(
+        queryset=ParameterDef.objects.order_by("position"),
+        required=False,
+        label=_("Parameter"),
+        widget=forms.Select(attrs=_SELECT),
+    )
+    value = forms.ChoiceField(
+        choices=(("+", "+"), ("-", "-"), ("0", "0"), ("?", "?")),
+        required=False,
+        label=_("Value"),
+        widget=forms.Select(attrs=_SELECT),
+    )
+
+
+ValueClauseFormSet = forms.formset_factory(ValueClauseForm, extra=4, max_num=20)
+
+
+class ValueQueryForm(forms.Form):
+    op = forms.ChoiceField(
+        choices=(("and", _("All clauses (AND)")), ("or", _("Any clause (OR)"))),
+        initial="and",
+        required=False,
+        label=_("Combine"),
+        widget=forms.Select(attrs=_SELECT),
+    )
+
+
+class CorpusQueryForm(forms.Form):
+    expr = forms.CharField(
+        required=True,
+        max_length=2000,
+        label=_("Expression"),
+        help_text=_("Same syntax as implicational conditions, e.g. +FGM & (-SCO | 0ABC)"),
+        widget=forms.TextInput(attrs={**_INPUT, "placeholder": "+FGM & (-SCO | 0ABC)"}),
+    )
+
+    def clean_expr(self):
+        raw = (self.cleaned_data.get("expr") or "").strip()
+        try:
+            validate_expression(raw)
+        except ParseException as e:
+            raise forms.ValidationError(
+                _("Invalid expression. Don't put spaces between sign and parameter (e.g. '-FGK', not '- FGK'). ")
+                + f"{e}"
+            )
+        return raw
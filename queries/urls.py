@@ -4,4 +4,6 @@ from . import views
 app_name = "queries"
 urlpatterns = [
     path("", views.home, name="home"),
+    path("compare/export/", views.compare_export, name="compare_export"),
+    path("query/", views.corpus_query, name="corpus_query"),
 ]
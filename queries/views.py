@@ -3,15 +3,26 @@ from typing import Dict, List, Tuple, Set
 from dataclasses import dataclass
 from core.services.logic_parser import _as_list
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.core.paginator import Paginator
 from django.shortcuts import render
 from core.services.logic_parser import build_parser
 from core.models import (
-    Language, ParameterDef, LanguageParameter, LanguageParameterEval, Answer,
+    Language, ParameterDef, Answer,
 )
 from core.services.logic_parser import evaluate_with_parser, pretty_print_expression 
+from core.services.language_vector import LanguageVector, ParamIndex, SYMBOLS, PLUS, MINUS
+from core.services.final_values import final_map, final_value, final_vectors
+from core.services.lang_compare import corpus_matrix, compare_one_to_all, iter_pairs
+from core.services.value_index import get_value_index
+from core.services.corpus_query import run_corpus_query
+import numpy as np
+import csv
+import json
 import re
 from .forms import (
-    ParamPickForm, ParamNeutralizationForm, LangOnlyForm, LangPairForm
+    ParamPickForm, ParamNeutralizationForm, LangOnlyForm, LangPairForm,
+    ValueQueryForm, ValueClauseFormSet, CorpusQueryForm,
 )
 
 
@@ -43,33 +54,17 @@ class FinalValue:
     value: str | None  
 
 def final_value_for(lang_id: str, param_id: str) -> FinalValue:
-    lpe = (
-        LanguageParameterEval.objects
-        .filter(language_parameter__language_id=lang_id,
-                language_parameter__parameter_id=param_id)
-        .only("value_eval")
-        .first()
-    )
-    if lpe and lpe.value_eval in {"+", "-", "0"}:
-        return FinalValue(lpe.value_eval)
-
-    lp = (
-        LanguageParameter.objects
-        .filter(language_id=lang_id, parameter_id=param_id)
-        .only("value_orig")
-        .first()
-    )
-    return FinalValue(lp.value_orig if lp else None)
+    return FinalValue(final_value(lang_id, param_id))
 
-def final_map_for_language(lang: Language) -> Dict[str, str | None]:
 
-    out: Dict[str, str | None] = {}
-    for lpe in LanguageParameterEval.objects.filter(language_parameter__language=lang)\
-                                           .select_related("language_parameter"):
-        out[lpe.language_parameter.parameter_id] = lpe.value_eval
-    for lp in LanguageParameter.objects.filter(language=lang).only("parameter_id", "value_orig"):
-        out.setdefault(lp.parameter_id, lp.value_orig)
-    return out
+def final_vector_for_language(lang: Language, index: ParamIndex | None = None) -> LanguageVector:
+    """Valori finali (eval se presente, altrimenti orig) come LanguageVector, dal resolver in cache."""
+    index = index if index is not None else ParamIndex.from_db(active_only=False)
+    return final_vectors([lang.pk], index)[lang.pk]
+
+
+def final_map_for_language(lang: Language) -> Dict[str, str | None]:
+    return final_map(lang.pk)
 
 
 def explain_logic_evaluation(expression: str, values: dict[str, str]):
@@ -275,33 +270,25 @@ def implicated_and_implicating(parameter: ParameterDef) -> Tuple[Set[str], Set[s
 
 def language_distribution_for_param(parameter: ParameterDef) -> Dict[str, List[Language]]:
 
-    plus, minus, zero = [], [], []
+    dist = get_value_index().distribution(parameter.pk)
+    wanted = {lid for v in ("+", "-", "0") for lid in dist[v]}
+    lang_by_id = Language.objects.in_bulk(wanted)
 
-    eval_qs = LanguageParameterEval.objects.filter(
-        language_parameter__parameter=parameter
-    ).select_related("language_parameter__language")
+    return {v: [lang_by_id[lid] for lid in dist[v]] for v in ("+", "-", "0")}
 
-    seen_langs: Set[str] = set()
-    for lpe in eval_qs:
-        lang = lpe.language_parameter.language
-        seen_langs.add(lang.pk)
-        if lpe.value_eval == "+":
-            plus.append(lang)
-        elif lpe.value_eval == "-":
-            minus.append(lang)
-        elif lpe.value_eval == "0":
-            zero.append(lang)
 
-    for lp in LanguageParameter.objects.filter(parameter=parameter)\
-                                       .select_related("language"):
-        if lp.language_id in seen_langs:
-            continue
-        if lp.value_orig == "+":
-            plus.append(lp.language)
-        elif lp.value_orig == "-":
-            minus.append(lp.language)
-
-    return {"+": plus, "-": minus, "0": zero}
+def value_query(clauses: List[Tuple[bool, str, str]], op: str = "and") -> Dict:
+    """Lingue che soddisfano una combinazione di clausole (negata, parametro, valore) sull'indice invertito."""
+    idx = get_value_index()
+    mask = idx.combine(clauses, op)
+    ids = idx.languages(mask)
+    joiner = " AND " if op == "and" else " OR "
+    return {
+        "expression": joiner.join(f"{'NOT ' if neg else ''}{pid}={v}" for neg, pid, v in clauses),
+        "count": len(ids),
+        "total": len(idx.language_ids),
+        "languages": list(Language.objects.filter(pk__in=ids).order_by("position")),
+    }
 
 
 @dataclass
@@ -350,16 +337,14 @@ def comparable_params_for(lang_a: Language, lang_b: Language) -> List[Tuple[Para
     Parametri con valore finale determinato (+/-) in **entrambe** le lingue.
     Escludiamo '0' e None.
     """
-    map_a = final_map_for_language(lang_a)
-    map_b = final_map_for_language(lang_b)
+    params = list(ParameterDef.objects.filter(is_active=True).order_by("position"))
+    index = ParamIndex(p.pk for p in params)
+    vecs = final_vectors([lang_a.pk, lang_b.pk], index)
+    va, vb = vecs[lang_a.pk].as_array(), vecs[lang_b.pk].as_array()
 
-    rows: List[Tuple[ParameterDef, str, str]] = []
-    for p in ParameterDef.objects.filter(is_active=True).order_by("position"):
-        va = map_a.get(p.pk)
-        vb = map_b.get(p.pk)
-        if va in {"+", "-"} and vb in {"+", "-"}:
-            rows.append((p, va, vb))
-    return rows
+    determined = (PLUS, MINUS)
+    both = np.isin(va, determined) & np.isin(vb, determined)
+    return [(params[i], SYMBOLS[va[i]], SYMBOLS[vb[i]]) for i in np.flatnonzero(both)]
 
 
 @login_required
@@ -379,7 +364,11 @@ def home(request):
         "form_q7": LangPairForm(request.GET if request.GET.get("tab") == "q7" else None),
         "form_q8": LangOnlyForm(request.GET if request.GET.get("tab") == "q8" else None),
         "form_q9": LangOnlyForm(request.GET if request.GET.get("tab") == "q9" else None),
+        "form_q10": ValueQueryForm(request.GET if request.GET.get("tab") == "q10" else None),
+        "formset_q10": ValueClauseFormSet(request.GET if request.GET.get("tab") == "q10" else None, prefix="c"),
         "q1": None, "q2": None, "q3": None, "q4": None, "q5": None, "q6": None, "q7": None, "q8": None, "q9": None,
+        "form_q11": CorpusQueryForm(request.GET if request.GET.get("tab") == "q11" else None),
+        "q10": None, "q11": None,
     }
 
     # 1. Ordinamento alfabetico per le lingue (Query 7 e altre)
@@ -446,8 +435,7 @@ def home(request):
         form = ctx[f"form_{tab}"]
         if form.is_bound and form.is_valid():
             lang = form.cleaned_data["language"]
-            fmap = final_map_for_language(lang)
-            wanted_ids = [pid for pid, v in fmap.items() if v == want]
+            wanted_ids = get_value_index().params_with(lang.pk, want)
             params = list(ParameterDef.objects.filter(pk__in=wanted_ids).order_by("position"))
             if want == "0":
                 rows = []
@@ -467,8 +455,17 @@ def home(request):
     if ctx["form_q7"].is_bound and ctx["form_q7"].is_valid():
         a = ctx["form_q7"].cleaned_data["language_a"]
         b = ctx["form_q7"].cleaned_data["language_b"]
-        rows = comparable_params_for(a, b)
-        ctx["q7"] = {"a": a, "b": b, "rows": rows}
+        if b is None:
+            # Una lingua contro tutto il corpus, in un solo passaggio vettoriale
+            cm = corpus_matrix()
+            names = dict(Language.objects.values_list("id", "name_full"))
+            rows = compare_one_to_all(cm, a.pk)
+            for r in rows:
+                r["name_full"] = names.get(r["language_id"], "")
+            ctx["q7"] = {"a": a, "b": None, "all_rows": rows}
+        else:
+            rows = comparable_params_for(a, b)
+            ctx["q7"] = {"a": a, "b": b, "rows": rows}
 
 
     for tab, val in (("q8", "yes"), ("q9", "no")):
@@ -483,8 +480,135 @@ def home(request):
 
             ctx[tab] = {"language": lang, "answers": answers, "type": val.upper()}
 
+    fs = ctx["formset_q10"]
+    if fs.is_bound and fs.is_valid() and ctx["form_q10"].is_valid():
+        clauses = [
+            (bool(f.cleaned_data.get("negate")), f.cleaned_data["parameter"].pk, f.cleaned_data.get("value") or "+")
+            for f in fs.forms
+            if f.cleaned_data.get("parameter")
+        ]
+        if clauses:
+            ctx["q10"] = value_query(clauses, ctx["form_q10"].cleaned_data.get("op") or "and")
+
+    if ctx["form_q11"].is_bound and ctx["form_q11"].is_valid():
+        expr = ctx["form_q11"].cleaned_data["expr"]
+        res = run_corpus_query(expr)
+        page_obj = Paginator(res.language_ids, 50).get_page(request.GET.get("page"))
+        langs = Language.objects.in_bulk(list(page_obj.object_list))
+        ctx["q11"] = {
+            "expression": expr,
+            "pretty": safe_pretty(expr),
+            "count": res.count,
+            "total": res.total,
+            "unknown_refs": res.unknown_refs,
+            "page_obj": page_obj,
+            "languages": [langs[lid] for lid in page_obj.object_list if lid in langs],
+        }
+
     # Se la richiesta arriva da HTMX (cioè è stato premuto "Search"), restituisci solo i risultati
     if request.headers.get("HX-Request"):
         return render(request, "queries/partials/results.html", ctx)
 
-    return render(request, "queries/home.html", ctx)
\ No newline at end of file
+    return render(request, "queries/home.html", ctx)
+
+
+class _Echo:
+    """Pseudo-buffer per csv.writer: restituisce la riga invece di scriverla (risposte in streaming)."""
+
+    def write(self, value):
+        return value
+
+
+def _json_pairs(head: dict, pairs):
+    # oggetto JSON con "pairs" emesso una coppia alla volta
+    yield json.dumps(head)[:-1] + ', "pairs": ['
+    for i, rec in enumerate(pairs):
+        yield ("," if i else "") + json.dumps(rec)
+    yield "]}"
+
+
+def _csv_pairs(pairs, include_params: bool):
+    writer = csv.writer(_Echo())
+    header = ["language_a", "language_b", "shared", "agree", "disagree", "agreement"]
+    if include_params:
+        header += ["agree_params", "disagree_params"]
+    yield writer.writerow(header)
+    for r in pairs:
+        row = [r["language_a"], r["language_b"], r["shared"], r["agree"], r["disagree"],
+               "" if r["agreement"] is None else r["agreement"]]
+        if include_params:
+            row += [" ".join(r["agree_params"]), " ".join(r["disagree_params"])]
+        yield writer.writerow(row)
+
+
+@login_required
+@user_passes_test(_is_linguist_or_admin)
+def compare_export(request):
+    """Export dei confronti a coppie (?language=, ?format=csv|json, ?params=1) in streaming."""
+    lang_id = (request.GET.get("language") or "").strip() or None
+    fmt = (request.GET.get("format") or "csv").lower()
+    include_params = request.GET.get("params") == "1"
+
+    cm = corpus_matrix()
+    if lang_id is not None and lang_id not in cm.pos:
+        return HttpResponseBadRequest("Invalid language")
+
+    # iter_pairs è un generatore: con tutte le coppie (N²/2 righe) nulla resta in memoria
+    pairs = iter_pairs(cm, language_id=lang_id, include_params=include_params)
+    suffix = lang_id or "all"
+
+    if fmt == "json":
+        head = {"parameters": len(cm.index), "languages": len(cm.language_ids)}
+        resp = StreamingHttpResponse(_json_pairs(head, pairs), content_type="application/json")
+        resp["Content-Disposition"] = f'attachment; filename="comparison_{suffix}.json"'
+        return resp
+
+    response = StreamingHttpResponse(_csv_pairs(pairs, include_params), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="comparison_{suffix}.csv"'
+    return response
+
+
+@login_required
+@user_passes_test(_is_linguist_or_admin)
+def corpus_query(request):
+    """Lingue che soddisfano un'espressione (?q=) come JSON paginato o CSV completo (?format=csv)."""
+    form = CorpusQueryForm({"expr": request.GET.get("q", "")})
+    if not form.is_valid():
+        return JsonResponse({"error": form.errors.get("expr", ["Invalid expression"])[0]}, status=400)
+
+    expr = form.cleaned_data["expr"]
+    res = run_corpus_query(expr)
+
+    if (request.GET.get("format") or "json").lower() == "csv":
+        names = Language.objects.in_bulk(res.language_ids)
+        response = HttpResponse(content_type="text/csv")
+        # l'espressione va nell'header, non nel file: l'intestazione resta alla riga 1
+        response["Content-Disposition"] = 'attachment; filename="query_results.csv"'
+        response["X-Query-Expression"] = " ".join(expr.split())
+        writer = csv.writer(response)
+        writer.writerow(["language_id", "name_full", "family", "top_level_family"])
+        for lid in res.language_ids:
+            l = names.get(lid)
+            if l is not None:
+                writer.writerow([l.id, l.name_full, l.family or "", l.top_level_family or ""])
+        return response
+
+    try:
+        page_size = max(1, min(int(request.GET.get("page_size", 100)), 500))
+    except ValueError:
+        page_size = 100
+    page_obj = Paginator(res.language_ids, page_size).get_page(request.GET.get("page"))
+    langs = Language.objects.in_bulk(list(page_obj.object_list))
+    return JsonResponse({
+        "expression": expr,
+        "pretty": safe_pretty(expr),
+        "count": res.count,
+        "total": res.total,
+        "unknown_refs": res.unknown_refs,
+        "page": page_obj.number,
+        "pages": page_obj.paginator.num_pages,
+        "results": [
+            {"id": langs[lid].id, "name_full": langs[lid].name_full, "family": langs[lid].family}
+            for lid in page_obj.object_list if lid in langs
+        ],
+    })
@@ -2,9 +2,9 @@ from typing import Any
 
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Q
 from django.http import HttpRequest, HttpResponse
 from core.models import Question
+from core.services.search import search
 
 
 def _is_admin(user: Any) -> bool:
@@ -29,21 +29,18 @@ def question_list(request: HttpRequest) -> HttpResponse:
         request: Current authenticated admin request.
 
     Returns:
-        Rendered questions list page with filtered queryset and search term.
+        Rendered questions list page with filtered queryset and search term;
+        with a search term, rows are ordered by relevance.
     """
 
     query = request.GET.get("q", "").strip()
 
     # Base query con ottimizzazione per evitare N+1 queries
-    qs = Question.objects.select_related('parameter').order_by('parameter__position', 'id')
+    qs = Question.objects.select_related('parameter').defer('search_text').order_by('parameter__position', 'id')
 
-    # Filtraggio se presente una stringa di ricerca
+    # Filtraggio se presente una stringa di ricerca (indice trigram, risultati per rilevanza)
     if query:
-        qs = qs.filter(
-            Q(text__icontains=query) |
-            Q(id__icontains=query) |
-            Q(parameter__id__icontains=query)
-        )
+        qs = search(qs, query).order_by('-search_rank', 'parameter__position', 'id')
 
     return render(request, "questions/list.html", {
         "questions": qs,
@@ -0,0 +1,220 @@
+// Autosave delle risposte (pagina dati lingua).
+// Ogni modifica dentro una domanda (.q-card) segna come "sporche" le parti toccate
+// (risposta, commento, motivazioni, esempi); dopo una pausa si invia una patch JSON
+// con solo quelle parti e la versione letta dal server (data-version).
+// 409 => la risposta è cambiata altrove: il blocco viene sostituito con la copia del server.
+// Il form completo (Save/Next) continua a funzionare come prima.
+(function () {
+  "use strict";
+
+  const DELAY = 800;
+  const state = new Map(); // qid -> { dirty, deleted, timer, inflight, again }
+
+  function st(qid) {
+    if (!state.has(qid)) {
+      state.set(qid, { dirty: new Set(), deleted: new Set(), timer: null, inflight: false, again: false });
+    }
+    return state.get(qid);
+  }
+
+  function cardFor(qid) {
+    return document.querySelector(`.q-card[data-qid="${CSS.escape(qid)}"]`);
+  }
+
+  function autosaveForm(el) {
+    return el && el.closest ? el.closest("form[data-autosave-url]") : null;
+  }
+
+  function partOf(name) {
+    if (name.startsWith("resp_")) return "response_text";
+    if (name.startsWith("com_")) return "comments";
+    if (name.startsWith("mot_")) return "motivation_ids";
+    if (name.startsWith("ex_") || name.startsWith("newex_")) return "examples";
+    return null;
+  }
+
+  function setStatus(card, text, isError) {
+    const el = card && card.querySelector(".autosave-status");
+    if (!el) return;
+    el.textContent = text;
+    el.style.color = isError ? "#842029" : "";
+  }
+
+  function schedule(qid, part) {
+    const s = st(qid);
+    s.dirty.add(part);
+    setStatus(cardFor(qid), "Unsaved changes…");
+    clearTimeout(s.timer);
+    s.timer = setTimeout(() => flush(qid), DELAY);
+  }
+
+  // ------------------------------------------------------------
+  // Costruzione della patch
+  // ------------------------------------------------------------
+  function collectExamples(card, qid, s) {
+    const update = {};
+    card.querySelectorAll('.examples-list [name^="ex_"]').forEach(el => {
+      const m = el.name.match(/^ex_(\d+)_(\w+)$/);
+      if (!m) return;
+      (update[m[1]] = update[m[1]] || {})[m[2]] = el.value;
+    });
+    const create = [];
+    card.querySelectorAll(".example-row[data-uid]").forEach(row => {
+      const uid = row.getAttribute("data-uid");
+      const prefix = `newex_${qid}_${uid}_`;
+      const data = { uid: uid };
+      row.querySelectorAll(`[name^="${prefix}"]`).forEach(el => {
+        data[el.name.slice(prefix.length)] = el.value;
+      });
+      create.push(data);
+    });
+    return { update: update, delete: Array.from(s.deleted), create: create };
+  }
+
+  function buildPatch(card, qid, parts, s) {
+    const patch = { version: card.getAttribute("data-version") || "" };
+    if (parts.has("response_text")) {
+      const sel = card.querySelector(`[name="resp_${CSS.escape(qid)}"]`);
+      patch.response_text = sel ? sel.value : "";
+    }
+    if (parts.has("comments")) {
+      const com = card.querySelector(`[name="com_${CSS.escape(qid)}"]`);
+      patch.comments = com ? com.value : "";
+    }
+    if (parts.has("motivation_ids")) {
+      patch.motivation_ids = Array.from(card.querySelectorAll(`[name="mot_${CSS.escape(qid)}"]:checked`))
+        .map(cb => parseInt(cb.value, 10));
+    }
+    if (parts.has("examples")) {
+      patch.examples = collectExamples(card, qid, s);
+    }
+    return patch;
+  }
+
+  // ------------------------------------------------------------
+  // Applicazione della risposta del server
+  // ------------------------------------------------------------
+  // I nuovi esempi salvati diventano esempi esistenti (ex_<id>_*), così le patch
+  // successive e il form completo li aggiornano invece di ricrearli.
+  function applyCreated(card, qid, created) {
+    Object.entries(created || {}).forEach(([uid, id]) => {
+      const row = card.querySelector(`.example-row[data-uid="${CSS.escape(uid)}"]`);
+      if (!row) return;
+      const prefix = `newex_${qid}_${uid}_`;
+      row.querySelectorAll(`[name^="${prefix}"]`).forEach(el => {
+        el.name = `ex_${id}_` + el.name.slice(prefix.length);
+      });
+      row.removeAttribute("data-uid");
+      const btn = row.querySelector(".btn-newex-delete");
+      if (btn) {
+        btn.classList.replace("btn-newex-delete", "btn-ex-toggle-delete");
+        btn.removeAttribute("data-uid");
+        btn.setAttribute("data-exid", id);
+        const hidden = document.createElement("input");
+        hidden.type = "hidden";
+        hidden.name = `del_ex_${id}`;
+        hidden.value = "0";
+        btn.before(hidden);
+      }
+    });
+  }
+
+  function applyParameter(p) {
+    if (!p) return;
+    const btn = document.querySelector(`.param-btn[data-target="p-${CSS.escape(p.id)}"]`);
+    if (!btn) return;
+    btn.setAttribute("data-status", p.status);
+    btn.style.background = p.bg_color;
+    btn.style.color = p.fg_color;
+  }
+
+  function replaceCard(card, html) {
+    const tpl = document.createElement("template");
+    tpl.innerHTML = (html || "").trim();
+    const fresh = tpl.content.querySelector(".q-card");
+    if (!fresh) return card;
+    card.replaceWith(fresh);
+    // stessi agganci dei blocchi caricati via HTMX (examples.js, instruction_*.js)
+    document.dispatchEvent(new CustomEvent("htmx:afterSwap", { detail: { target: fresh } }));
+    return fresh;
+  }
+
+  async function flush(qid) {
+    const s = st(qid);
+    const card = cardFor(qid);
+    const form = autosaveForm(card);
+    if (!card || !form || !s.dirty.size) return;
+    if (s.inflight) { s.again = true; return; }
+
+    const parts = new Set(s.dirty);
+    s.dirty.clear();
+    const patch = buildPatch(card, qid, parts, s);
+    const token = form.querySelector('input[name="csrfmiddlewaretoken"]');
+    const url = form.getAttribute("data-autosave-url").replace("__qid__", encodeURIComponent(qid));
+
+    s.inflight = true;
+    setStatus(card, "Saving…");
+    try {
+      const resp = await fetch(url, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          "Accept": "application/json",
+          "X-CSRFToken": token ? token.value : "",
+        },
+        body: JSON.stringify(patch),
+      });
+      const data = await resp.json().catch(() => ({}));
+      if (resp.ok) {
+        card.setAttribute("data-version", data.version || "");
+        applyCreated(card, qid, data.created);
+        (data.deleted || []).forEach(id => s.deleted.delete(String(id)));
+        applyParameter(data.parameter);
+        setStatus(card, s.dirty.size ? "Unsaved changes…" : "Saved");
+      } else if (resp.status === 409) {
+        s.dirty.clear();
+        s.deleted.clear();
+        const fresh = replaceCard(card, data.html);
+        setStatus(fresh, "Changed elsewhere: the latest version was reloaded.", true);
+      } else {
+        parts.forEach(p => s.dirty.add(p));
+        setStatus(card, data.error || "Not saved.", true);
+      }
+    } catch (e) {
+      parts.forEach(p => s.dirty.add(p));
+      setStatus(card, "Not saved (network error).", true);
+    } finally {
+      s.inflight = false;
+      if (s.again) {
+        s.again = false;
+        flush(qid);
+      }
+    }
+  }
+
+  // ------------------------------------------------------------
+  // Eventi (delegati: le domande possono arrivare via HTMX)
+  // ------------------------------------------------------------
+  function onEdit(e) {
+    const el = e.target;
+    if (!el || !el.name || el.disabled || !autosaveForm(el)) return;
+    const card = el.closest(".q-card[data-qid]");
+    const part = card && partOf(el.name);
+    if (part) schedule(card.getAttribute("data-qid"), part);
+  }
+
+  document.addEventListener("input", onEdit);
+  document.addEventListener("change", onEdit);
+
+  // capture: examples.js rimuove la riga nel proprio handler
+  document.addEventListener("click", function (e) {
+    const btn = e.target.closest(".btn-ex-toggle-delete, .btn-newex-delete");
+    if (!btn || btn.hasAttribute("disabled") || !autosaveForm(btn)) return;
+    const card = btn.closest(".q-card[data-qid]");
+    if (!card) return;
+    const qid = card.getAttribute("data-qid");
+    const exid = btn.getAttribute("data-exid");
+    if (exid) st(qid).deleted.add(String(exid));
+    schedule(qid, "examples");
+  }, true);
+})();
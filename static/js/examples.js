@@ -200,16 +200,21 @@
   
   
   
-  document.addEventListener("DOMContentLoaded", function () {
+  // Aggancia select e pulsanti sotto root: la pagina al caricamento, poi ogni
+  // blocco di domande caricato via HTMX (pagina dati in modalità progressiva).
+  function initExamples(root) {
     
-    document.querySelectorAll(".resp-select").forEach(sel => {
+    root.querySelectorAll(".resp-select").forEach(sel => {
       sel.addEventListener("change", () => toggleExamplesBlock(sel));
       toggleExamplesBlock(sel);
     });
 
+    root.querySelectorAll(".examples-block[data-qid]").forEach(block => {
+      renumberExamplesForQuestion(block.getAttribute("data-qid"));
+    });
 
     
-    document.querySelectorAll(".add-example-btn").forEach(btn => {
+    root.querySelectorAll(".add-example-btn").forEach(btn => {
       btn.addEventListener("click", e => {
         e.preventDefault();
         if (btn.hasAttribute("disabled")) return;
@@ -235,6 +240,14 @@
         renumberExamplesForQuestion(qid);
       });
     });
+  }
+
+  document.addEventListener("htmx:afterSwap", function (e) {
+    if (e.detail && e.detail.target) initExamples(e.detail.target);
+  });
+
+  document.addEventListener("DOMContentLoaded", function () {
+    initExamples(document);
 
     
     document.addEventListener("click", function (e) {
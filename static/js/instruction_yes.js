@@ -27,9 +27,9 @@
     toggleInstruction(qid, value === "yes");
   }
 
-  function init() {
+  function init(root) {
     
-    $all('select.resp-select[data-qid], select.resp-select[data-question-id]').forEach(
+    $all('select.resp-select[data-qid], select.resp-select[data-question-id]', root).forEach(
       (sel) => {
         sel.addEventListener("change", onRespChange);
 
@@ -42,8 +42,13 @@
   }
 
   if (document.readyState === "loading") {
-    document.addEventListener("DOMContentLoaded", init);
+    document.addEventListener("DOMContentLoaded", () => init(document));
   } else {
-    init();
+    init(document);
   }
+
+  // domande caricate via HTMX (pagina dati in modalità progressiva)
+  document.addEventListener("htmx:afterSwap", (e) => {
+    if (e.detail && e.detail.target) init(e.detail.target);
+  });
 })();
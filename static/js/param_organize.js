@@ -39,22 +39,23 @@ document.addEventListener('DOMContentLoaded', () => {
   }
 
   
-  document.querySelectorAll('.resp-select').forEach(sel => {
-    sel.addEventListener('change', () => {
-      const qid = sel.dataset.qid;
-      const mot = document.querySelector(`.mot-block[data-qid='${qid}']`);
-      const exb = document.querySelector(`.examples-block[data-qid='${qid}']`);
-
-      if (sel.value === 'no') {
-        if (mot) mot.style.display = 'block';
-        if (exb) exb.style.display = 'none';
-      } else if (sel.value === 'yes') {
-        if (mot) mot.style.display = 'none';
-        if (exb) exb.style.display = 'block';
-      } else {
-        if (mot) mot.style.display = 'none';
-        if (exb) exb.style.display = 'none';
-      }
-    });
+  // delegato: le domande possono arrivare dopo, via HTMX (modalità progressiva)
+  document.addEventListener('change', (e) => {
+    const sel = e.target.closest && e.target.closest('.resp-select');
+    if (!sel) return;
+    const qid = sel.dataset.qid;
+    const mot = document.querySelector(`.mot-block[data-qid='${qid}']`);
+    const exb = document.querySelector(`.examples-block[data-qid='${qid}']`);
+
+    if (sel.value === 'no') {
+      if (mot) mot.style.display = 'block';
+      if (exb) exb.style.display = 'none';
+    } else if (sel.value === 'yes') {
+      if (mot) mot.style.display = 'none';
+      if (exb) exb.style.display = 'block';
+    } else {
+      if (mot) mot.style.display = 'none';
+      if (exb) exb.style.display = 'none';
+    }
   });
 });
@@ -2,13 +2,7 @@ function initPublicMap() {
     const mapContainer = document.getElementById('world-map');
     if (!mapContainer || mapContainer.innerHTML !== "") return; 
 
-    // 1. RECUPERA I DATI
-    const dataElement = document.getElementById('map-data');
-    if (!dataElement) return;
-    const rawData = dataElement.textContent;
-    if (!rawData || rawData.trim() === "") return;
-    const languages = JSON.parse(rawData);
-
+    // 1. I DATI (GeoJSON) ARRIVANO DA data-src: vedi il punto 7
     // 2. FUNZIONE COLORE 
     function getColorForFamily(family) {
         let hash = 0;
@@ -24,28 +18,20 @@ function initPublicMap() {
         return color;
     }
 
-    // 3. CREA I PUNTI
-    const features = languages.map(lang => {
-        const feature = new ol.Feature({
-            geometry: new ol.geom.Point(ol.proj.fromLonLat([lang.lng, lang.lat])),
-            name: lang.name,
-            id: lang.id,
-            family: lang.top_level_family 
-        });
-
-        // Colora in base alla TOP LEVEL FAMILY
-        feature.setStyle(new ol.style.Style({
+    // 3. CREA I PUNTI (riempiti quando arriva il GeoJSON)
+    const features = [];
+    function styleFor(family) {
+        return new ol.style.Style({
             image: new ol.style.Circle({
                 radius: 6,
-                fill: new ol.style.Fill({ color: getColorForFamily(lang.top_level_family) }),
+                fill: new ol.style.Fill({ color: getColorForFamily(family) }),
                 stroke: new ol.style.Stroke({ color: '#ffffff', width: 1.5 })
             })
-        }));
-        return feature;
-    });
+        });
+    }
 
     // 4. INIZIALIZZA LA MAPPA
-    const vectorSource = new ol.source.Vector({ features: features });
+    const vectorSource = new ol.source.Vector();
     const vectorLayer = new ol.layer.Vector({ source: vectorSource });
 
     const map = new ol.Map({
@@ -179,6 +165,61 @@ function initPublicMap() {
             map.renderSync(); 
         });
     }
+
+    // 7. CARICAMENTO DEL LAYER
+    // Il browser rivalida con If-None-Match: finché nessuna lingua cambia il server risponde 304.
+    // Nella lista lingue (data-scope="list") il layer è chiesto con la stessa ricerca e gli
+    // stessi filtri delle righe: il server restituisce esattamente le lingue della lista.
+    function layerUrl() {
+        const src = mapContainer.dataset.src;
+        if (mapContainer.dataset.scope !== 'list') return src;
+        const form = document.querySelector(mapContainer.dataset.filterForm);
+        const params = new URLSearchParams(form ? new FormData(form) : undefined);
+        const qInput = document.querySelector(mapContainer.dataset.filterQ);
+        if (qInput) params.set('q', qInput.value.trim());
+        params.delete('sort');
+        params.delete('dir');
+        params.set('scope', 'list');
+        return src + '?' + params.toString();
+    }
+
+    let loadedUrl = null;
+    function loadLayer() {
+        const url = layerUrl();
+        if (!url || url === loadedUrl) return;
+        loadedUrl = url;
+        fetch(url, { credentials: 'same-origin' })
+            .then(r => r.ok ? r.json() : { features: [] })
+            .then(geo => {
+                if (url !== loadedUrl) return;  // risposta superata da una ricerca più recente
+                features.length = 0;
+                geo.features.forEach(f => {
+                    const feature = new ol.Feature({
+                        geometry: new ol.geom.Point(ol.proj.fromLonLat(f.geometry.coordinates)),
+                        name: f.properties.name,
+                        id: f.id,
+                        family: f.properties.top_level_family
+                    });
+                    // Colora in base alla TOP LEVEL FAMILY
+                    feature.setStyle(styleFor(f.properties.top_level_family));
+                    features.push(feature);
+                });
+                vectorSource.clear();
+                vectorSource.addFeatures(features);
+                overlay.setPosition(undefined);
+            })
+            .catch(err => console.error('Map data not available:', err));
+    }
+
+    if (mapContainer.dataset.src) {
+        loadLayer();
+        // ricerca live (HTMX) sulle righe: la mappa segue ("Load more" non cambia l'URL e non ricarica)
+        if (mapContainer.dataset.rows) {
+            document.body.addEventListener('htmx:afterSwap', function (e) {
+                if (e.detail.target && e.detail.target.id === mapContainer.dataset.rows) loadLayer();
+            });
+        }
+    }
 }
 document.addEventListener("DOMContentLoaded", initPublicMap);
 document.body.addEventListener("htmx:afterSwap", initPublicMap);
\ No newline at end of file
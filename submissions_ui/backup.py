@@ -0,0 +1,213 @@
+from __future__ import annotations
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import (
+    BackupJobStatus, Language, ParamValueHistory, SnapshotStorage, Submission, SubmissionBackupJob, User,
+)
+from core.services.locks import lock_submission_backup
+
+from .history import record_history
+from .services import delete_submissions, encode_with, prune_submissions
+from .snapshot import collect_languages_state, current_key_index, state_hash
+
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------
+# Backup di tutte le lingue.
+#
+# Invece di create_language_submission ripetuto per ogni lingua (query,
+# pruning e save() per lingua, tutto in un'unica transazione della richiesta)
+# il backup è un job in background (SubmissionBackupJob) che lavora a blocchi
+# di lingue. Per ogni blocco:
+#   - stato corrente con quattro query per tutto il blocco (collect_languages_state);
+#   - una query per le submission con lo stesso content_hash (-> ref) e una per
+#     l'ultimo full di ogni lingua (-> base dei delta);
+#   - un solo INSERT multi-riga (bulk_create) delle submission del blocco,
+#     più i cambi di value_eval nella storia dei parametri (record_history);
+#   - commit e aggiornamento di done/total.
+# Alla fine una sola query a finestra trova le submission oltre il limite per
+# lingua, eliminate in ordine di dipendenza (prune_submissions). Un errore nel
+# pruning non tocca il backup appena scritto: il job resta "done" con l'errore.
+# Se il job fallisce, o si interrompe (processo terminato: nessun avanzamento
+# per STALE_AFTER, vedi reap_stale_jobs), le sue submission (backup_job) e la
+# loro storia vengono eliminate: niente cartelle di backup incomplete.
+# ------------------------------------------------------------
+
+BATCH_SIZE = getattr(settings, "SUBMISSIONS_BACKUP_BATCH_SIZE", 200)
+
+# un job che non avanza da così tanto è considerato interrotto (processo riavviato)
+STALE_AFTER = timedelta(minutes=15)
+
+ACTIVE = (BackupJobStatus.PENDING, BackupJobStatus.RUNNING)
+
+
+def active_job() -> Optional[SubmissionBackupJob]:
+    """Backup in corso, se c'è."""
+    return (
+        SubmissionBackupJob.objects
+        .filter(status__in=ACTIVE, updated_at__gte=timezone.now() - STALE_AFTER)
+        .order_by("-id")
+        .first()
+    )
+
+
+def discard_job_submissions(job: SubmissionBackupJob) -> int:
+    """Elimina le submission create dal job e la storia che hanno generato."""
+    ids = list(Submission.objects.filter(backup_job=job).values_list("id", flat=True))
+    ParamValueHistory.objects.filter(submission_id__in=ids).delete()
+    return delete_submissions(ids)
+
+
+def reap_stale_jobs() -> int:
+    """Job attivi senza avanzamento da STALE_AFTER: falliti, con le submission già scritte eliminate."""
+    reaped = 0
+    stale = SubmissionBackupJob.objects.filter(status__in=ACTIVE, updated_at__lt=timezone.now() - STALE_AFTER)
+    for job in stale:
+        with transaction.atomic():
+            # il passaggio di stato è atomico: un thread ancora vivo se ne accorge al blocco successivo
+            if not SubmissionBackupJob.objects.filter(pk=job.pk, status__in=ACTIVE).update(
+                status=BackupJobStatus.FAILED, error="Interrupted (no progress).", finished_at=timezone.now(),
+            ):
+                continue
+            discard_job_submissions(job)
+        logger.warning("Submission backup interrupted, partial data removed: job=%s", job.pk)
+        reaped += 1
+    return reaped
+
+
+def start_backup_job(submitted_by: User, note: str | None = None) -> Tuple[SubmissionBackupJob, bool]:
+    """
+    Crea il job e lo avvia in un thread dopo il commit: (job, True).
+    Se un backup è già in corso restituisce (quel job, False) invece di avviarne un secondo.
+    """
+    with transaction.atomic():
+        lock_submission_backup()
+        reap_stale_jobs()
+        running = active_job()
+        if running is not None:
+            return running, False
+        job = SubmissionBackupJob.objects.create(
+            submitted_by=submitted_by,
+            submitted_at=timezone.now().replace(microsecond=0),  # stessa data per tutte le lingue
+            note=note or "",
+        )
+        transaction.on_commit(
+            lambda: threading.Thread(target=_run_in_thread, args=(job.id,), daemon=True).start()
+        )
+    return job, True
+
+
+def _run_in_thread(job_id: int) -> None:
+    try:
+        run_backup_job(job_id)
+    finally:
+        connection.close()  # connessione propria del thread
+
+
+class _Reaped(Exception):
+    """Il job è stato dichiarato interrotto (reap_stale_jobs) mentre girava."""
+
+
+def _progress(job: SubmissionBackupJob, **fields) -> None:
+    # aggiorna solo se il job è ancora attivo
+    if not SubmissionBackupJob.objects.filter(pk=job.pk, status__in=ACTIVE).update(
+        updated_at=timezone.now(), **fields,
+    ):
+        raise _Reaped()
+
+
+def run_backup_job(job_id: int, batch_size: int = BATCH_SIZE) -> SubmissionBackupJob:
+    """Esegue il job (anche in modo sincrono, ad es. da shell o comando)."""
+    job = SubmissionBackupJob.objects.get(pk=job_id)
+    try:
+        language_ids = list(Language.objects.order_by("id").values_list("id", flat=True))
+        _progress(job, status=BackupJobStatus.RUNNING, total=len(language_ids))
+
+        # un solo indice domande/parametri condiviso da tutti gli snapshot del backup
+        key_index = current_key_index()
+        for start in range(0, len(language_ids), max(1, batch_size)):
+            chunk = language_ids[start:start + batch_size]
+            with transaction.atomic():
+                _snapshot_languages(job, chunk, key_index)
+                _progress(job, done=start + len(chunk))  # nella transazione del blocco
+    except _Reaped:
+        logger.warning("Submission backup stopped after being marked interrupted: job=%s", job_id)
+        discard_job_submissions(job)
+        return SubmissionBackupJob.objects.get(pk=job_id)
+    except Exception as e:
+        logger.exception("Submission backup FAILED: job=%s", job_id)
+        try:
+            discard_job_submissions(job)
+        except Exception:
+            logger.exception("Could not remove partial backup: job=%s", job_id)
+        SubmissionBackupJob.objects.filter(pk=job_id).update(
+            status=BackupJobStatus.FAILED, error=str(e), finished_at=timezone.now(), updated_at=timezone.now(),
+        )
+        return SubmissionBackupJob.objects.get(pk=job_id)
+
+    # il backup è completo: un errore qui non lo scarta
+    pruned, error = 0, None
+    try:
+        pruned = prune_submissions(language_ids)
+    except Exception as e:
+        logger.exception("Pruning after submission backup FAILED: job=%s", job_id)
+        error = f"Backup saved; pruning failed: {e}"
+    SubmissionBackupJob.objects.filter(pk=job_id).update(
+        status=BackupJobStatus.DONE, pruned=pruned, error=error,
+        finished_at=timezone.now(), updated_at=timezone.now(),
+    )
+    return SubmissionBackupJob.objects.get(pk=job_id)
+
+
+def _snapshot_languages(job: SubmissionBackupJob, language_ids: List[str], key_index) -> None:
+    """Crea le submission di un blocco di lingue."""
+    states = collect_languages_state(language_ids)
+    digests = {lid: state_hash(state) for lid, state in states.items()}
+
+    # snapshot identici già salvati (il più recente per lingua)
+    same: Dict[str, Submission] = {}
+    for sub in (
+        Submission.objects
+        .filter(
+            language_id__in=language_ids, content_hash__in=set(digests.values()),
+            storage__in=[SnapshotStorage.FULL, SnapshotStorage.DELTA],
+        )
+        .order_by("-submitted_at", "-id")
+        .only("id", "language_id", "content_hash")
+    ):
+        if digests[sub.language_id] == sub.content_hash:
+            same.setdefault(sub.language_id, sub)
+
+    # ultimo full di ogni lingua da salvare come delta o full
+    bases = {
+        sub.language_id: sub
+        for sub in (
+            Submission.objects
+            .filter(language_id__in=[lid for lid in language_ids if lid not in same], storage=SnapshotStorage.FULL)
+            .select_related("key_index")
+            .order_by("language_id", "-submitted_at", "-id")
+            .distinct("language_id")
+        )
+    }
+
+    rows = [
+        Submission(
+            language_id=lid,
+            submitted_by_id=job.submitted_by_id,
+            submitted_at=job.submitted_at,
+            note=job.note or "",
+            backup_job=job,
+            **encode_with(states[lid], digests[lid], key_index, same=same.get(lid), base=bases.get(lid)),
+        )
+        for lid in language_ids
+    ]
+    Submission.objects.bulk_create(rows)
+    record_history(zip(rows, (states[lid] for lid in language_ids)))
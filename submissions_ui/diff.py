@@ -0,0 +1,177 @@
+from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from core.models import Language, Submission
+
+from .snapshot import EXAMPLE_COLUMNS, LanguageState, collect_languages_state, load_state, state_hash
+
+
+# ------------------------------------------------------------
+# Differenze tra snapshot.
+#
+# Un lato del confronto è una submission (qualsiasi formato, via load_state)
+# o lo stato corrente della lingua (LIVE). Per tutte le lingue si confrontano
+# due cartelle di backup (stesso submitted_at) o una cartella e lo stato
+# corrente.
+#
+# Le sezioni sono indicizzate per chiave (dict/set): le differenze sono
+# operazioni tra insiemi di chiavi e di righe, senza cicli annidati.
+# Se i due lati hanno lo stesso content_hash la lingua è saltata senza
+# decodificare gli snapshot.
+# ------------------------------------------------------------
+
+LIVE = "live"
+BATCH_SIZE = 200
+
+ADDED, REMOVED, CHANGED = "added", "removed", "changed"
+
+PARAM_FIELDS = ("value_orig", "warning_orig", "value_eval", "warning_eval")
+ANSWER_FIELDS = ("response_text", "comments")
+
+
+@dataclass
+class DiffRow:
+    language_id: str
+    section: str          # language | answer | param | motivation | example
+    key: str              # id domanda o parametro ("" per section=language)
+    change: str           # added | removed | changed
+    field: str = ""
+    old: str = ""
+    new: str = ""
+
+    def as_row(self) -> List[str]:
+        return [self.language_id, self.section, self.key, self.change, self.field, self.old, self.new]
+
+
+CSV_HEADER = ["language", "section", "key", "change", "field", "old", "new"]
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value)
+
+
+def _keyed(
+    lang: str, section: str, fields: Sequence[str], shown: str, old: Dict[str, tuple], new: Dict[str, tuple],
+) -> List[DiffRow]:
+    """
+    Righe con una chiave per elemento (risposte, parametri): aggiunte e tolte
+    (con il valore del campo `shown`) e campi cambiati.
+    """
+    i = fields.index(shown)
+    out = [DiffRow(lang, section, k, ADDED, shown, new=_text(new[k][i])) for k in new.keys() - old.keys()]
+    out += [DiffRow(lang, section, k, REMOVED, shown, old=_text(old[k][i])) for k in old.keys() - new.keys()]
+    changed = {k for k in old.keys() & new.keys() if old[k] != new[k]}
+    out += [
+        DiffRow(lang, section, k, CHANGED, name, _text(a), _text(b))
+        for k in changed
+        for name, a, b in zip(fields, old[k], new[k])
+        if a != b
+    ]
+    return out
+
+
+def _multiset(lang: str, section: str, old: Iterable[tuple], new: Iterable[tuple], render) -> List[DiffRow]:
+    """Righe senza chiave propria (motivazioni, esempi): differenza tra multinsiemi."""
+    old_c, new_c = Counter(old), Counter(new)
+    out = [DiffRow(lang, section, row[0], ADDED, new=render(row)) for row in (new_c - old_c).elements()]
+    out += [DiffRow(lang, section, row[0], REMOVED, old=render(row)) for row in (old_c - new_c).elements()]
+    return out
+
+
+def _example_text(row: tuple) -> str:
+    return " | ".join(f"{col}: {value}" for col, value in zip(EXAMPLE_COLUMNS, row[1:]) if value)
+
+
+def diff_states(language_id: str, old: LanguageState, new: LanguageState) -> List[DiffRow]:
+    """Differenze di una lingua tra due stati, ordinate per sezione e chiave."""
+    rows = _keyed(
+        language_id, "answer", ANSWER_FIELDS, "response_text",
+        {q: (r, c) for q, r, c in old.answers}, {q: (r, c) for q, r, c in new.answers},
+    )
+    rows += _keyed(
+        language_id, "param", PARAM_FIELDS, "value_eval",
+        {row[0]: row[1:] for row in old.params}, {row[0]: row[1:] for row in new.params},
+    )
+    rows += _multiset(language_id, "motivation", old.motivations, new.motivations, lambda row: row[1])
+    rows += _multiset(language_id, "example", old.examples, new.examples, _example_text)
+    order = {"answer": 0, "param": 1, "motivation": 2, "example": 3}
+    rows.sort(key=lambda r: (order[r.section], r.key, r.change, r.field))
+    return rows
+
+
+# ------------------------------------------------------------
+# Una lingua: due submission o una submission e lo stato corrente
+# ------------------------------------------------------------
+def _live_state(language_id: str) -> LanguageState:
+    return collect_languages_state([language_id])[language_id]
+
+
+def diff_submissions(old: Submission, new: Optional[Submission] = None) -> List[DiffRow]:
+    """Differenze da `old` a `new` (None = stato corrente della lingua di old)."""
+    lang = old.language_id
+    if new is None:
+        new_state = _live_state(lang)
+        if old.content_hash and old.content_hash == state_hash(new_state):
+            return []
+        return diff_states(lang, load_state(old), new_state)
+    if new.language_id != lang:
+        raise ValueError("Submissions belong to different languages.")
+    if old.content_hash and old.content_hash == new.content_hash:
+        return []
+    return diff_states(lang, load_state(old), load_state(new))
+
+
+# ------------------------------------------------------------
+# Tutte le lingue: due cartelle di backup o una cartella e lo stato corrente
+# ------------------------------------------------------------
+def _folder(submitted_at, language_ids: Sequence[str]) -> Dict[str, Submission]:
+    """Submission di una cartella di backup per le lingue richieste (basi dei delta/ref incluse)."""
+    return {
+        sub.language_id: sub
+        for sub in Submission.objects.filter(submitted_at=submitted_at, language_id__in=language_ids)
+        .select_related("key_index", "base__key_index", "base__base__key_index")
+        .order_by("language_id", "id")  # a parità di lingua resta l'ultima
+    }
+
+
+def diff_backups(old_at, new_at=LIVE, language_ids: Optional[Iterable[str]] = None) -> Iterator[DiffRow]:
+    """
+    Differenze per tutte le lingue (o `language_ids`) dalla cartella `old_at` alla
+    cartella `new_at` (LIVE = stato corrente), a blocchi di BATCH_SIZE lingue.
+    Una lingua presente da un solo lato produce una riga section="language".
+    """
+    if language_ids is None:
+        language_ids = Language.objects.values_list("id", flat=True)
+    language_ids = sorted(set(language_ids))
+    for start in range(0, len(language_ids), BATCH_SIZE):
+        chunk = language_ids[start:start + BATCH_SIZE]
+        old_subs = _folder(old_at, chunk)
+        if new_at == LIVE:
+            live = collect_languages_state(chunk)
+            new_hash = {lid: state_hash(state) for lid, state in live.items()}
+            new_state = live.__getitem__
+        else:
+            new_subs = _folder(new_at, chunk)
+            new_hash = {lid: sub.content_hash for lid, sub in new_subs.items()}
+            new_state = lambda lid: load_state(new_subs[lid])  # noqa: E731
+
+        for lid in chunk:
+            old_sub = old_subs.get(lid)
+            if old_sub is None or lid not in new_hash:
+                if old_sub is not None or lid in new_hash:
+                    yield DiffRow(lid, "language", "", REMOVED if old_sub is not None else ADDED)
+                continue
+            if old_sub.content_hash and old_sub.content_hash == new_hash[lid]:
+                continue
+            yield from diff_states(lid, load_state(old_sub), new_state(lid))
+
+
+def summarize(rows: Iterable[DiffRow]) -> Dict[Tuple[str, str], int]:
+    """Conteggi per (sezione, tipo di modifica)."""
+    return dict(Counter((r.section, r.change) for r in rows))
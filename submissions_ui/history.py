@@ -0,0 +1,165 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Min, QuerySet
+
+from core.models import Language, ParamValueHistory, Submission
+
+from .snapshot import LanguageState, load_state
+
+
+# ------------------------------------------------------------
+# Storia dei valori dei parametri (tabella ParamValueHistory).
+#
+# Per (lingua, parametro) si salvano solo i punti in cui value_eval cambia,
+# con il submitted_at della submission che li ha osservati: le domande
+# "tutti i cambi di P nell'ultimo anno" e "valore di L alla data D" sono
+# letture su indice, senza decodificare gli snapshot.
+#
+# Costruita in modo incrementale alla creazione delle submission
+# (create_language_submission, backup di tutte le lingue): ogni nuovo
+# snapshot si confronta con l'ultimo valore noto di ogni coppia.
+# Eliminare una submission non riscrive la storia (i valori osservati
+# restano). Il comando build_param_history aggiunge i punti delle submission
+# precedenti al primo già registrato; solo con --force cancella la storia e la
+# ricostruisce dalle submission rimaste (perdendo i cambi delle eliminate).
+# ------------------------------------------------------------
+
+VALUE_EVAL = 3  # posizione di value_eval nelle righe di LanguageState.params
+
+
+def latest_values(language_ids: Iterable[str]) -> Dict[str, Dict[str, Optional[str]]]:
+    """Ultimo valore registrato di ogni parametro, per lingua (una query)."""
+    out: Dict[str, Dict[str, Optional[str]]] = {}
+    for lid, pid, value in (
+        ParamValueHistory.objects.filter(language_id__in=list(language_ids))
+        .order_by("language_id", "parameter_id", "-changed_at")
+        .distinct("language_id", "parameter_id")
+        .values_list("language_id", "parameter_id", "value_eval")
+    ):
+        out.setdefault(lid, {})[pid] = value
+    return out
+
+
+def _changes(
+    entries: List[Tuple[Submission, LanguageState]], last: Dict[str, Dict[str, Optional[str]]],
+) -> List[ParamValueHistory]:
+    rows: List[ParamValueHistory] = []
+    for sub, state in sorted(entries, key=lambda e: (e[0].submitted_at, e[0].id)):
+        known = last.setdefault(sub.language_id, {})
+        values = {row[0]: row[VALUE_EVAL] for row in state.params}
+        # parametri nello snapshot, più quelli che avevano un valore e ora mancano
+        for pid in values.keys() | {pid for pid, v in known.items() if v is not None}:
+            value = values.get(pid)
+            if (pid in known and known[pid] == value) or (pid not in known and value is None):
+                continue
+            rows.append(ParamValueHistory(
+                language_id=sub.language_id, parameter_id=pid, changed_at=sub.submitted_at,
+                value_eval=value, previous=known.get(pid), submission=sub,
+            ))
+            known[pid] = value
+    return rows
+
+
+def record_history(entries: Iterable[Tuple[Submission, LanguageState]]) -> int:
+    """Aggiunge i cambi osservati nei nuovi snapshot (submission, stato). Restituisce le righe scritte."""
+    entries = list(entries)
+    if not entries:
+        return 0
+    last = latest_values({sub.language_id for sub, _state in entries})
+    rows = _changes(entries, last)
+    ParamValueHistory.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def _join_backfill(history: QuerySet, last: Dict[str, Optional[str]]) -> None:
+    """
+    Raccorda il primo punto già registrato di ogni parametro con l'ultimo valore
+    ricostruito (`last`): se il valore è lo stesso il punto non è più un cambio e
+    viene eliminato, altrimenti riceve previous.
+    """
+    firsts = list(
+        history.filter(parameter_id__in=list(last))
+        .order_by("parameter_id", "changed_at")
+        .distinct("parameter_id")
+    )
+    same = [row.pk for row in firsts if row.value_eval == last[row.parameter_id]]
+    moved = [row for row in firsts if row.value_eval != last[row.parameter_id]]
+    for row in moved:
+        row.previous = last[row.parameter_id]
+    ParamValueHistory.objects.filter(pk__in=same).delete()
+    ParamValueHistory.objects.bulk_update(moved, ["previous"])
+
+
+@transaction.atomic
+def rebuild_history(language: Language, force: bool = False) -> int:
+    """
+    Completa la storia di una lingua dalle sue submission, in ordine di data.
+    Senza force aggiunge solo i punti precedenti al primo già registrato per la
+    lingua e li raccorda con quelli esistenti (_join_backfill): la storia
+    esistente, anche di submission eliminate, resta. force=True la cancella e
+    la ricostruisce dalle sole submission esistenti.
+    Restituisce le righe scritte.
+    """
+    history = ParamValueHistory.objects.filter(language=language)
+    if force:
+        history.delete()
+        first = None
+    else:
+        first = history.aggregate(first=Min("changed_at"))["first"]
+    subs = (
+        Submission.objects.filter(language=language)
+        .select_related("key_index", "base__key_index", "base__base__key_index")
+        .order_by("submitted_at", "id")
+    )
+    if first is not None:
+        subs = subs.filter(submitted_at__lt=first)
+    last: Dict[str, Dict[str, Optional[str]]] = {}
+    rows = _changes([(sub, load_state(sub)) for sub in subs], last)
+    if first is not None and rows:
+        _join_backfill(history, last[language.pk])
+    ParamValueHistory.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+# ------------------------------------------------------------
+# Interrogazioni
+# ------------------------------------------------------------
+def parameter_changes(
+    parameter_id: str, since=None, until=None, language_ids: Optional[Iterable[str]] = None,
+) -> QuerySet:
+    """
+    Cambi di value_eval del parametro nell'intervallo [since, until], in ordine di data.
+    La prima osservazione di una coppia compare con previous NULL.
+    """
+    qs = ParamValueHistory.objects.filter(parameter_id=parameter_id)
+    if since is not None:
+        qs = qs.filter(changed_at__gte=since)
+    if until is not None:
+        qs = qs.filter(changed_at__lte=until)
+    if language_ids is not None:
+        qs = qs.filter(language_id__in=list(language_ids))
+    return qs.order_by("changed_at", "language_id")
+
+
+def values_at(language_id: str, at) -> Dict[str, str]:
+    """value_eval di ogni parametro della lingua alla data `at` (ultimo cambio non successivo)."""
+    return {
+        pid: value
+        for pid, value in ParamValueHistory.objects.filter(language_id=language_id, changed_at__lte=at)
+        .order_by("parameter_id", "-changed_at")
+        .distinct("parameter_id")
+        .values_list("parameter_id", "value_eval")
+        if value is not None
+    }
+
+
+def value_at(language_id: str, parameter_id: str, at) -> Optional[str]:
+    """value_eval del parametro per la lingua alla data `at` (None se assente)."""
+    return (
+        ParamValueHistory.objects.filter(language_id=language_id, parameter_id=parameter_id, changed_at__lte=at)
+        .order_by("-changed_at")
+        .values_list("value_eval", flat=True)
+        .first()
+    )
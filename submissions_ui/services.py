@@ -3,122 +3,189 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterable
 from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.conf import settings
 from django.utils import timezone
-from core.models import (
-    Language, User, Submission, SubmissionAnswer, SubmissionAnswerMotivation,
-    SubmissionExample, SubmissionParam, Answer, AnswerMotivation, Example,
-    LanguageParameter, LanguageParameterEval, ParameterDef, Question
+from core.models import Language, User, SnapshotStorage, Submission, SubmissionKeyIndex
+
+from .history import record_history
+from .snapshot import (
+    LanguageState, collect_language_state, covering_key_index, load_state, pack_delta, pack_state, state_hash,
 )
 
 
+
 MAX_PER_LANGUAGE = getattr(settings, "SUBMISSIONS_MAX_PER_LANGUAGE", 10)
 
+# Un delta viene salvato solo se il blob è più piccolo di questa frazione dello
+# snapshot completo; altrimenti si scrive un nuovo full (base dei delta successivi).
+DELTA_MAX_RATIO = 0.5
+
 @dataclass
 class SnapshotResult:
     submission: Submission
     pruned_count: int
 
-def create_language_submission(language: Language, submitted_by: User, note: str | None = None) -> SnapshotResult:
+
+# ------------------------------------------------------------
+# Archiviazione per contenuto (vedi submissions_ui.snapshot)
+# ------------------------------------------------------------
+def encode_snapshot(
+    language: Language,
+    state: LanguageState,
+    key_index: SubmissionKeyIndex | None = None,
+    exclude_ids: Iterable[int] = (),
+) -> dict:
+    """
+    Campi di archiviazione di uno snapshot con contenuto `state`:
+    - ref   se una submission della lingua ha già lo stesso content_hash (nessun blob);
+    - delta sull'ultimo snapshot full della lingua, se abbastanza piccolo;
+    - full  altrimenti.
+    exclude_ids: submission da non usare come base (in corso di eliminazione).
+    """
+    exclude_ids = list(exclude_ids)
+    digest = state_hash(state)
+    same = (
+        Submission.objects
+        .filter(language=language, content_hash=digest, storage__in=[SnapshotStorage.FULL, SnapshotStorage.DELTA])
+        .exclude(id__in=exclude_ids)
+        .order_by("-submitted_at", "-id")
+        .first()
+    )
+    base = None
+    if same is None:
+        base = (
+            Submission.objects
+            .filter(language=language, storage=SnapshotStorage.FULL)
+            .exclude(id__in=exclude_ids)
+            .select_related("key_index")
+            .order_by("-submitted_at", "-id")
+            .first()
+        )
+    return encode_with(state, digest, key_index, same=same, base=base)
+
+
+def encode_with(
+    state: LanguageState,
+    digest: str,
+    key_index: SubmissionKeyIndex | None,
+    same: Submission | None,
+    base: Submission | None,
+) -> dict:
+    """
+    Come encode_snapshot, con i candidati già cercati: `same` (stesso content_hash)
+    e `base` (ultimo full della lingua). Usato dal backup di tutte le lingue, che
+    li cerca con una query per blocco di lingue (submissions_ui.backup).
+    """
+    if same is not None:
+        return {"storage": SnapshotStorage.REF, "base": same, "key_index": None, "snapshot": None, "content_hash": digest}
+
+    key_index = covering_key_index(state, key_index)
+    full_blob = pack_state(state, key_index)
+    if base is not None:
+        base_state = load_state(base)
+        delta_index = covering_key_index(base_state, key_index)
+        delta = pack_delta(state, base_state, delta_index)
+        if len(delta) < len(full_blob) * DELTA_MAX_RATIO:
+            return {
+                "storage": SnapshotStorage.DELTA, "base": base, "key_index": delta_index,
+                "snapshot": delta, "content_hash": digest,
+            }
+    return {"storage": SnapshotStorage.FULL, "base": None, "key_index": key_index, "snapshot": full_blob, "content_hash": digest}
+
+
+@transaction.atomic
+def delete_submissions(ids: Iterable[int]) -> int:
     """
-    Crea uno snapshot 'full' per una lingua.
-    - Copia Answers (yes/no + comments)
-    - Copia Motivations collegate alle Answers
-    - Copia Examples collegati alle Answers
-    - Copia Parametri consolidati (orig/eval)
+    Elimina le submission `ids`. Quelle che restano e vi si appoggiano (ref o delta)
+    vengono prima ricodificate sul contenuto che rappresentano, senza usare come
+    base né le eliminate né altre ancora da ricodificare (niente cicli).
+    Le eliminate escono per dipendenza: prima quelle su cui nessun'altra
+    eliminata si appoggia, poi le loro basi.
+    Restituisce il numero di submission eliminate.
+    """
+    ids = set(ids)
+    if not ids:
+        return 0
+    dependents = list(
+        Submission.objects.filter(base_id__in=ids).exclude(id__in=ids)
+        .select_related("language", "key_index").order_by("submitted_at", "id")
+    )
+    pending = {dep.id for dep in dependents}
+    for dep in dependents:
+        state = load_state(dep)
+        fields = encode_snapshot(dep.language, state, dep.key_index, exclude_ids=ids | pending)
+        for name, value in fields.items():
+            setattr(dep, name, value)
+        dep.save(update_fields=list(fields))
+        pending.discard(dep.id)
+    deleted = 0
+    remaining = set(ids)
+    while remaining:
+        referenced = set(
+            Submission.objects.filter(id__in=remaining, base_id__in=remaining).values_list("base_id", flat=True)
+        )
+        layer = (remaining - referenced) or remaining
+        _total, per_model = Submission.objects.filter(id__in=layer).delete()
+        deleted += per_model.get(Submission._meta.label, 0)
+        remaining -= layer
+    return deleted
+
+
+def prune_submissions(language_ids: Iterable[str] | None = None, keep: int = MAX_PER_LANGUAGE) -> int:
+    """
+    Tiene le `keep` submission più recenti di ogni lingua (tutte o `language_ids`;
+    0 = nessun limite). Le eccedenti si trovano con una sola query a finestra
+    (row_number per lingua) e si eliminano insieme.
+    """
+    if not keep or keep <= 0:
+        return 0
+    qs = Submission.objects.all()
+    if language_ids is not None:
+        qs = qs.filter(language_id__in=list(language_ids))
+    old_ids = list(
+        qs.annotate(rank=Window(
+            RowNumber(), partition_by=[F("language_id")], order_by=[F("submitted_at").desc(), F("id").desc()],
+        ))
+        .filter(rank__gt=keep)
+        .values_list("id", flat=True)
+    )
+    return delete_submissions(old_ids)
+
+
+def prune_language_submissions(language: Language, keep: int = MAX_PER_LANGUAGE) -> int:
+    """Tiene le `keep` submission più recenti della lingua (0 = nessun limite)."""
+    return prune_submissions([language.pk], keep)
+
+
+def create_language_submission(
+    language: Language,
+    submitted_by: User,
+    note: str | None = None,
+    key_index: SubmissionKeyIndex | None = None,
+    submitted_at=None,
+) -> SnapshotResult:
+    """
+    Crea uno snapshot 'full' per una lingua: risposte (yes/no + commenti),
+    motivazioni, esempi e parametri consolidati (orig/eval), in formato compatto
+    (un solo INSERT, vedi submissions_ui.snapshot). Se nulla è cambiato rispetto a
+    uno snapshot esistente si salva solo il riferimento, altrimenti un delta
+    sull'ultimo full quando conviene (encode_snapshot). I cambi di value_eval
+    finiscono nella storia dei parametri (submissions_ui.history).
+    key_index: indice domande/parametri già calcolato (backup di tutte le lingue).
     Esegue pruning per tenere al massimo N submissions per lingua.
     """
-    now = timezone.now()
+    now = submitted_at or timezone.now()
     with transaction.atomic():
+        state = collect_language_state(language)
         sub = Submission.objects.create(
             language=language,
             submitted_by=submitted_by,
             submitted_at=now,
             note=note or "",
-            
-        )
-
-        
-        answers = (
-            Answer.objects
-            .filter(language=language)
-            .select_related("question")
-            .prefetch_related("answer_motivations__motivation", "examples")
+            **encode_snapshot(language, state, key_index),
         )
-
-        
-        sub_answers = []
-        for a in answers:
-            sub_answers.append(SubmissionAnswer(
-                submission=sub,
-                question_code=a.question_id,
-                response_text=a.response_text,
-                comments=a.comments or "",
-            ))
-        SubmissionAnswer.objects.bulk_create(sub_answers, ignore_conflicts=False)
-
-        
-        sub_mots = []
-        for a in answers:
-            for am in a.answer_motivations.all():
-                sub_mots.append(SubmissionAnswerMotivation(
-                    submission=sub,
-                    question_code=a.question_id,
-                    motivation_code=am.motivation.code,
-                ))
-        if sub_mots:
-            SubmissionAnswerMotivation.objects.bulk_create(sub_mots, ignore_conflicts=False)
-
-        
-        sub_ex = []
-        for a in answers:
-            for ex in a.examples.all():
-                sub_ex.append(SubmissionExample(
-                    submission=sub,
-                    question_code=a.question_id,
-                    textarea=ex.textarea or "",
-                    gloss=ex.gloss or "",
-                    translation=ex.translation or "",
-                    transliteration=ex.transliteration or "",
-                    reference=ex.reference or "",
-                ))
-        if sub_ex:
-            SubmissionExample.objects.bulk_create(sub_ex, ignore_conflicts=False)
-
-        
-        
-        lparams = (
-            LanguageParameter.objects
-            .filter(language=language)
-            .select_related("parameter", "eval")
-        )
-
-        sub_params = []
-        for lp in lparams:
-            eval_obj = getattr(lp, "eval", None)
-            sub_params.append(SubmissionParam(
-                submission=sub,
-                parameter_id=lp.parameter_id,
-                value_orig=lp.value_orig,                
-                warning_orig=lp.warning_orig,
-                value_eval=(eval_obj.value_eval if eval_obj else "0"),
-                warning_eval=(eval_obj.warning_eval if eval_obj else False),
-                evaluated_at=now,
-            ))
-        if sub_params:
-            SubmissionParam.objects.bulk_create(sub_params, ignore_conflicts=False)
-
-        
-        pruned = 0
-        if MAX_PER_LANGUAGE and MAX_PER_LANGUAGE > 0:
-            qs_old = (Submission.objects
-                      .filter(language=language)
-                      .order_by("-submitted_at", "-id")
-                      .values_list("id", flat=True))
-            ids_to_keep = list(qs_old[:MAX_PER_LANGUAGE])
-            if len(ids_to_keep) < qs_old.count():
-                to_delete = Submission.objects.filter(language=language).exclude(id__in=ids_to_keep)
-                pruned = to_delete.count()
-                to_delete.delete()
-
+        record_history([(sub, state)])
+        pruned = prune_language_submissions(language)
         return SnapshotResult(submission=sub, pruned_count=pruned)
@@ -0,0 +1,361 @@
+from __future__ import annotations
+import hashlib
+import json
+import zlib
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.models import (
+    Answer, AnswerMotivation, Example, Language, LanguageParameter, ParameterDef, Question,
+    SnapshotStorage, Submission, SubmissionKeyIndex,
+)
+
+
+# ------------------------------------------------------------
+# Snapshot compatto di una submission.
+#
+# Invece di quattro tabelle riga-per-elemento (SubmissionAnswer, ...Motivation,
+# ...Example, ...Param) lo snapshot è UN blob su Submission.snapshot:
+# JSON a colonne compresso con zlib. Le righe non ripetono gli id: sono indici
+# nelle liste ordinate di SubmissionKeyIndex (tutte le domande e tutti i
+# parametri al momento dello snapshot), condivise da tutte le submission
+# finché domande e parametri non cambiano.
+#
+# Formato (v1):
+#   "a": risposte     {"q": [indice domanda], "r": "yn..", "c": [commento]}
+#   "m": motivazioni  {"q": [...], "m": [codice]}
+#   "e": esempi       {"q": [...], "<campo>": [...]} per EXAMPLE_COLUMNS
+#   "p": parametri    {"p": [indice parametro], "vo": "+-.", "wo": "01", "ve": "+0?.", "we": "01"}
+# Nei valori a un carattere NONE_CHAR sta per NULL.
+#
+# Archiviazione (Submission.storage, vedi services.create_language_submission):
+#   full   blob completo;
+#   delta  blob con le sole differenze rispetto a `base` (uno snapshot full);
+#   ref    nessun blob: contenuto identico (stesso content_hash) a `base`;
+#   legacy righe nelle tabelle Submission* (submission precedenti al formato).
+# load_state()/read_submission() risolvono la catena e danno gli stessi dati
+# per ogni formato.
+# ------------------------------------------------------------
+
+FORMAT_VERSION = 1
+SECTIONS = ("answers", "motivations", "examples", "params")
+EXAMPLE_COLUMNS = ("textarea", "transliteration", "gloss", "translation", "reference")
+NONE_CHAR = "."
+RESPONSE_CHAR = {"yes": "y", "no": "n"}
+CHAR_RESPONSE = {v: k for k, v in RESPONSE_CHAR.items()}
+
+
+@dataclass
+class LanguageState:
+    """Dati di una lingua da fotografare, ordinati per chiave."""
+    answers: List[Tuple[str, str, str]] = field(default_factory=list)            # (qid, risposta, commento)
+    motivations: List[Tuple[str, str]] = field(default_factory=list)             # (qid, codice motivazione)
+    examples: List[Tuple[str, ...]] = field(default_factory=list)                # (qid, *EXAMPLE_COLUMNS)
+    params: List[Tuple[str, Optional[str], bool, Optional[str], bool]] = field(default_factory=list)
+    # (pid, value_orig, warning_orig, value_eval, warning_eval)
+
+    def normalized(self) -> "LanguageState":
+        """Righe ordinate per chiave (ordinamento Python, non la collation del DB): hash stabile."""
+        for name in SECTIONS:
+            # sort stabile sulla sola chiave: gli esempi di una domanda restano in ordine di id
+            setattr(self, name, sorted(map(tuple, getattr(self, name)), key=lambda row: row[0]))
+        self.motivations.sort()
+        return self
+
+
+@dataclass
+class SnapshotData:
+    """Contenuto di uno snapshot: righe con gli stessi attributi dei vecchi modelli Submission*."""
+    answers: List[SimpleNamespace] = field(default_factory=list)
+    motivations: List[SimpleNamespace] = field(default_factory=list)
+    examples: List[SimpleNamespace] = field(default_factory=list)
+    params: List[SimpleNamespace] = field(default_factory=list)
+
+
+# ------------------------------------------------------------
+# Stato corrente delle lingue (quattro query per tutto l'insieme, senza istanziare modelli)
+# ------------------------------------------------------------
+def collect_languages_state(language_ids: Iterable[str]) -> Dict[str, LanguageState]:
+    """Stato di più lingue con le stesse quattro query di una sola (backup di tutte le lingue)."""
+    language_ids = list(language_ids)
+    states: Dict[str, LanguageState] = {lid: LanguageState() for lid in language_ids}
+    for lid, qid, resp, com in (
+        Answer.objects.filter(language_id__in=language_ids)
+        .values_list("language_id", "question_id", "response_text", "comments")
+    ):
+        states[lid].answers.append((qid, resp, com or ""))
+    for lid, qid, code in (
+        AnswerMotivation.objects.filter(answer__language_id__in=language_ids)
+        .values_list("answer__language_id", "answer__question_id", "motivation__code")
+    ):
+        states[lid].motivations.append((qid, code))
+    for lid, qid, *values in (
+        Example.objects.filter(answer__language_id__in=language_ids)
+        .order_by("id")  # normalized() mantiene l'ordine di id tra gli esempi di una domanda
+        .values_list("answer__language_id", "answer__question_id", *EXAMPLE_COLUMNS)
+    ):
+        states[lid].examples.append((qid, *(v or "" for v in values)))
+    for lid, pid, vo, wo, eval_id, ve, we in (
+        LanguageParameter.objects.filter(language_id__in=language_ids)
+        .values_list(
+            "language_id", "parameter_id", "value_orig", "warning_orig",
+            "eval__id", "eval__value_eval", "eval__warning_eval",
+        )
+    ):
+        # senza riga di valutazione: "0" / False, come negli snapshot precedenti
+        states[lid].params.append((pid, vo, bool(wo), ve if eval_id else "0", bool(we)))
+    for state in states.values():
+        state.normalized()
+    return states
+
+
+def collect_language_state(language: Language) -> LanguageState:
+    return collect_languages_state([language.pk])[language.pk]
+
+
+# ------------------------------------------------------------
+# Indice condiviso domande/parametri
+# ------------------------------------------------------------
+def key_index_for(question_ids: Iterable[str], parameter_ids: Iterable[str]) -> SubmissionKeyIndex:
+    questions = sorted(set(question_ids))
+    parameters = sorted(set(parameter_ids))
+    digest = hashlib.sha256(
+        json.dumps([questions, parameters], separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+    idx, _ = SubmissionKeyIndex.objects.get_or_create(
+        digest=digest, defaults={"questions": questions, "parameters": parameters},
+    )
+    return idx
+
+
+def current_key_index() -> SubmissionKeyIndex:
+    """Indice di tutte le domande e i parametri esistenti (uno per backup, non per lingua)."""
+    return key_index_for(
+        Question.objects.values_list("id", flat=True),
+        ParameterDef.objects.values_list("id", flat=True),
+    )
+
+
+def covering_key_index(state: LanguageState, key_index: Optional[SubmissionKeyIndex]) -> SubmissionKeyIndex:
+    """key_index se contiene tutte le chiavi di state, altrimenti un indice che le include."""
+    key_index = key_index or current_key_index()
+    qids = {row[0] for rows in (state.answers, state.motivations, state.examples) for row in rows}
+    pids = {row[0] for row in state.params}
+    if qids.issubset(key_index.questions) and pids.issubset(key_index.parameters):
+        return key_index
+    return key_index_for(set(key_index.questions) | qids, set(key_index.parameters) | pids)
+
+
+# ------------------------------------------------------------
+# Pack / unpack
+# ------------------------------------------------------------
+def _char(value: Optional[str]) -> str:
+    return value if value else NONE_CHAR
+
+
+def _value(ch: str) -> Optional[str]:
+    return None if ch == NONE_CHAR else ch
+
+
+def _bits(values: Iterable[bool]) -> str:
+    return "".join("1" if v else "0" for v in values)
+
+
+def _compress(doc: dict) -> bytes:
+    return zlib.compress(json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def _decompress(blob: bytes) -> dict:
+    doc = json.loads(zlib.decompress(bytes(blob)).decode("utf-8"))
+    if doc.get("v") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported submission snapshot format: {doc.get('v')!r}.")
+    return doc
+
+
+def _pack_doc(state: LanguageState, key_index: SubmissionKeyIndex) -> dict:
+    q_pos = {qid: i for i, qid in enumerate(key_index.questions)}
+    p_pos = {pid: i for i, pid in enumerate(key_index.parameters)}
+    doc = {
+        "v": FORMAT_VERSION,
+        "a": {
+            "q": [q_pos[qid] for qid, _r, _c in state.answers],
+            "r": "".join(RESPONSE_CHAR.get(r, NONE_CHAR) for _q, r, _c in state.answers),
+            "c": [c for _q, _r, c in state.answers],
+        },
+        "m": {
+            "q": [q_pos[qid] for qid, _m in state.motivations],
+            "m": [m for _q, m in state.motivations],
+        },
+        "e": {"q": [q_pos[row[0]] for row in state.examples]},
+        "p": {
+            "p": [p_pos[row[0]] for row in state.params],
+            "vo": "".join(_char(row[1]) for row in state.params),
+            "wo": _bits(row[2] for row in state.params),
+            "ve": "".join(_char(row[3]) for row in state.params),
+            "we": _bits(row[4] for row in state.params),
+        },
+    }
+    for i, col in enumerate(EXAMPLE_COLUMNS, start=1):
+        doc["e"][col] = [row[i] for row in state.examples]
+    return doc
+
+
+def _unpack_doc(doc: dict, key_index: SubmissionKeyIndex) -> LanguageState:
+    questions: Sequence[str] = key_index.questions
+    parameters: Sequence[str] = key_index.parameters
+    a, m, e, p = doc["a"], doc["m"], doc["e"], doc["p"]
+    return LanguageState(
+        answers=[(questions[qi], CHAR_RESPONSE.get(r, ""), c) for qi, r, c in zip(a["q"], a["r"], a["c"])],
+        motivations=[(questions[qi], code) for qi, code in zip(m["q"], m["m"])],
+        examples=[
+            (questions[qi], *values)
+            for qi, *values in zip(e["q"], *(e[col] for col in EXAMPLE_COLUMNS))
+        ],
+        params=[
+            (parameters[pi], _value(vo), wo == "1", _value(ve), we == "1")
+            for pi, vo, wo, ve, we in zip(p["p"], p["vo"], p["wo"], p["ve"], p["we"])
+        ],
+    )
+
+
+def pack_state(state: LanguageState, key_index: SubmissionKeyIndex) -> bytes:
+    return _compress(_pack_doc(state, key_index))
+
+
+def unpack_state(blob: bytes, key_index: SubmissionKeyIndex) -> LanguageState:
+    return _unpack_doc(_decompress(blob), key_index)
+
+
+# ------------------------------------------------------------
+# Hash del contenuto e delta
+#
+# Ogni sezione è raggruppata per chiave (domanda o parametro): una risposta,
+# le motivazioni di una domanda, gli esempi di una domanda, un parametro.
+# Il delta contiene i gruppi nuovi o cambiati ("up", stesso formato di uno
+# snapshot completo) e le chiavi dei gruppi cambiati o spariti ("drop").
+# ------------------------------------------------------------
+_DROP_KEYS = {"answers": "a", "motivations": "m", "examples": "e", "params": "p"}
+
+
+def state_hash(state: LanguageState) -> str:
+    """sha256 del contenuto (per id, indipendente dall'indice domande/parametri)."""
+    doc = [getattr(state, name) for name in SECTIONS]
+    return hashlib.sha256(
+        json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def _groups(rows: Iterable[tuple]) -> Dict[str, List[tuple]]:
+    out: Dict[str, List[tuple]] = {}
+    for row in rows:
+        out.setdefault(row[0], []).append(tuple(row))
+    return out
+
+
+def _flatten(groups: Dict[str, List[tuple]]) -> List[tuple]:
+    return [row for key in sorted(groups) for row in groups[key]]
+
+
+def pack_delta(state: LanguageState, base: LanguageState, key_index: SubmissionKeyIndex) -> bytes:
+    """Delta di state rispetto a base (key_index deve contenere le chiavi di entrambi)."""
+    up = LanguageState()
+    drop: Dict[str, List[str]] = {}
+    for name in SECTIONS:
+        new, old = _groups(getattr(state, name)), _groups(getattr(base, name))
+        changed = [k for k, rows in new.items() if old.get(k) != rows]
+        setattr(up, name, _flatten({k: new[k] for k in changed}))
+        drop[name] = sorted(set(changed) | (set(old) - set(new)))
+    q_pos = {qid: i for i, qid in enumerate(key_index.questions)}
+    p_pos = {pid: i for i, pid in enumerate(key_index.parameters)}
+    return _compress({
+        "v": FORMAT_VERSION,
+        "up": _pack_doc(up, key_index),
+        "drop": {
+            _DROP_KEYS[name]: [(p_pos if name == "params" else q_pos)[k] for k in keys]
+            for name, keys in drop.items()
+        },
+    })
+
+
+def apply_delta(blob: bytes, key_index: SubmissionKeyIndex, base: LanguageState) -> LanguageState:
+    doc = _decompress(blob)
+    up = _unpack_doc(doc["up"], key_index)
+    out = LanguageState()
+    for name in SECTIONS:
+        keys = key_index.parameters if name == "params" else key_index.questions
+        groups = _groups(getattr(base, name))
+        for i in doc["drop"][_DROP_KEYS[name]]:
+            groups.pop(keys[i], None)
+        groups.update(_groups(getattr(up, name)))
+        setattr(out, name, _flatten(groups))
+    return out
+
+
+# ------------------------------------------------------------
+# Lettura di una submission (qualsiasi formato di archiviazione)
+# ------------------------------------------------------------
+def _legacy_rows(qs, fields: Sequence[str]) -> List[SimpleNamespace]:
+    return [SimpleNamespace(**row) for row in qs.values(*fields)]
+
+
+def read_legacy_submission(sub: Submission) -> SnapshotData:
+    return SnapshotData(
+        answers=_legacy_rows(sub.answers.order_by("question_code"), ("question_code", "response_text", "comments")),
+        motivations=_legacy_rows(
+            sub.answer_motivations.order_by("question_code", "motivation_code"), ("question_code", "motivation_code"),
+        ),
+        examples=_legacy_rows(sub.examples.order_by("question_code", "id"), ("question_code", *EXAMPLE_COLUMNS)),
+        params=_legacy_rows(
+            sub.params.order_by("parameter_id"),
+            ("parameter_id", "value_orig", "warning_orig", "value_eval", "warning_eval", "evaluated_at"),
+        ),
+    )
+
+
+def load_state(sub: Submission) -> LanguageState:
+    """Stato fotografato da sub, risolvendo riferimenti (ref) e delta sulla base."""
+    if sub.storage == SnapshotStorage.LEGACY:
+        return state_from_snapshot(read_legacy_submission(sub))
+    if sub.storage == SnapshotStorage.REF:
+        return load_state(sub.base)
+    if sub.storage == SnapshotStorage.DELTA:
+        return apply_delta(sub.snapshot, sub.key_index, load_state(sub.base))
+    return unpack_state(sub.snapshot, sub.key_index)
+
+
+def snapshot_data(state: LanguageState, evaluated_at: Any = None) -> SnapshotData:
+    return SnapshotData(
+        answers=[SimpleNamespace(question_code=q, response_text=r, comments=c) for q, r, c in state.answers],
+        motivations=[SimpleNamespace(question_code=q, motivation_code=m) for q, m in state.motivations],
+        examples=[
+            SimpleNamespace(question_code=row[0], **dict(zip(EXAMPLE_COLUMNS, row[1:]))) for row in state.examples
+        ],
+        params=[
+            SimpleNamespace(
+                parameter_id=pid, value_orig=vo, warning_orig=wo, value_eval=ve, warning_eval=we,
+                evaluated_at=evaluated_at,
+            )
+            for pid, vo, wo, ve, we in state.params
+        ],
+    )
+
+
+def read_submission(sub: Submission) -> SnapshotData:
+    """Contenuto di sub, indipendentemente dal formato di archiviazione."""
+    if sub.storage == SnapshotStorage.LEGACY:
+        return read_legacy_submission(sub)
+    return snapshot_data(load_state(sub), evaluated_at=sub.submitted_at)
+
+
+def state_from_snapshot(data: SnapshotData) -> LanguageState:
+    """Righe di uno snapshot -> LanguageState (serve a compattare le submission legacy)."""
+    return LanguageState(
+        answers=[(r.question_code, r.response_text, r.comments or "") for r in data.answers],
+        motivations=[(r.question_code, r.motivation_code) for r in data.motivations],
+        examples=[(r.question_code, *((getattr(r, c) or "") for c in EXAMPLE_COLUMNS)) for r in data.examples],
+        params=[
+            (r.parameter_id, r.value_orig, bool(r.warning_orig), r.value_eval, bool(r.warning_eval))
+            for r in data.params
+        ],
+    ).normalized()
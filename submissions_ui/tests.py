@@ -1,3 +1,160 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from core.models import Language, ParamValueHistory, SnapshotStorage, Submission, SubmissionKeyIndex, User
+
+from .history import rebuild_history, record_history
+from .services import delete_submissions, encode_snapshot, prune_submissions
+from .snapshot import (
+    LanguageState, apply_delta, key_index_for, load_state, pack_delta, pack_state, state_hash, unpack_state,
+)
+
+
+def _state(n=60, changed=()):
+    """Stato sintetico: n risposte/parametri; le domande in `changed` hanno risposta e valore diversi."""
+    return LanguageState(
+        answers=[(f"Q{i:03}", "no" if f"Q{i:03}" in changed else "yes", f"comment {i}") for i in range(n)],
+        motivations=[(f"Q{i:03}", "M1") for i in range(0, n, 3)],
+        examples=[(f"Q{i:03}", f"text {i}", "", f"gloss {i}", f"translation {i}", "") for i in range(0, n, 2)],
+        params=[
+            (f"P{i:03}", "+", False, "-" if f"Q{i:03}" in changed else "+", False) for i in range(n)
+        ],
+    ).normalized()
+
+
+def _key_index(state):
+    return SubmissionKeyIndex(
+        questions=sorted({row[0] for row in state.answers}),
+        parameters=sorted({row[0] for row in state.params}),
+    )
+
+
+class SnapshotFormatTests(SimpleTestCase):
+    def test_pack_unpack_round_trip(self):
+        state = _state()
+        self.assertEqual(unpack_state(pack_state(state, _key_index(state)), _key_index(state)), state)
+
+    def test_delta_round_trip(self):
+        base = _state()
+        new = _state(changed={"Q005", "Q042"})
+        new.examples = [row for row in new.examples if row[0] != "Q010"]  # esempi tolti
+        new.motivations.append(("Q001", "M2"))                              # motivazione aggiunta
+        new.normalized()
+        index = _key_index(base)
+
+        delta = pack_delta(new, base, index)
+        restored = apply_delta(delta, index, base)
+
+        self.assertEqual(restored, new)
+        self.assertEqual(state_hash(restored), state_hash(new))
+        self.assertLess(len(delta), len(pack_state(new, index)))
+
+
+class SubmissionChainDeleteTests(TestCase):
+    def setUp(self):
+        self.lang = Language.objects.create(id="TST", name_full="Test language")
+        self.base_state = _state()
+        self.new_state = _state(changed={"Q007"})
+        self.index = key_index_for(
+            [row[0] for row in self.base_state.answers], [row[0] for row in self.base_state.params],
+        )
+        self.full = self._submit(self.base_state)
+        self.delta = self._submit(self.new_state)
+        self.ref = self._submit(self.new_state)
+
+    def _submit(self, state):
+        return Submission.objects.create(
+            language=self.lang, note="test", **encode_snapshot(self.lang, state, self.index),
+        )
+
+    def test_chain_storage(self):
+        self.assertEqual(self.full.storage, SnapshotStorage.FULL)
+        self.assertEqual((self.delta.storage, self.delta.base_id), (SnapshotStorage.DELTA, self.full.id))
+        self.assertEqual((self.ref.storage, self.ref.base_id), (SnapshotStorage.REF, self.delta.id))
+
+    def test_delete_full_and_dependents_together(self):
+        deleted = delete_submissions([self.full.id, self.delta.id, self.ref.id])
+        self.assertEqual(deleted, 3)
+        self.assertFalse(Submission.objects.filter(language=self.lang).exists())
+
+    def test_delete_full_and_delta_keeps_ref_readable(self):
+        deleted = delete_submissions([self.full.id, self.delta.id])
+        self.assertEqual(deleted, 2)
+        ref = Submission.objects.get(pk=self.ref.pk)
+        self.assertNotEqual(ref.storage, SnapshotStorage.REF)
+        self.assertEqual(load_state(ref), self.new_state)
+
+    def test_delete_base_reencodes_delta(self):
+        delete_submissions([self.full.id])
+        delta = Submission.objects.get(pk=self.delta.pk)
+        self.assertEqual(delta.storage, SnapshotStorage.FULL)
+        self.assertEqual(load_state(delta), self.new_state)
+        self.assertEqual(load_state(Submission.objects.get(pk=self.ref.pk)), self.new_state)
+
+    def test_language_delete_cascades_chain(self):
+        self.lang.delete()
+        self.assertFalse(Submission.objects.filter(pk__in=[self.full.id, self.delta.id, self.ref.id]).exists())
+
+    def test_language_delete_view(self):
+        admin = User.objects.create_user("admin@example.com", "pw", role="admin", is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.post(reverse("language_delete", args=[self.lang.id]), {"admin_password": "pw"})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Language.objects.filter(pk=self.lang.id).exists())
+        self.assertFalse(Submission.objects.filter(language_id=self.lang.id).exists())
+
+    def test_prune_chain_over_limit(self):
+        # base, delta e ref oltre il limite insieme; resta solo la più recente, leggibile
+        latest = self._submit(_state(changed={"Q009"}))
+        pruned = prune_submissions([self.lang.id], keep=1)
+        self.assertEqual(pruned, 3)
+        self.assertEqual(list(Submission.objects.filter(language=self.lang)), [latest])
+        self.assertEqual(load_state(Submission.objects.get(pk=latest.pk)), _state(changed={"Q009"}))
+
+
+class ParamHistoryRebuildTests(TestCase):
+    def setUp(self):
+        self.lang = Language.objects.create(id="TST", name_full="Test language")
+        self.base_state = _state()
+        self.new_state = _state(changed={"Q007"})
+        self.index = key_index_for(
+            [row[0] for row in self.base_state.answers], [row[0] for row in self.base_state.params],
+        )
+        self.full = self._submit(self.base_state)
+        self.delta = self._submit(self.new_state)
+
+    def _submit(self, state):
+        return Submission.objects.create(
+            language=self.lang, note="test", **encode_snapshot(self.lang, state, self.index),
+        )
+
+    def _values(self, pid):
+        return list(
+            ParamValueHistory.objects.filter(language=self.lang, parameter_id=pid)
+            .order_by("changed_at").values_list("value_eval", flat=True)
+        )
+
+    def test_rebuild_keeps_changes_of_deleted_submissions(self):
+        record_history([(self.full, self.base_state), (self.delta, self.new_state)])
+        delete_submissions([self.delta.pk])
+        self.assertEqual(rebuild_history(self.lang), 0)
+        self.assertEqual(self._values("P007"), ["+", "-"])
+
+    def test_rebuild_backfills_before_first_point(self):
+        record_history([(self.delta, self.new_state)])
+        self.assertEqual(rebuild_history(self.lang), 60)
+        self.assertEqual(self._values("P007"), ["+", "-"])
+        changed = ParamValueHistory.objects.get(language=self.lang, parameter_id="P007", value_eval="-")
+        self.assertEqual(changed.previous, "+")
+
+    def test_rebuild_backfill_keeps_one_point_for_unchanged_parameter(self):
+        record_history([(self.delta, self.new_state)])
+        rebuild_history(self.lang)
+        self.assertEqual(self._values("P000"), ["+"])
+        self.assertEqual(ParamValueHistory.objects.filter(language=self.lang).count(), 61)
+
+    def test_force_rebuilds_from_remaining_submissions(self):
+        record_history([(self.full, self.base_state), (self.delta, self.new_state)])
+        delete_submissions([self.delta.pk])
+        self.assertEqual(rebuild_history(self.lang, force=True), 60)
+        self.assertEqual(self._values("P007"), ["+"])
@@ -7,5 +7,9 @@ urlpatterns = [
     path("<int:submission_id>/", views.submission_detail, name="submission_detail"),
     path("create/<str:language_id>/", views.submission_create_for_language, name="submission_create_for_language"),
 path("create-all/", views.submission_create_all_languages, name="submission_create_all"),
+path("create-all/jobs/<int:job_id>/", views.submission_backup_job_status, name="submission_backup_job_status"),
+path("diff/", views.submission_diff, name="submission_diff"),
+path("diff.csv", views.submission_diff_csv, name="submission_diff_csv"),
+path("history.csv", views.param_history_csv, name="param_history_csv"),
 path("delete-backup/", views.submission_delete_backup, name="submission_delete_backup"),
 ]
@@ -1,30 +1,34 @@
 from __future__ import annotations
 
+import csv
+from datetime import datetime, time
 from typing import Any
 
-from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import OuterRef, Subquery, IntegerField, Prefetch, Q
+from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
-from django.http import HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.utils.translation import gettext as _
 from django.db.models import Count
 from core.models import (
     Language,
     Submission,
-    SubmissionAnswer,
-    SubmissionAnswerMotivation,
-    SubmissionExample,
-    SubmissionParam,
     ParameterDef,
     Question,
+    SubmissionBackupJob,
 )
-from .services import create_language_submission
+from .backup import active_job, reap_stale_jobs, start_backup_job
+from .diff import CSV_HEADER, LIVE, DiffRow, diff_backups, diff_submissions, summarize
+from .history import parameter_changes, values_at
+from .services import create_language_submission, delete_submissions
+from .snapshot import read_submission
 
 
 def _is_admin(user: Any) -> bool:
@@ -168,6 +172,7 @@ def submissions_list(request: HttpRequest) -> HttpResponse:
     else:
         # --- VISTA CARTELLE (Invariata) ---
         # ... (codice precedente per le cartelle) ...
+        reap_stale_jobs()  # niente cartelle parziali di backup interrotti
         groups = Submission.objects.values('submitted_at', 'note', 'submitted_by__email') \
             .annotate(lang_count=Count('id')) \
             .order_by('-submitted_at')
@@ -180,7 +185,8 @@ def submissions_list(request: HttpRequest) -> HttpResponse:
         return render(request, "submissions/list.html", {
             "page": page,
             "q": q,
-            "is_folder_view": True
+            "is_folder_view": True,
+            "backup_job": active_job(),
         })
 
 
@@ -190,8 +196,9 @@ def submissions_list(request: HttpRequest) -> HttpResponse:
 def submission_detail(request: HttpRequest, submission_id: int) -> HttpResponse:
     """Render the details of one submission with ordered related data.
 
-    The view prefetches answers, params, motivations, and examples, and
-    computes a motivation text aggregation per answer row.
+    The snapshot is read through ``read_submission`` (compact blob or legacy
+    rows alike); answers and params are ordered by current parameter
+    position, and motivations are aggregated per answer row.
 
     Args:
         request: Current authenticated admin request.
@@ -200,80 +207,40 @@ def submission_detail(request: HttpRequest, submission_id: int) -> HttpResponse:
     Returns:
         Rendered submission detail page.
     """
-
-    # ----- ANSWERS -----
-    question_parameter_id_sq = (
-        Question.objects
-        .filter(pk=OuterRef("question_code"))
-        .values("parameter_id")[:1]
-    )
-
-
-    answers_qs = (
-        SubmissionAnswer.objects
-        .annotate(                       
-            param_id=Subquery(question_parameter_id_sq)
-        )
-        .annotate(                       
-            param_pos=Subquery(
-                ParameterDef.objects
-                .filter(pk=OuterRef("param_id"))
-                .values("position")[:1]
-            , output_field=IntegerField()),
-            param_name=Subquery(
-                ParameterDef.objects
-                .filter(pk=OuterRef("param_id"))
-                .values("name")[:1]
-            ),
-        )
-        .order_by("param_pos", "param_id", "question_code")
-    )
-
-
-
-
-
-    answers_prefetch = Prefetch("answers", queryset=answers_qs)
-
-    # ----- PARAMS -----
-    subparam_position_sq = (
-        ParameterDef.objects
-        .filter(pk=OuterRef("parameter_id"))
-        .values("position")[:1]
+    sub = get_object_or_404(
+        Submission.objects.select_related("language", "submitted_by", "key_index"),
+        pk=submission_id,
     )
-    params_prefetch = Prefetch(
-        "params",
-        queryset=(
-            SubmissionParam.objects
-            .annotate(param_pos=Subquery(subparam_position_sq, output_field=IntegerField()))
-            .order_by("param_pos", "parameter_id")
-        ),
+    data = read_submission(sub)
+    previous = (
+        Submission.objects.filter(language_id=sub.language_id, submitted_at__lt=sub.submitted_at)
+        .order_by("-submitted_at", "-id").only("id").first()
     )
 
-    # ----- MOTIVATIONS & EXAMPLES -----
-    mots_prefetch = Prefetch(
-        "answer_motivations",
-        queryset=SubmissionAnswerMotivation.objects.order_by("question_code", "motivation_code"),
-    )
-    examples_prefetch = Prefetch(
-        "examples",
-        queryset=SubmissionExample.objects.order_by("question_code", "id"),
-    )
+    # parametro di ogni domanda e posizione/nome dei parametri (ordine come nella pagina dati)
+    qids = {a.question_code for a in data.answers}
+    param_of = dict(Question.objects.filter(pk__in=qids).values_list("id", "parameter_id"))
+    pids = set(param_of.values()) | {p.parameter_id for p in data.params}
+    param_info = {
+        pid: (pos, name)
+        for pid, pos, name in ParameterDef.objects.filter(pk__in=pids).values_list("id", "position", "name")
+    }
 
-    sub = get_object_or_404(
-        Submission.objects.select_related("language", "submitted_by")
-        .prefetch_related(answers_prefetch, params_prefetch, mots_prefetch, examples_prefetch),
-        pk=submission_id,
-    )
+    def param_key(pid):
+        pos = param_info.get(pid, (None, None))[0]
+        return (pos is None, pos or 0, pid or "")  # parametri non più esistenti in fondo
 
-    # Aggregazione motivazioni per riga answer
     mot_by_q = {}
-    for m in sub.answer_motivations.all():
+    for m in data.motivations:
         mot_by_q.setdefault(m.question_code, []).append(m.motivation_code)
 
-    answers = list(sub.answers.all())
+    answers = data.answers
     for a in answers:
+        a.param_id = param_of.get(a.question_code)
+        a.param_name = param_info.get(a.param_id, (None, None))[1]
         a.mot_text = ", ".join(mot_by_q.get(a.question_code, [])) or ""
+    answers.sort(key=lambda a: (param_key(a.param_id), a.question_code))
+    params = sorted(data.params, key=lambda p: param_key(p.parameter_id))
 
     return render(
         request,
@@ -281,46 +248,258 @@ def submission_detail(request: HttpRequest, submission_id: int) -> HttpResponse:
         {
             "sub": sub,
             "sub_answers": answers,
-            "sub_examples": list(sub.examples.all()),
-            "sub_params": list(sub.params.all()),
+            "sub_examples": data.examples,
+            "sub_params": params,
+            "previous": previous,
         },
     )
 
 
 
 
+DIFF_DISPLAY_LIMIT = 2000
+
+
+def _backup_datetime(value: str):
+    """Parse the timestamp of a backup folder from the querystring.
+
+    Args:
+        value: Raw ``from``/``to`` value, e.g. ``2024-05-01 10:00:00``.
+
+    Returns:
+        Aware datetime.
+
+    Raises:
+        Http404: If the value is missing or not a valid datetime.
+    """
+    try:
+        parsed = parse_datetime(value) if value else None
+    except ValueError:  # formato giusto, data inesistente
+        parsed = None
+    if parsed is None:
+        raise Http404(_("Backup not found."))
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def _resolve_diff(request: HttpRequest) -> tuple[list[DiffRow], dict[str, Any]]:
+    """Compute the diff described by the querystring.
+
+    Two forms are accepted: ``a``/``b`` (submission ids, ``b`` may be
+    ``live``) for one language, or ``from``/``to`` (backup timestamps, ``to``
+    may be ``live``) for every language.
+
+    Args:
+        request: Current authenticated admin request.
+
+    Returns:
+        A tuple ``(rows, context)`` with the diff rows and labels describing
+        both sides.
+
+    Raises:
+        Http404: If a submission or backup folder does not exist.
+    """
+    if request.GET.get("a"):
+        b = request.GET.get("b") or LIVE
+        if not request.GET["a"].isdigit() or not (b == LIVE or b.isdigit()):
+            raise Http404(_("Submission not found."))
+        old = get_object_or_404(Submission.objects.select_related("language", "key_index"), pk=request.GET["a"])
+        new = None if b == LIVE else get_object_or_404(
+            Submission.objects.select_related("key_index"), pk=b, language_id=old.language_id,
+        )
+        rows = diff_submissions(old, new)
+        return rows, {
+            "language": old.language,
+            "old_label": f"#{old.id} ({old.submitted_at:%Y-%m-%d %H:%M:%S})",
+            "new_label": _("current data") if new is None else f"#{new.id} ({new.submitted_at:%Y-%m-%d %H:%M:%S})",
+            "file_suffix": f"{old.id}_{b}",
+        }
+
+    old_at = request.GET.get("from") or ""
+    new_at = request.GET.get("to") or LIVE
+    old_ts = _backup_datetime(old_at)
+    new_ts = LIVE if new_at == LIVE else _backup_datetime(new_at)
+    for ts in {old_ts, new_ts} - {LIVE}:
+        if not Submission.objects.filter(submitted_at=ts).exists():
+            raise Http404(_("Backup not found."))
+    rows = list(diff_backups(old_ts, new_ts))
+    return rows, {
+        "language": None,
+        "old_label": _("backup %(ts)s") % {"ts": old_at},
+        "new_label": _("current data") if new_at == LIVE else _("backup %(ts)s") % {"ts": new_at},
+        "file_suffix": "_".join(v.replace(" ", "T").replace(":", "") for v in (old_at, new_at)),
+    }
+
+
+@login_required
+@user_passes_test(_is_admin)
+def submission_diff(request: HttpRequest) -> HttpResponse:
+    """Show what changed between two snapshots or a snapshot and live data.
+
+    See ``_resolve_diff`` for the accepted querystring. The page lists at
+    most ``DIFF_DISPLAY_LIMIT`` rows; the CSV export has all of them.
+
+    Args:
+        request: Current authenticated admin request.
+
+    Returns:
+        Rendered diff page.
+    """
+    rows, ctx = _resolve_diff(request)
+    ctx.update({
+        "rows": rows[:DIFF_DISPLAY_LIMIT],
+        "total": len(rows),
+        "truncated": len(rows) > DIFF_DISPLAY_LIMIT,
+        "summary": sorted(summarize(rows).items()),
+        "csv_query": request.GET.urlencode(),
+    })
+    return render(request, "submissions/diff.html", ctx)
+
+
+@login_required
+@user_passes_test(_is_admin)
+def submission_diff_csv(request: HttpRequest) -> HttpResponse:
+    """Export the diff described by the querystring as CSV.
+
+    Args:
+        request: Current authenticated admin request.
+
+    Returns:
+        CSV attachment with one row per change.
+    """
+    rows, ctx = _resolve_diff(request)
+    response = HttpResponse(content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="backup_diff_{ctx["file_suffix"]}.csv"'
+    writer = csv.writer(response)
+    writer.writerow(CSV_HEADER)
+    writer.writerows(r.as_row() for r in rows)
+    return response
+
+
+def _history_datetime(value: str | None, end_of_day: bool = False):
+    """Parse a ``YYYY-MM-DD`` (or ISO datetime) querystring value as an aware datetime.
+
+    Args:
+        value: Raw querystring value.
+        end_of_day: For plain dates, return 23:59:59 instead of midnight.
+
+    Returns:
+        Aware datetime, or ``None`` when the value is missing.
+
+    Raises:
+        Http404: If the value cannot be parsed.
+    """
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        parsed = None if day else parse_datetime(value)
+    except ValueError:  # formato giusto, data inesistente (es. 2024-02-30)
+        day = parsed = None
+    if day is not None:
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if parsed is None:
+        raise Http404(_("Invalid date: %(value)s") % {"value": value})
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+@login_required
+@user_passes_test(_is_admin)
+def param_history_csv(request: HttpRequest) -> HttpResponse:
+    """Export the parameter value history as CSV.
+
+    Two queries are supported:
+
+    * ``parameter`` (optionally ``since``, ``until``, ``language``): every
+      change of ``value_eval`` for that parameter in the interval.
+    * ``language`` and ``at``: the ``value_eval`` of every parameter of the
+      language at that date.
+
+    Args:
+        request: Current authenticated admin request.
+
+    Returns:
+        CSV attachment response.
+
+    Raises:
+        Http404: If neither query is specified or a date is invalid.
+    """
+    parameter_id = request.GET.get("parameter")
+    language_id = request.GET.get("language")
+    response = HttpResponse(content_type="text/csv")
+    writer = csv.writer(response)
+
+    if parameter_id:
+        changes = parameter_changes(
+            parameter_id,
+            since=_history_datetime(request.GET.get("since")),
+            until=_history_datetime(request.GET.get("until"), end_of_day=True),
+            language_ids=[language_id] if language_id else None,
+        ).values_list("language_id", "changed_at", "previous", "value_eval", "submission_id")
+        response["Content-Disposition"] = f'attachment; filename="param_history_{parameter_id}.csv"'
+        writer.writerow(["language", "changed_at", "previous", "value_eval", "submission"])
+        for lid, changed_at, previous, value, sub_id in changes:
+            writer.writerow([lid, changed_at.isoformat(), previous or "", value or "", sub_id or ""])
+        return response
+
+    at = _history_datetime(request.GET.get("at"), end_of_day=True)
+    if not language_id or at is None:
+        raise Http404(_("Specify a parameter, or a language and a date."))
+    response["Content-Disposition"] = f'attachment; filename="param_values_{language_id}_{at:%Y%m%d}.csv"'
+    writer.writerow(["parameter", "value_eval"])
+    writer.writerows(sorted(values_at(language_id, at).items()))
+    return response
+
+
 @login_required
 @user_passes_test(_is_admin)
 def submission_create_all_languages(request: HttpRequest) -> HttpResponse:
-    """Create one synchronized backup submission for every language.
+    """Start a synchronized backup submission for every language.
 
-    On POST, submissions are generated in a single transaction and forced to
-    share the same ``submitted_at`` timestamp.
+    On POST, a ``SubmissionBackupJob`` is created and run in the background
+    (see ``submissions_ui.backup``); all its submissions share the same
+    ``submitted_at`` timestamp. While a backup is running, the page shows its
+    progress instead of the form; interrupted jobs are cleaned up first.
 
     Args:
         request: Current authenticated admin request.
 
     Returns:
-        Confirmation page on GET, or redirect to list after backup creation.
+        Confirmation/progress page on GET, or redirect back to it after the
+        job has been started.
     """
     if request.method == "POST":
         note = request.POST.get("note") or "Bulk creation"
-        languages = Language.objects.all()
+        _job, started = start_backup_job(request.user, note=note)
+        if not started:
+            messages.warning(request, _("A backup is already running."))
+        return redirect("submission_create_all")
 
-        fixed_time = timezone.now().replace(microsecond=0)
+    reap_stale_jobs()  # job interrotti: via le loro cartelle parziali
+    return render(request, "submissions/confirm_create_all.html", {"job": active_job()})
 
-        with transaction.atomic():
-            for lang in languages:
-                # Creiamo la submission normalmente
-                res = create_language_submission(lang, request.user, note=note)
-                # 2. FORZIAMO la data identica per tutti
-                res.submission.submitted_at = fixed_time
-                res.submission.save()
 
-        messages.success(request, _("Backup created successfully."))
-        return redirect("submissions_list")
+@login_required
+@user_passes_test(_is_admin)
+def submission_backup_job_status(request: HttpRequest, job_id: int) -> JsonResponse:
+    """Return the progress of a backup job as JSON.
 
-    return render(request, "submissions/confirm_create_all.html")
+    Args:
+        request: Current authenticated admin request.
+        job_id: ``SubmissionBackupJob`` primary key.
+
+    Returns:
+        JSON with ``status``, ``done``, ``total``, ``pruned``, ``error`` and
+        the backup ``timestamp``.
+    """
+    job = get_object_or_404(SubmissionBackupJob, pk=job_id)
+    return JsonResponse({
+        "status": job.status,
+        "done": job.done,
+        "total": job.total,
+        "pruned": job.pruned,
+        "error": job.error or "",
+        "timestamp": job.submitted_at.strftime("%Y-%m-%d %H:%M:%S"),
+    })
 
 
 @login_required
@@ -340,8 +519,11 @@ def submission_delete_backup(request: HttpRequest) -> HttpResponse:
 
         if timestamp_str:
             # Cancelliamo tutte le submission che hanno ESATTAMENTE quella data
-            # Django gestisce la conversione stringa -> datetime automaticamente nel filtro
-            deleted_count, _ = Submission.objects.filter(submitted_at=timestamp_str).delete()
+            # Django gestisce la conversione stringa -> datetime automaticamente nel filtro.
+            # delete_submissions ricodifica prima gli snapshot di altri backup che vi si appoggiano.
+            deleted_count = delete_submissions(
+                Submission.objects.filter(submitted_at=timestamp_str).values_list("id", flat=True)
+            )
 
             if deleted_count > 0:
                 messages.success(request, f"Backup from {timestamp_str} deleted. ({deleted_count} items removed).")
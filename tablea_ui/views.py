@@ -3,7 +3,7 @@ import csv
 import zipfile
 from io import BytesIO
 from io import StringIO
-from typing import Any, Callable, Sequence
+from typing import Callable, NamedTuple, Sequence
 from openpyxl import Workbook
 import matplotlib
 matplotlib.use('Agg')
@@ -14,13 +14,64 @@ from django.contrib.auth.decorators import login_required
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 from core.models import (
-    Language, ParameterDef, LanguageParameterEval, Question, Answer,
+    Language, ParameterDef, Question, Answer,
     ParamSchema, ParamType, ParamLevelOfComparison
 )
 import numpy as np
 from adjustText import adjust_text
+from core.services.language_vector import ParamIndex, load_vectors, stack, SYMBOLS, PLUS, MINUS
 
-def get_tablea_filtered_data(request: HttpRequest) -> tuple[list[Language], list[dict[str, Any]], str]:
+
+class TableACell(NamedTuple):
+    val: str
+    lang_id: str
+
+
+class TableARow:
+    """One TableA row backed by a column of the shared int8 matrix.
+
+    Cells are materialised only when iterated (template rendering); exports and
+    distances read ``matrix`` directly.
+    """
+    __slots__ = ("p", "col", "matrix", "lang_ids", "symbols")
+
+    def __init__(self, p, col: int, matrix: np.ndarray, lang_ids: list[str], symbols: Sequence[str]):
+        self.p = p
+        self.col = col
+        self.matrix = matrix
+        self.lang_ids = lang_ids
+        self.symbols = symbols
+
+    def vals(self) -> list[str]:
+        sym = self.symbols
+        return [sym[c] for c in self.matrix[:, self.col].tolist()]
+
+    @property
+    def cells(self) -> list[TableACell]:
+        return [TableACell(v, lid) for v, lid in zip(self.vals(), self.lang_ids)]
+
+
+# Simboli di cella per le due viste: i codici 0..4 di language_vector per i
+# parametri, 0/1/2 per le risposte alle domande.
+PARAM_CELL_SYMBOLS = tuple(s or "" for s in SYMBOLS)
+QUESTION_CELL_SYMBOLS = ("", "YES", "NO")
+_QUESTION_CODES = {"yes": 1, "no": 2}
+
+
+def tablea_codes(rows: Sequence[TableARow]) -> np.ndarray:
+    """Return the (languages x rows) code matrix for the given TableA rows."""
+    if not rows:
+        return np.zeros((0, 0), dtype=np.int8)
+    return rows[0].matrix[:, [r.col for r in rows]]
+
+
+def tablea_symbols(rows: Sequence[TableARow]) -> np.ndarray:
+    """Return the (languages x rows) matrix of cell strings."""
+    if not rows:
+        return np.zeros((0, 0), dtype=object)
+    return np.array(rows[0].symbols, dtype=object)[tablea_codes(rows)]
+
+def get_tablea_filtered_data(request: HttpRequest) -> tuple[list[Language], list[TableARow], str]:
     """Build filtered languages and matrix rows for the TableA views."""
     
     # Prende i dati da POST se presenti (Download), altrimenti da GET (Filtri)
@@ -70,21 +121,23 @@ def get_tablea_filtered_data(request: HttpRequest) -> tuple[list[Language], list
 
     items = list(items)
 
-    # 3. Costruzione Matrice 
-    matrix = []
+    # 3. Costruzione Matrice (int8 lingue × item, una riga per lingua)
+    lang_ids = [l.id for l in languages]
     if view_mode == "questions":
-        ans_dict = {(a.question_id, a.language_id): a.response_text for a in Answer.objects.filter(question__in=items)}
-        for q in items:
-            cells = [{"val": (ans_dict.get((q.id, l.id)) or "").upper(), "lang_id": l.id} for l in languages]
-            matrix.append({"p": q, "cells": cells})
+        q_pos = {q.id: j for j, q in enumerate(items)}
+        l_pos = {lid: i for i, lid in enumerate(lang_ids)}
+        codes = np.zeros((len(lang_ids), len(items)), dtype=np.int8)
+        for qid, lid, resp in (Answer.objects.filter(question__in=items, language_id__in=lang_ids)
+                               .values_list("question_id", "language_id", "response_text").iterator()):
+            codes[l_pos[lid], q_pos[qid]] = _QUESTION_CODES.get((resp or "").lower(), 0)
+        symbols = QUESTION_CELL_SYMBOLS
     else:
-        eval_dict = {
-            (e.language_parameter.parameter_id, e.language_parameter.language_id): e.value_eval
-            for e in LanguageParameterEval.objects.filter(language_parameter__parameter__in=items)
-        }
-        for p in items:
-            cells = [{"val": eval_dict.get((p.id, l.id)) or "", "lang_id": l.id} for l in languages]
-            matrix.append({"p": p, "cells": cells})
+        index = ParamIndex(p.id for p in items)
+        vectors = load_vectors(lang_ids, index, source="eval")
+        codes = stack([vectors[lid] for lid in lang_ids]) if lang_ids else np.zeros((0, len(items)), dtype=np.int8)
+        symbols = PARAM_CELL_SYMBOLS
+
+    matrix = [TableARow(p, j, codes, lang_ids, symbols) for j, p in enumerate(items)]
 
     return languages, matrix, view_mode
 
@@ -164,9 +217,9 @@ def tablea_export_xlsx(request: HttpRequest) -> HttpResponse:
     ws = wb.active
     ws.append(["Label", "Parameter", "Implicational Condition(s)"] + [l.id for l in languages])
     for r in rows:
-        name_val = getattr(r['p'], 'name', getattr(r['p'], 'text', ''))
-        impl_val = r['p'].parameter_id if view_mode == "questions" else getattr(r['p'], 'implicational_condition', '')
-        ws.append([r['p'].id, name_val, impl_val] + [c['val'] for c in r['cells']])
+        name_val = getattr(r.p, 'name', getattr(r.p, 'text', ''))
+        impl_val = r.p.parameter_id if view_mode == "questions" else getattr(r.p, 'implicational_condition', '')
+        ws.append([r.p.id, name_val, impl_val] + r.vals())
 
     buffer = BytesIO()
     wb.save(buffer)
@@ -194,10 +247,10 @@ def tablea_export_questions_xlsx(request: HttpRequest) -> HttpResponse:
 
     for r in rows:
         # Recuperiamo il testo della domanda
-        name_val = getattr(r['p'], 'text', getattr(r['p'], 'name', ''))
+        name_val = getattr(r.p, 'text', getattr(r.p, 'name', ''))
 
         # Aggiungiamo la riga: ID, Nome, e poi direttamente le celle delle lingue
-        ws.append([r['p'].id, name_val] + [c['val'] for c in r['cells']])
+        ws.append([r.p.id, name_val] + r.vals())
 
     buffer = BytesIO()
     wb.save(buffer)
@@ -220,9 +273,10 @@ def tablea_export_csv(request: HttpRequest) -> HttpResponse:
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="tableA_{view_mode}_transposed.csv"'
     writer = csv.writer(response)
-    writer.writerow(["Language"] + [r['p'].id for r in rows])
+    writer.writerow(["Language"] + [r.p.id for r in rows])
+    cells = tablea_symbols(rows)
     for i, lang in enumerate(languages):
-        writer.writerow([lang.id] + [r['cells'][i]['val'] for r in rows])
+        writer.writerow([lang.id] + cells[i].tolist())
     return response
 
 
@@ -277,11 +331,74 @@ def jaccard_core(P1: Sequence[str], P2: Sequence[str], identity: str = "+") -> f
     return dif / (dif + id) if (dif + id) > 0 else 0.0
 
 
+def _ratio(dif: np.ndarray, ident: np.ndarray) -> np.ndarray:
+    tot = dif + ident
+    out = np.zeros(tot.shape, dtype=float)
+    np.divide(dif, tot, out=out, where=tot > 0)
+    return out
+
+
+def hamming_matrix(codes: np.ndarray) -> np.ndarray:
+    """Vectorized ``hamming_core`` over all pairs of rows of a code matrix.
+
+    Args:
+        codes: int8 matrix (languages x parameters) of ``language_vector`` codes.
+
+    Returns:
+        Square float matrix of pairwise distances.
+    """
+    P = (codes == PLUS).astype(np.int32)
+    M = (codes == MINUS).astype(np.int32)
+    ident = P @ P.T + M @ M.T
+    dif = P @ M.T + M @ P.T
+    return _ratio(dif, ident)
+
+
+def jaccard_matrix(codes: np.ndarray, identity: str = "+") -> np.ndarray:
+    """Vectorized ``jaccard_core`` over all pairs of rows of a code matrix.
+
+    Args:
+        codes: int8 matrix (languages x parameters) of ``language_vector`` codes.
+        identity: Symbol counted as identity (default ``+``).
+
+    Returns:
+        Square float matrix of pairwise distances.
+    """
+    P = (codes == PLUS).astype(np.int32)
+    M = (codes == MINUS).astype(np.int32)
+    I = (codes == PARAM_CELL_SYMBOLS.index(identity)).astype(np.int32)
+    return _ratio(P @ M.T + M @ P.T, I @ I.T)
+
+
+_VECTORIZED = {hamming_core: hamming_matrix, jaccard_core: jaccard_matrix}
+
+
+def pairwise_distances(rows: Sequence[TableARow], dist_func: Callable[..., float],
+                       identity: str | None = None) -> np.ndarray:
+    """Compute the full language distance matrix for TableA rows.
+
+    Parameter rows with a known distance use the numpy kernels; anything else
+    falls back to calling ``dist_func`` on every pair.
+    """
+    fast = _VECTORIZED.get(dist_func)
+    if fast is not None and rows and rows[0].symbols is PARAM_CELL_SYMBOLS:
+        codes = tablea_codes(rows)
+        return fast(codes) if identity is None else fast(codes, identity)
+
+    lang_data = tablea_symbols(rows).tolist() if rows else []
+    n = len(lang_data)
+    out = np.zeros((n, n), dtype=float)
+    for i in range(n):
+        for j in range(n):
+            out[i, j] = dist_func(lang_data[i], lang_data[j]) if identity is None \
+                else dist_func(lang_data[i], lang_data[j], identity)
+    return out
+
 
 # Genera il contenuto di un file.txt in memoria, replicando distance.py
 def generate_matrix_txt(
     languages: Sequence[Language],
-    rows: Sequence[dict[str, Any]],
+    rows: Sequence[TableARow],
     dist_func: Callable[..., float],
     identity: str | None = None,
 ) -> str:
@@ -297,19 +414,13 @@ def generate_matrix_txt(
         TSV content with header and all pairwise distances.
     """
     output = StringIO()
-    lang_data = [[r['cells'][i]['val'] for r in rows] for i in range(len(languages))]
+    n = len(languages)
+    dist = pairwise_distances(rows, dist_func, identity).tolist() if rows else [[0.0] * n for _ in range(n)]
     headers = ["Language"] + [l.id for l in languages]
     output.write("\t".join(headers) + "\n")
 
     for i, l1 in enumerate(languages):
-        row_vals = [l1.id]
-        for j, l2 in enumerate(languages):
-            if identity is None:
-                d = dist_func(lang_data[i], lang_data[j])
-            else:
-                d = dist_func(lang_data[i], lang_data[j], identity)
-            row_vals.append(str(d))
-        output.write("\t".join(row_vals) + "\n")
+        output.write("\t".join([l1.id] + [str(d) for d in dist[i]]) + "\n")
     return output.getvalue()
 
 
@@ -396,16 +507,14 @@ def tablea_export_dendrogram(request: HttpRequest) -> HttpResponse:
     languages, rows, _ = get_tablea_filtered_data(request)
     if not languages: return HttpResponse("No data")
 
-    lang_data = [[r['cells'][i]['val'] for r in rows] for i in range(len(languages))]
     labels = [l.id for l in languages]
+    n = len(languages)
 
     # Calcolo matrice Hamming
-    matrix_hamming = [[hamming_core(lang_data[i], lang_data[j]) for j in range(len(languages))] for i in
-                      range(len(languages))]
+    matrix_hamming = pairwise_distances(rows, hamming_core) if rows else np.zeros((n, n))
 
     # Calcolo matrice Jaccard[+]
-    matrix_jaccard = [[jaccard_core(lang_data[i], lang_data[j], identity="+") for j in range(len(languages))] for i in
-                      range(len(languages))]
+    matrix_jaccard = pairwise_distances(rows, jaccard_core, identity="+") if rows else np.zeros((n, n))
 
     # Creazione dello zip in RAM
     zip_buf = BytesIO()
@@ -441,19 +550,9 @@ def tablea_export_pca(request: HttpRequest) -> HttpResponse:
         return HttpResponse("No data available to perform PCA.", status=400)
 
     lang_labels = [l.id for l in languages]
-    matrix_data = [[r['cells'][i]['val'] for r in rows] for i in range(len(languages))]
-
-    # 1. Pulizia dati e conversione in array Numpy (Senza Pandas)
-    numeric_data = []
-    for row in matrix_data:
-        num_row = []
-        for val in row:
-            if val == '+': num_row.append(1.0)
-            elif val == '-': num_row.append(0.0)
-            else: num_row.append(0.0) # gestisce '0' o stringhe vuote
-        numeric_data.append(num_row)
-
-    X = np.array(numeric_data, dtype=float)
+
+    # 1. Conversione in array Numpy: '+' -> 1.0, tutto il resto ('-', '0', vuoto) -> 0.0
+    X = (tablea_symbols(rows) == '+').astype(float)
 
     if X.size == 0 or X.shape[1] < 2:
         return HttpResponse("Not enough data to perform a 2D PCA.", status=400)